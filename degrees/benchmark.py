@@ -0,0 +1,281 @@
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+import degrees
+import util
+from graph import CompactGraph
+from landmarks import LandmarkOracle
+
+
+def synthetic_graph(edges, stars_per_movie=10, movies_per_person=4, seed=0):
+    """
+    Fill the `degrees` tables with a random co-star graph of roughly
+    `edges` person-movie edges, and return the list of person_ids.
+    """
+    rng = random.Random(seed)
+    n_movies = max(1, edges // stars_per_movie)
+    n_people = max(stars_per_movie, edges // movies_per_person)
+
+    degrees.graph = None
+    degrees.name_index = degrees.dense_index = None
+    degrees.names, degrees.people, degrees.movies = {}, {}, {}
+
+    person_ids = [str(i) for i in range(n_people)]
+    for person_id in person_ids:
+        degrees.people[person_id] = {
+            "name": f"Person {person_id}",
+            "birth": "",
+            "movies": set()
+        }
+        degrees.names[f"person {person_id}"] = {person_id}
+
+    for i in range(n_movies):
+        movie_id = f"m{i}"
+        stars = set(rng.sample(person_ids, stars_per_movie))
+        degrees.movies[movie_id] = {"title": f"Movie {i}", "year": "", "stars": stars}
+        for person_id in stars:
+            degrees.people[person_id]["movies"].add(movie_id)
+
+    return person_ids
+
+
+def write_csv(directory):
+    """
+    Write the current `degrees` tables as people/movies/stars CSVs.
+    """
+    with open(os.path.join(directory, "people.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for person_id, person in degrees.people.items():
+            writer.writerow([person_id, person["name"], person["birth"]])
+    with open(os.path.join(directory, "movies.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        for movie_id, movie in degrees.movies.items():
+            writer.writerow([movie_id, movie["title"], movie["year"]])
+    with open(os.path.join(directory, "stars.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for movie_id, movie in degrees.movies.items():
+            for person_id in movie["stars"]:
+                writer.writerow([person_id, movie_id])
+
+
+def time_query(source, target):
+    """
+    Return (seconds, degrees) for one `shortest_path` query.
+    """
+    start = time.perf_counter()
+    path = degrees.shortest_path(source, target)
+    return time.perf_counter() - start, None if path is None else len(path)
+
+
+def bench_frontier(args):
+    """
+    Compare the list-backed QueueFrontier with the deque-backed one on
+    graphs of increasing size. The list frontier is quadratic in frontier
+    size, so it is only run up to `--legacy-limit` edges.
+    """
+    size = args.start
+    while size <= args.edges:
+        person_ids = synthetic_graph(size, seed=args.seed)
+        # An isolated target forces the search to exhaust the component
+        target = "isolated"
+        degrees.people[target] = {"name": "Isolated", "birth": "", "movies": set()}
+        source = person_ids[0]
+
+        row = [f"{size:>9} edges"]
+        seconds, _ = time_query(source, target)
+        row.append(f"deque {seconds * 1000:10.1f} ms")
+
+        if size <= args.legacy_limit:
+            degrees.DequeQueueFrontier = util.QueueFrontier
+            try:
+                seconds, _ = time_query(source, target)
+            finally:
+                degrees.DequeQueueFrontier = util.DequeQueueFrontier
+            row.append(f"list {seconds * 1000:10.1f} ms")
+        else:
+            row.append("list    (skipped)")
+        print("  ".join(row))
+        size *= 10
+
+
+def count_expansions(search, source, target):
+    """
+    Return (seconds, degrees, expanded nodes) for one search, counting
+    calls to `neighbors_for_person` as node expansions.
+    """
+    neighbors_for_person = degrees.neighbors_for_person
+    expanded = 0
+
+    def counting(person_id):
+        nonlocal expanded
+        expanded += 1
+        return neighbors_for_person(person_id)
+
+    degrees.neighbors_for_person = counting
+    try:
+        start = time.perf_counter()
+        path = search(source, target)
+        seconds = time.perf_counter() - start
+    finally:
+        degrees.neighbors_for_person = neighbors_for_person
+    return seconds, None if path is None else len(path), expanded
+
+
+def bench_bidirectional(args):
+    """
+    Compare node expansions and latency of one-sided and bidirectional
+    BFS on random query pairs, grouped by degrees of separation.
+    """
+    person_ids = synthetic_graph(args.edges, args.stars, args.movies, seed=args.seed)
+    rng = random.Random(args.seed + 1)
+    results = {}
+    for _ in range(args.queries):
+        source, target = rng.sample(person_ids, 2)
+        one = count_expansions(degrees.shortest_path, source, target)
+        two = count_expansions(degrees.bidirectional_shortest_path, source, target)
+        if one[1] != two[1]:
+            raise AssertionError(f"path lengths differ for {source} -> {target}")
+        results.setdefault(one[1], []).append((one, two))
+
+    print("degrees  queries  bfs expanded  bidi expanded   bfs ms  bidi ms")
+    for length in sorted(results, key=lambda n: (n is None, n)):
+        rows = results[length]
+        n = len(rows)
+        print(f"{str(length):>7}  {n:>7}"
+              f"  {sum(r[0][2] for r in rows) / n:>12.0f}"
+              f"  {sum(r[1][2] for r in rows) / n:>13.0f}"
+              f"  {sum(r[0][0] for r in rows) / n * 1000:>7.1f}"
+              f"  {sum(r[1][0] for r in rows) / n * 1000:>7.1f}")
+
+
+def bench_memory(args):
+    """
+    Compare load time, resident size and query latency of the dict
+    tables and the CompactGraph backend on the same synthetic CSVs.
+    """
+    person_ids = synthetic_graph(args.edges, args.stars, args.movies, seed=args.seed)
+    rng = random.Random(args.seed + 1)
+    queries = [rng.sample(person_ids, 2) for _ in range(args.queries)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_csv(directory)
+        for compact in (False, True):
+            degrees.graph = None
+            degrees.names, degrees.people, degrees.movies = {}, {}, {}
+
+            tracemalloc.start()
+            start = time.perf_counter()
+            degrees.load_data(directory, compact=compact)
+            load = time.perf_counter() - start
+            size, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            start = time.perf_counter()
+            for source, target in queries:
+                degrees.shortest_path(source, target, bidirectional=True)
+            query = (time.perf_counter() - start) / len(queries)
+
+            print(f"{'compact' if compact else 'dicts':>7}"
+                  f"  load {load:6.2f} s"
+                  f"  resident {size / 2 ** 20:8.1f} MiB"
+                  f"  query {query * 1000:8.2f} ms")
+
+
+def bench_landmarks(args):
+    """
+    Compare per-query latency of plain BFS, bidirectional BFS and the
+    landmark oracle (bounds only, exact distance, and paths from its
+    landmark-pruned bidirectional BFS), and the oracle's memory against
+    the compact graph it indexes.
+    """
+    person_ids = synthetic_graph(args.edges, args.stars, args.movies, seed=args.seed)
+    rng = random.Random(args.seed + 1)
+    queries = [rng.sample(person_ids, 2) for _ in range(args.queries)]
+
+    tracemalloc.start()
+    graph = CompactGraph.from_tables(degrees.people, degrees.movies)
+    graph_size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    oracle = LandmarkOracle.build(graph, args.k)
+    print(f"built {args.k} landmarks in {time.perf_counter() - start:.2f} s: "
+          f"{oracle.nbytes() / 2 ** 20:.1f} MiB of distances "
+          f"vs {graph_size / 2 ** 20:.1f} MiB compact graph")
+
+    searches = {
+        "shortest_path": lambda s, t: degrees.shortest_path(s, t),
+        "bidirectional": lambda s, t: degrees.shortest_path(s, t, bidirectional=True),
+        "oracle bounds": oracle.bounds,
+        "oracle distance": oracle.distance,
+        "oracle pruned BFS": oracle.shortest_path,
+    }
+    answers = {}
+    for label, search in searches.items():
+        start = time.perf_counter()
+        answers[label] = [search(source, target) for source, target in queries]
+        per_query = (time.perf_counter() - start) / len(queries)
+        print(f"{label:>17}  {per_query * 1000:10.3f} ms/query")
+
+    lengths = [None if path is None else len(path) for path in answers["shortest_path"]]
+    if lengths != answers["oracle distance"] or lengths != [
+        None if path is None else len(path) for path in answers["oracle pruned BFS"]
+    ]:
+        raise AssertionError("oracle disagrees with shortest_path")
+    exact = sum(1 for b in answers["oracle bounds"] if b is None or b[0] == b[1])
+    print(f"bounds alone were exact for {exact}/{len(queries)} queries")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for degrees.py")
+    parser.add_argument("--seed", type=int, default=0)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    frontier = commands.add_parser("frontier", help="list vs deque frontier")
+    frontier.add_argument("--edges", type=int, default=1_000_000,
+                          help="largest synthetic graph, in person-movie edges")
+    frontier.add_argument("--start", type=int, default=1_000,
+                          help="smallest synthetic graph, in person-movie edges")
+    frontier.add_argument("--legacy-limit", type=int, default=10_000,
+                          help="largest graph to run the list frontier on")
+    frontier.set_defaults(run=bench_frontier)
+
+    bidirectional = commands.add_parser("bidirectional",
+                                        help="one-sided vs bidirectional BFS")
+    bidirectional.add_argument("--edges", type=int, default=1_000_000)
+    bidirectional.add_argument("--stars", type=int, default=4,
+                               help="stars per synthetic movie")
+    bidirectional.add_argument("--movies", type=int, default=2,
+                               help="movies per synthetic person")
+    bidirectional.add_argument("--queries", type=int, default=20)
+    bidirectional.set_defaults(run=bench_bidirectional)
+
+    memory = commands.add_parser("memory", help="dict tables vs CompactGraph")
+    memory.add_argument("--edges", type=int, default=1_000_000)
+    memory.add_argument("--stars", type=int, default=4)
+    memory.add_argument("--movies", type=int, default=2)
+    memory.add_argument("--queries", type=int, default=20)
+    memory.set_defaults(run=bench_memory)
+
+    landmarks = commands.add_parser("landmarks", help="BFS vs landmark oracle")
+    landmarks.add_argument("--edges", type=int, default=1_000_000)
+    landmarks.add_argument("--stars", type=int, default=4)
+    landmarks.add_argument("--movies", type=int, default=2)
+    landmarks.add_argument("--queries", type=int, default=20)
+    landmarks.add_argument("-k", type=int, default=16, help="number of landmarks")
+    landmarks.set_defaults(run=bench_landmarks)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
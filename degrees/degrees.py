@@ -1,7 +1,18 @@
+import argparse
 import csv
+import json
+import multiprocessing
+import os
 import sys
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
 
-from util import Node, StackFrontier, QueueFrontier
+from distances import DistanceCache, DistanceTable, bfs
+from graph import CompactGraph, MovieTable, NameTable, PersonTable, cached_graph, csv_stamp
+from landmarks import LANDMARKS, LandmarkOracle
+from lookup import NameIndex, split_birth
+from util import Node, StackFrontier, QueueFrontier, DequeQueueFrontier
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,11 +23,42 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# CompactGraph backing the tables above when loaded with compact=True
+graph = None
 
-def load_data(directory):
+# NameIndex over `people`, built on first fuzzy or prefix lookup
+name_index = None
+
+# Dense integer index over the dict tables, built on first distance table
+dense_index = None
+
+# LandmarkOracle answering path queries when loaded with --landmarks
+oracle = None
+
+
+def load_data(directory, compact=False, snapshot=False):
     """
     Load data from CSV files into memory.
+
+    If `compact` is true, the data is held in an integer-indexed
+    CompactGraph and `names`, `people` and `movies` become read-only
+    views over it. If `snapshot` is true, the CompactGraph is memory-mapped
+    from a snapshot next to the CSVs, which is rebuilt when stale.
     """
+    global names, people, movies, graph, name_index, dense_index, oracle
+    name_index = None
+    dense_index = None
+    oracle = None
+    if compact or snapshot:
+        graph = cached_graph(directory) if snapshot else CompactGraph.from_csv(directory)
+        names = NameTable(graph)
+        people = PersonTable(graph)
+        movies = MovieTable(graph)
+        return
+    if graph is not None:
+        graph = None
+        names, people, movies = {}, {}, {}
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f: 
         reader = csv.DictReader(f) # DictReader is a class that reads a csv file and returns a dictionary for each row
@@ -53,23 +95,66 @@ def load_data(directory):
 
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--bidirectional", action="store_true",
+                        help="search from both people at once")
+    parser.add_argument("--compact", action="store_true",
+                        help="hold the graph in integer-indexed CSR arrays")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="memory-map a compact graph snapshot cached next to the CSVs")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="answer query pairs from FILE ('-' for stdin) as JSONL")
+    parser.add_argument("--serve", metavar="PORT", type=int,
+                        help="answer queries over HTTP on localhost:PORT")
+    parser.add_argument("--landmarks", action="store_true",
+                        help=f"answer with the oracle from `python landmarks.py` ({LANDMARKS})")
+    parser.add_argument("--histogram", action="store_true",
+                        help="print how many people are at each distance from one person")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="processes answering batch or server queries")
+    args = parser.parse_args()
+    directory = args.directory
+
+    # Load data from files into memory; keep stdout clean for batch output
+    log = sys.stderr if args.batch or args.serve else sys.stdout
+    print("Loading data...", file=log)
+    load_data(directory, compact=args.compact, snapshot=args.snapshot)
+    print("Data loaded.", file=log)
 
-    # Load data from files into memory
-    print("Loading data...")
-    load_data(directory)
-    print("Data loaded.")
+    if args.landmarks:
+        try:
+            load_oracle(directory)
+        except (OSError, ValueError) as e:
+            sys.exit(f"Cannot use landmarks: {e}")
+
+    if args.batch:
+        with (sys.stdin if args.batch == "-" else open(args.batch, encoding="utf-8")) as f:
+            run_batch(f, sys.stdout, workers=args.workers)
+        return
+    if args.serve:
+        serve(args.serve, workers=args.workers)
+        return
 
     source = person_id_for_name(input("Name: "))
     if source is None:
         sys.exit("Person not found.")
+
+    if args.histogram:
+        cache = DistanceCache(os.path.join(directory, "distances"), stamp=csv_stamp(directory))
+        table = distances_from(source, cache=cache)
+        for distance, count in sorted(table.histogram().items()):
+            print(f"{distance}: {count}")
+        return
+
     target = person_id_for_name(input("Name: "))
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    if oracle is not None:
+        path = oracle.shortest_path(source, target)
+    else:
+        path = shortest_path(source, target, bidirectional=args.bidirectional)
 
     if path is None:
         print("Not connected.")
@@ -84,13 +169,23 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, bidirectional=False):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target.
+
+    If no possible path, returns None.
+    If `bidirectional` is true, searches from both ends at once.
+    """
+    if bidirectional:
+        return bidirectional_shortest_path(source, target)
+
     start = Node(state=source, parent=None, action=None) 
     # State - the current state of the problem (source & target -> person_id)
     # Parent - the node that generated the current node
     # Action - the action taken to generate the current node (movie_id)
 
-    frontier = QueueFrontier() # Breadth-first search -> BFS -> QueueFrontier -> First in first out (FIFO)
+    frontier = DequeQueueFrontier() # Breadth-first search -> BFS -> QueueFrontier -> First in first out (FIFO), O(1) pops and lookups
     frontier.add(start) # Add the start node to the frontier
 
     explored = set() # Create a set to keep track of the explored people
@@ -119,8 +214,189 @@ def shortest_path(source, target):
                 child = Node(state=person_id, parent=node, action=movie_id)
                 frontier.add(child)
 
-    
-    
+
+def bidirectional_shortest_path(source, target):
+    """
+    Returns the same path as `shortest_path`, but grows a BFS layer
+    from the source and from the target in turn, always expanding the
+    smaller of the two frontiers, until the searches meet.
+    """
+    if source == target:
+        return []
+
+    # Maps each reached person_id to the (movie_id, person_id) pair it was
+    # reached from, walking back towards the source (forward) or target (backward)
+    forward = {source: None}
+    backward = {target: None}
+    forward_layer = [source]
+    backward_layer = [target]
+
+    while forward_layer and backward_layer:
+        # Expand whichever side has the smaller frontier
+        expand_forward = len(forward_layer) <= len(backward_layer)
+        if expand_forward:
+            layer, parents, others = forward_layer, forward, backward
+        else:
+            layer, parents, others = backward_layer, backward, forward
+
+        next_layer = []
+        meeting = None
+        for person_id in layer:
+            for movie_id, neighbor in neighbors_for_person(person_id):
+                if neighbor in parents:
+                    continue
+                parents[neighbor] = (movie_id, person_id)
+                next_layer.append(neighbor)
+                # The first meeting in a layer is as short as any other
+                if meeting is None and neighbor in others:
+                    meeting = neighbor
+
+        if meeting is not None:
+            return _join_paths(forward, backward, meeting)
+
+        if expand_forward:
+            forward_layer = next_layer
+        else:
+            backward_layer = next_layer
+
+    return None
+
+
+def _join_paths(forward, backward, meeting):
+    """
+    Builds the (movie_id, person_id) path through `meeting` from the
+    parent maps of a bidirectional search.
+    """
+    path = []
+    person_id = meeting
+    while forward[person_id] is not None:
+        movie_id, previous = forward[person_id]
+        path.append((movie_id, person_id))
+        person_id = previous
+    path.reverse()
+
+    person_id = meeting
+    while backward[person_id] is not None:
+        movie_id, following = backward[person_id]
+        path.append((movie_id, following))
+        person_id = following
+    return path
+
+
+
+def compact_graph():
+    """
+    Returns the loaded data as a CompactGraph, converting the dict
+    tables if they were loaded without `compact`.
+    """
+    if graph is not None:
+        return graph
+    return CompactGraph.from_tables(people, movies)
+
+
+def load_oracle(directory):
+    """
+    Loads the LandmarkOracle saved next to the CSVs in `directory`, so
+    that interactive, batch and server queries are answered with it.
+    Raises ValueError if it is not for this graph or older than the CSVs.
+    """
+    global oracle
+    oracle = LandmarkOracle.load(compact_graph(), os.path.join(directory, LANDMARKS),
+                                 stamp=csv_stamp(directory))
+    return oracle
+
+
+def distances_from(source, cache=None):
+    """
+    Runs one BFS from the source and returns a DistanceTable of every
+    person's degrees of separation from them, from which any path
+    out of the source can be rebuilt without searching again.
+
+    If a DistanceCache is given, tables for repeated sources come from it.
+    """
+    if graph is not None:
+        person_ids, person_index, movie_ids = graph.person_ids, graph.person_index, graph.movie_ids
+        movies_of, stars_of = graph.movies_of, graph.stars_of
+    else:
+        person_ids, person_index, movie_ids, movies_of, stars_of = get_dense_index()
+
+    def compute(source):
+        return bfs(person_index[source], len(person_ids), len(movie_ids), movies_of, stars_of)
+
+    result = compute(source) if cache is None else cache.get(source, compute)
+    return DistanceTable(source, *result, person_ids, person_index, movie_ids)
+
+
+def get_dense_index():
+    """
+    Returns (person_ids, person_index, movie_ids, movies_of, stars_of)
+    indexing the dict tables densely for `bfs`, building the index the
+    first time it is needed after a load.
+    """
+    global dense_index
+    if dense_index is None:
+        person_ids, movie_ids = list(people), list(movies)
+        person_index = {person_id: i for i, person_id in enumerate(person_ids)}
+        movie_index = {movie_id: i for i, movie_id in enumerate(movie_ids)}
+
+        def movies_of(p):
+            return [movie_index[movie_id] for movie_id in people[person_ids[p]]["movies"]]
+
+        def stars_of(m):
+            return [person_index[person_id] for person_id in movies[movie_ids[m]]["stars"]]
+
+        dense_index = (person_ids, person_index, movie_ids, movies_of, stars_of)
+    return dense_index
+
+
+def get_name_index():
+    """
+    Returns the NameIndex over everyone loaded, building it the first
+    time it is needed. People in more movies rank higher.
+    """
+    global name_index
+    if name_index is None:
+        if graph is not None:
+            offsets = graph.person_offsets
+            weights = array("i", (offsets[p + 1] - offsets[p] for p in range(len(graph.person_ids))))
+            name_index = NameIndex(graph.person_ids, graph.person_names, graph.person_births, weights)
+        else:
+            person_ids = list(people)
+            name_index = NameIndex(
+                person_ids,
+                [people[person_id]["name"] for person_id in person_ids],
+                [people[person_id]["birth"] for person_id in person_ids],
+                array("i", (len(people[person_id]["movies"]) for person_id in person_ids))
+            )
+    return name_index
+
+
+def person_ids_for_name(name, birth=None):
+    """
+    Returns the person_ids matching a name, exactly if possible and
+    otherwise ignoring accents. A birth year, given as `birth` or as a
+    trailing "(year)" on the name, narrows the matches.
+    """
+    name, year = split_birth(name)
+    birth = birth or year
+    person_ids = sorted(names.get(name.lower(), set()))
+    if birth is not None:
+        person_ids = [person_id for person_id in person_ids if people[person_id]["birth"] == birth]
+    if not person_ids:
+        person_ids = get_name_index().lookup(name, birth)
+    return person_ids
+
+
+def suggest_names(name, limit=5):
+    """
+    Returns "Name (birth)" strings for the people whose names most
+    closely match a name that was not found.
+    """
+    suggestions = []
+    for _, person_id in get_name_index().search(name, limit=limit):
+        person = people[person_id]
+        suggestions.append(f"{person['name']} ({person['birth']})" if person["birth"] else person["name"])
+    return suggestions
 
 
 def person_id_for_name(name):
@@ -128,8 +404,11 @@ def person_id_for_name(name):
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
     """
-    person_ids = list(names.get(name.lower(), set()))
+    person_ids = person_ids_for_name(name)
     if len(person_ids) == 0:
+        suggestions = suggest_names(name)
+        if suggestions:
+            print(f"Did you mean: {', '.join(suggestions)}?")
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
@@ -154,6 +433,9 @@ def neighbors_for_person(person_id):
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        return graph.neighbors_for_person(person_id)
+
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
@@ -162,5 +444,161 @@ def neighbors_for_person(person_id):
     return neighbors
 
 
+def resolve_person(name, birth=None):
+    """
+    Returns (person_id, error) for a name without prompting, using a
+    birth year (`birth`, or "Name (year)") to disambiguate. An error
+    message, with suggestions, is returned if the name is unknown or
+    still ambiguous.
+    """
+    person_ids = person_ids_for_name(name, birth)
+    if len(person_ids) == 0:
+        suggestions = suggest_names(name)
+        if suggestions:
+            return None, f"Person not found: {name}. Did you mean: {', '.join(suggestions)}?"
+        return None, f"Person not found: {name}"
+    elif len(person_ids) > 1:
+        return None, f"Ambiguous name: {name} ({', '.join(person_ids)}); add a birth year"
+    return person_ids[0], None
+
+
+def answer_query(query):
+    """
+    Answers one {"source": name, "target": name} query with a
+    JSON-serialisable dict of the degrees and path, or an error.
+    Optional "source_birth" and "target_birth" years disambiguate names.
+    """
+    result = {"source": query.get("source"), "target": query.get("target")}
+    if not isinstance(result["source"], str) or not isinstance(result["target"], str):
+        result["error"] = "Query needs 'source' and 'target' names"
+        return result
+    births = [query.get("source_birth"), query.get("target_birth")]
+    for i, birth in enumerate(births):
+        # Years may come as JSON numbers; the CSVs hold them as strings
+        if isinstance(birth, int) and not isinstance(birth, bool):
+            births[i] = str(birth)
+        elif birth is not None and not isinstance(birth, str):
+            result["error"] = "Birth years must be years, e.g. 1981"
+            return result
+
+    source, error = resolve_person(result["source"], births[0])
+    if error is None:
+        target, error = resolve_person(result["target"], births[1])
+    if error is not None:
+        result["error"] = error
+        return result
+
+    if oracle is not None:
+        path = oracle.shortest_path(source, target)
+    else:
+        path = shortest_path(source, target, bidirectional=True)
+    if path is None:
+        result["degrees"] = None
+        result["path"] = None
+        return result
+
+    result["degrees"] = len(path)
+    result["path"] = [
+        {
+            "movie_id": movie_id,
+            "movie": movies[movie_id]["title"],
+            "person_id": person_id,
+            "person": people[person_id]["name"]
+        }
+        for movie_id, person_id in path
+    ]
+    return result
+
+
+def parse_query(line):
+    """
+    Parses a query line: a JSON object with "source" and "target",
+    or two names separated by a tab.
+    """
+    line = line.strip()
+    if line.startswith("{"):
+        try:
+            query = json.loads(line)
+        except json.JSONDecodeError:
+            query = None
+        return query if isinstance(query, dict) else {"source": None, "target": None}
+    source, _, target = line.partition("\t")
+    return {"source": source, "target": target}
+
+
+def query_pool(workers):
+    """
+    Returns a process pool for answering queries, or None for one worker.
+    Forked workers share the loaded graph with this process (and with a
+    snapshot, its memory-mapped pages) instead of loading their own copy.
+    """
+    if workers is None or workers <= 1:
+        return None
+    methods = multiprocessing.get_all_start_methods()
+    if "fork" not in methods:
+        return None
+    # Build the name index once here rather than once per worker
+    get_name_index()
+    return multiprocessing.get_context("fork").Pool(workers)
+
+
+def run_batch(lines, out, workers=None):
+    """
+    Answers every query in `lines`, writing one JSON result per line
+    to `out` in input order.
+    """
+    queries = (parse_query(line) for line in lines if line.strip())
+    pool = query_pool(workers)
+    try:
+        results = pool.imap(answer_query, queries, chunksize=16) if pool else map(answer_query, queries)
+        for result in results:
+            out.write(json.dumps(result) + "\n")
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+
+def serve(port, workers=None):
+    """
+    Keeps the graph resident and answers `GET /path?source=...&target=...`
+    (with optional `source_birth` and `target_birth` years) on
+    localhost:`port` with the JSON result of `answer_query`.
+    """
+    pool = query_pool(workers)
+
+    class QueryHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != "/path":
+                self.send_error(404)
+                return
+            params = parse_qs(url.query)
+            keys = ("source", "target", "source_birth", "target_birth")
+            query = {key: params[key][0] for key in keys if key in params}
+            if pool is not None:
+                result = pool.apply(answer_query, (query,))
+            else:
+                result = answer_query(query)
+            body = json.dumps(result).encode()
+            self.send_response(400 if "error" in result else 200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), QueryHandler)
+    print(f"Serving on http://127.0.0.1:{port}/path", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+
 if __name__ == "__main__":
     main()
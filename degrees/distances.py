@@ -0,0 +1,175 @@
+import os
+import struct
+from array import array
+from collections import Counter, OrderedDict
+from urllib.parse import quote
+
+# Magic bytes and header (magic, CSV stamp, people count) of a cached result
+MAGIC = b"DEGDIST1"
+HEADER = struct.Struct("<8sdq")
+
+# Marks people not reachable from the source in `distances` and `parents`
+UNREACHED = -1
+
+
+class DistanceTable():
+    """
+    Result of one BFS from a source person: for every person index,
+    `distances[p]` is their degree of separation from the source (or
+    UNREACHED), and `parents[p]`/`parent_movies[p]` is the person and
+    movie they were reached through, so any path can be rebuilt by
+    walking back in O(path length).
+    """
+
+    def __init__(self, source, distances, parents, parent_movies,
+                 person_ids, person_index, movie_ids):
+        self.source = source
+        self.distances = distances
+        self.parents = parents
+        self.parent_movies = parent_movies
+        self.person_ids = person_ids
+        self.person_index = person_index
+        self.movie_ids = movie_ids
+
+    def distance(self, person_id):
+        """Returns the degrees between the source and a person, or None."""
+        d = self.distances[self.person_index[person_id]]
+        return None if d == UNREACHED else d
+
+    def path_to(self, person_id):
+        """
+        Returns the (movie_id, person_id) path from the source to a person,
+        as `shortest_path` would, or None if they are not connected.
+        """
+        p = self.person_index[person_id]
+        if self.distances[p] == UNREACHED:
+            return None
+        path = []
+        while self.parents[p] != UNREACHED:
+            path.append((self.movie_ids[self.parent_movies[p]], self.person_ids[p]))
+            p = self.parents[p]
+        path.reverse()
+        return path
+
+    def histogram(self):
+        """Returns a Counter of how many people are at each distance."""
+        counts = Counter(self.distances)
+        counts.pop(UNREACHED, None)
+        return counts
+
+
+def bfs(source, n_people, n_movies, movies_of, stars_of):
+    """
+    Breadth-first search from person index `source` over people and
+    movies indexed 0..n-1. Each movie is expanded once, the first time
+    one of its stars is dequeued, so the search is O(people + edges).
+
+    Returns (distances, parents, parent_movies) int arrays.
+    """
+    distances = array("i", [UNREACHED]) * n_people
+    parents = array("i", [UNREACHED]) * n_people
+    parent_movies = array("i", [UNREACHED]) * n_people
+    seen_movies = bytearray(n_movies)
+
+    distances[source] = 0
+    layer = [source]
+    depth = 0
+    while layer:
+        depth += 1
+        next_layer = []
+        for p in layer:
+            for m in movies_of(p):
+                if seen_movies[m]:
+                    continue
+                seen_movies[m] = 1
+                for q in stars_of(m):
+                    if distances[q] == UNREACHED:
+                        distances[q] = depth
+                        parents[q] = p
+                        parent_movies[q] = m
+                        next_layer.append(q)
+        layer = next_layer
+    return distances, parents, parent_movies
+
+
+class DistanceCache():
+    """
+    LRU cache of BFS results for popular sources. Up to `capacity`
+    results are kept in memory and, if `directory` is given, persisted
+    there too; the least recently used file is evicted past `capacity`.
+    Persisted results carry `stamp` (e.g. the newest CSV mtime) and are
+    ignored once it changes.
+    """
+
+    def __init__(self, directory=None, capacity=16, stamp=0.0):
+        self.directory = directory
+        self.capacity = capacity
+        self.stamp = stamp
+        self.results = OrderedDict()
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def get(self, source, compute):
+        """
+        Returns the (distances, parents, parent_movies) arrays for
+        `source`, calling `compute(source)` to build them on a miss.
+        """
+        if source in self.results:
+            self.results.move_to_end(source)
+            return self.results[source]
+
+        result = self.read(source)
+        if result is None:
+            result = compute(source)
+            if self.directory is not None:
+                self.write(source, result)
+        self.results[source] = result
+        if len(self.results) > self.capacity:
+            self.results.popitem(last=False)
+        return result
+
+    def path(self, source):
+        """Returns the file a source's result is persisted in."""
+        return os.path.join(self.directory, f"{quote(source, safe='')}.dist")
+
+    def read(self, source):
+        """Loads a persisted result, or returns None if missing or stale."""
+        if self.directory is None:
+            return None
+        path = self.path(source)
+        try:
+            with open(path, "rb") as f:
+                magic, stamp, n = HEADER.unpack(f.read(HEADER.size))
+                if magic != MAGIC or stamp != self.stamp:
+                    return None
+                result = []
+                for _ in range(3):
+                    values = array("i")
+                    values.fromfile(f, n)
+                    result.append(values)
+            # Reading counts as a use for eviction
+            os.utime(path)
+        except (OSError, EOFError, struct.error):
+            return None
+        return tuple(result)
+
+    def write(self, source, result):
+        """Persists a result, then evicts least recently used files."""
+        path = self.path(source)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(HEADER.pack(MAGIC, self.stamp, len(result[0])))
+            for values in result:
+                values.tofile(f)
+        os.replace(temporary, path)
+
+        files = [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory) if name.endswith(".dist")
+        ]
+        files.sort(key=os.path.getmtime)
+        for stale in files[:max(0, len(files) - self.capacity)]:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
@@ -0,0 +1,467 @@
+import bisect
+import csv
+import json
+import mmap
+import os
+import struct
+from array import array
+from collections.abc import Mapping, Sequence
+
+# Snapshot file written next to the CSVs, and the magic bytes it starts with
+SNAPSHOT = "degrees.snapshot"
+MAGIC = b"DEGSNAP1"
+
+# Integer columns of a snapshot
+ARRAY_COLUMNS = (
+    "person_offsets", "person_movies", "movie_offsets", "movie_people",
+    "person_order", "movie_order", "name_order"
+)
+
+# String columns of a snapshot
+STRING_COLUMNS = (
+    "person_ids", "person_names", "person_births",
+    "movie_ids", "movie_titles", "movie_years"
+)
+
+
+class CompactGraph():
+    """
+    Co-star graph with person and movie ids interned to dense ints.
+
+    Person -> movie and movie -> person adjacency are stored in CSR form:
+    the movies of person `p` are `person_movies[person_offsets[p]:person_offsets[p + 1]]`,
+    and the stars of movie `m` are `movie_people[movie_offsets[m]:movie_offsets[m + 1]]`.
+    """
+
+    def __init__(self, person_ids, person_names, person_births,
+                 movie_ids, movie_titles, movie_years,
+                 person_offsets, person_movies, movie_offsets, movie_people,
+                 person_index=None, movie_index=None, name_index=None):
+        self.person_ids = person_ids
+        self.person_names = person_names
+        self.person_births = person_births
+        self.movie_ids = movie_ids
+        self.movie_titles = movie_titles
+        self.movie_years = movie_years
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_people = movie_people
+
+        # Snapshots pass in sorted indexes; otherwise build hashed ones
+        if person_index is None:
+            person_index = {person_id: i for i, person_id in enumerate(person_ids)}
+        if movie_index is None:
+            movie_index = {movie_id: i for i, movie_id in enumerate(movie_ids)}
+        self.person_index = person_index
+        self.movie_index = movie_index
+        if name_index is not None:
+            self.name_index = name_index
+            return
+
+        # Maps lowercase names to a person index, or a tuple of them if
+        # shared; shared names collect in lists first
+        self.name_index = {}
+        shared = []
+        for i, name in enumerate(person_names):
+            key = name.lower()
+            found = self.name_index.get(key)
+            if found is None:
+                self.name_index[key] = i
+            elif isinstance(found, list):
+                found.append(i)
+            else:
+                self.name_index[key] = [found, i]
+                shared.append(key)
+        for key in shared:
+            self.name_index[key] = tuple(self.name_index[key])
+
+    @classmethod
+    def from_csv(cls, directory):
+        """
+        Build a graph from the `people.csv`, `movies.csv` and `stars.csv`
+        files in `directory`, without materialising per-row dicts or sets.
+        """
+        person_ids, person_names, person_births = [], [], []
+        with open(f"{directory}/people.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                person_ids.append(row["id"])
+                person_names.append(row["name"])
+                person_births.append(row["birth"])
+
+        movie_ids, movie_titles, movie_years = [], [], []
+        with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                movie_ids.append(row["id"])
+                movie_titles.append(row["title"])
+                movie_years.append(row["year"])
+
+        person_index = {person_id: i for i, person_id in enumerate(person_ids)}
+        movie_index = {movie_id: i for i, movie_id in enumerate(movie_ids)}
+
+        # Edges as two parallel int arrays; rows naming unknown ids are skipped
+        edge_people, edge_movies = array("i"), array("i")
+        with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                p = person_index.get(row["person_id"])
+                m = movie_index.get(row["movie_id"])
+                if p is not None and m is not None:
+                    edge_people.append(p)
+                    edge_movies.append(m)
+        del person_index, movie_index
+
+        person_offsets, person_movies = csr(len(person_ids), edge_people, edge_movies)
+        movie_offsets, movie_people = csr(len(movie_ids), edge_movies, edge_people)
+
+        return cls(person_ids, person_names, person_births,
+                   movie_ids, movie_titles, movie_years,
+                   person_offsets, person_movies, movie_offsets, movie_people)
+
+    @classmethod
+    def from_tables(cls, people, movies):
+        """
+        Build a graph from `people` and `movies` dicts shaped like the
+        tables `degrees.load_data` fills.
+        """
+        person_ids, movie_ids = list(people), list(movies)
+        person_index = {person_id: i for i, person_id in enumerate(person_ids)}
+        edge_people, edge_movies = array("i"), array("i")
+        for m, movie_id in enumerate(movie_ids):
+            for person_id in movies[movie_id]["stars"]:
+                edge_people.append(person_index[person_id])
+                edge_movies.append(m)
+
+        person_offsets, person_movies = csr(len(person_ids), edge_people, edge_movies)
+        movie_offsets, movie_people = csr(len(movie_ids), edge_movies, edge_people)
+
+        return cls(person_ids,
+                   [people[person_id]["name"] for person_id in person_ids],
+                   [people[person_id]["birth"] for person_id in person_ids],
+                   movie_ids,
+                   [movies[movie_id]["title"] for movie_id in movie_ids],
+                   [movies[movie_id]["year"] for movie_id in movie_ids],
+                   person_offsets, person_movies, movie_offsets, movie_people,
+                   person_index=person_index)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Open a snapshot written by `save`. Every column stays in the
+        read-only memory map, so processes loading the same snapshot
+        share its pages and nothing is parsed up front.
+        """
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(buffer)
+        if view[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a degrees snapshot")
+        (start,) = struct.unpack("<Q", view[-8:])
+        header = json.loads(bytes(view[start:-8]))
+
+        def column(name):
+            typecode, offset, nbytes = header[name]
+            return view[offset:offset + nbytes].cast(typecode)
+
+        arrays = {name: column(name) for name in ARRAY_COLUMNS}
+        strings = {
+            name: StringColumn(column(f"{name}.data"), column(f"{name}.offsets"))
+            for name in STRING_COLUMNS
+        }
+        person_names = strings["person_names"]
+        return cls(
+            strings["person_ids"], person_names, strings["person_births"],
+            strings["movie_ids"], strings["movie_titles"], strings["movie_years"],
+            arrays["person_offsets"], arrays["person_movies"],
+            arrays["movie_offsets"], arrays["movie_people"],
+            person_index=SortedIndex(arrays["person_order"], strings["person_ids"].__getitem__),
+            movie_index=SortedIndex(arrays["movie_order"], strings["movie_ids"].__getitem__),
+            name_index=SortedIndex(arrays["name_order"], lambda p: person_names[p].lower())
+        )
+
+    def save(self, path):
+        """
+        Write the graph to `path` as a columnar snapshot of raw array
+        data plus a JSON header locating each column. The file is written
+        to a temporary name and renamed into place.
+        """
+        columns = {
+            "person_offsets": array("q", self.person_offsets),
+            "person_movies": array("i", self.person_movies),
+            "movie_offsets": array("q", self.movie_offsets),
+            "movie_people": array("i", self.movie_people),
+            "person_order": sorted_order(self.person_ids),
+            "movie_order": sorted_order(self.movie_ids),
+            "name_order": sorted_order([name.lower() for name in self.person_names]),
+        }
+        for name in STRING_COLUMNS:
+            data, offsets = encode_strings(getattr(self, name))
+            columns[f"{name}.data"] = data
+            columns[f"{name}.offsets"] = offsets
+
+        # Columns follow the magic bytes, each 8-byte aligned; the JSON
+        # header of their offsets comes last, followed by its own offset
+        header, offset = {}, align(len(MAGIC))
+        for name, values in columns.items():
+            nbytes = len(values) * values.itemsize
+            header[name] = [values.typecode, offset, nbytes]
+            offset += align(nbytes)
+
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(MAGIC)
+            for name, values in columns.items():
+                f.seek(header[name][1])
+                values.tofile(f)
+            f.seek(offset)
+            f.write(json.dumps(header).encode())
+            f.write(struct.pack("<Q", offset))
+        os.replace(temporary, path)
+
+    def movies_of(self, p):
+        """Returns the movie indices person `p` starred in."""
+        return self.person_movies[self.person_offsets[p]:self.person_offsets[p + 1]]
+
+    def stars_of(self, m):
+        """Returns the person indices that starred in movie `m`."""
+        return self.movie_people[self.movie_offsets[m]:self.movie_offsets[m + 1]]
+
+    def neighbors(self, p):
+        """
+        Yields (movie, person) index pairs for people who starred
+        with person `p`, including `p` itself.
+        """
+        movie_offsets = self.movie_offsets
+        movie_people = self.movie_people
+        for m in self.movies_of(p):
+            for q in movie_people[movie_offsets[m]:movie_offsets[m + 1]]:
+                yield m, q
+
+    def neighbors_for_person(self, person_id):
+        """
+        Returns (movie_id, person_id) pairs for people who starred
+        with a given person, like `degrees.neighbors_for_person`.
+        """
+        movie_ids = self.movie_ids
+        person_ids = self.person_ids
+        return {
+            (movie_ids[m], person_ids[q])
+            for m, q in self.neighbors(self.person_index[person_id])
+        }
+
+
+def csr(n, sources, targets):
+    """
+    Group the edges `sources[i] -> targets[i]` by source into CSR
+    `(offsets, indices)` arrays over `n` sources, dropping duplicate edges.
+    """
+    counts = array("q", bytes(8 * (n + 1)))
+    for s in sources:
+        counts[s + 1] += 1
+    for i in range(n):
+        counts[i + 1] += counts[i]
+
+    indices = array("i", bytes(4 * len(sources)))
+    fill = array("q", counts)
+    for s, t in zip(sources, targets):
+        indices[fill[s]] = t
+        fill[s] += 1
+    del fill
+
+    # Sort each row and squeeze out duplicates in place
+    offsets = array("q", bytes(8 * (n + 1)))
+    write = 0
+    for s in range(n):
+        row = sorted(set(indices[counts[s]:counts[s + 1]]))
+        indices[write:write + len(row)] = array("i", row)
+        write += len(row)
+        offsets[s + 1] = write
+    del indices[write:]
+    return offsets, indices
+
+
+def align(n):
+    """Rounds `n` up to a multiple of 8 bytes."""
+    return (n + 7) & ~7
+
+
+def sorted_order(keys):
+    """Returns an int array of the indices of `keys` in sorted key order."""
+    return array("i", sorted(range(len(keys)), key=keys.__getitem__))
+
+
+def encode_strings(strings):
+    """
+    Encode `strings` as one UTF-8 byte array plus an array of
+    offsets, where string `i` is `data[offsets[i]:offsets[i + 1]]`.
+    """
+    data = array("B")
+    offsets = array("q", [0])
+    for string in strings:
+        data.frombytes(string.encode("utf-8"))
+        offsets.append(len(data))
+    return data, offsets
+
+
+def csv_stamp(directory):
+    """
+    Returns the newest modification time of the CSVs in `directory`,
+    which stamps everything derived from them.
+    """
+    return max(os.path.getmtime(os.path.join(directory, f"{name}.csv"))
+               for name in ("people", "movies", "stars"))
+
+
+def cached_graph(directory):
+    """
+    Return the CompactGraph for the CSVs in `directory`, loading it from
+    the snapshot next to them when that is newer than every CSV, and
+    otherwise building it from the CSVs and refreshing the snapshot.
+    """
+    path = os.path.join(directory, SNAPSHOT)
+    try:
+        if os.path.getmtime(path) > csv_stamp(directory):
+            return CompactGraph.load(path)
+    except (OSError, ValueError):
+        pass
+
+    graph = CompactGraph.from_csv(directory)
+    try:
+        graph.save(path)
+    except OSError:
+        # A read-only data directory just means no snapshot
+        pass
+    return graph
+
+
+class StringColumn(Sequence):
+    """
+    Sequence of strings stored as UTF-8 bytes plus offsets,
+    decoded one item at a time on access.
+    """
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        return str(self.data[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+
+class SortedIndex(Mapping):
+    """
+    Read-only map from key to index, found by binary search over
+    `order`, an array of indices sorted by `key(index)`. Maps to an
+    int when the key is unique, and a tuple of ints otherwise.
+    """
+
+    def __init__(self, order, key):
+        self.order = order
+        self.key = key
+
+    def __getitem__(self, k):
+        lo = bisect.bisect_left(self.order, k, key=self.key)
+        hi = bisect.bisect_right(self.order, k, lo=lo, key=self.key)
+        if lo == hi:
+            raise KeyError(k)
+        if hi - lo == 1:
+            return self.order[lo]
+        return tuple(self.order[lo:hi])
+
+    def __iter__(self):
+        previous = None
+        for i in self.order:
+            k = self.key(i)
+            if k != previous:
+                yield k
+                previous = k
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+class PersonTable(Mapping):
+    """
+    Read-only view of a CompactGraph shaped like the `people` dict:
+    person_id -> {"name", "birth", "movies"}.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, person_id):
+        graph = self.graph
+        p = graph.person_index[person_id]
+        return {
+            "name": graph.person_names[p],
+            "birth": graph.person_births[p],
+            "movies": {graph.movie_ids[m] for m in graph.movies_of(p)}
+        }
+
+    def __contains__(self, person_id):
+        return person_id in self.graph.person_index
+
+    def __iter__(self):
+        return iter(self.graph.person_ids)
+
+    def __len__(self):
+        return len(self.graph.person_ids)
+
+
+class MovieTable(Mapping):
+    """
+    Read-only view of a CompactGraph shaped like the `movies` dict:
+    movie_id -> {"title", "year", "stars"}.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, movie_id):
+        graph = self.graph
+        m = graph.movie_index[movie_id]
+        return {
+            "title": graph.movie_titles[m],
+            "year": graph.movie_years[m],
+            "stars": {graph.person_ids[p] for p in graph.stars_of(m)}
+        }
+
+    def __contains__(self, movie_id):
+        return movie_id in self.graph.movie_index
+
+    def __iter__(self):
+        return iter(self.graph.movie_ids)
+
+    def __len__(self):
+        return len(self.graph.movie_ids)
+
+
+class NameTable(Mapping):
+    """
+    Read-only view of a CompactGraph shaped like the `names` dict:
+    lowercase name -> set of person_ids.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, name):
+        found = self.graph.name_index[name]
+        if not isinstance(found, tuple):
+            found = (found,)
+        return {self.graph.person_ids[p] for p in found}
+
+    def __contains__(self, name):
+        return name in self.graph.name_index
+
+    def __iter__(self):
+        return iter(self.graph.name_index)
+
+    def __len__(self):
+        return len(self.graph.name_index)
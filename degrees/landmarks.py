@@ -0,0 +1,239 @@
+import argparse
+import os
+import struct
+import sys
+import time
+from array import array
+
+from distances import UNREACHED, bfs
+from graph import cached_graph, csv_stamp
+
+# Oracle file written next to the CSVs by `python landmarks.py directory`
+LANDMARKS = "landmarks.bin"
+
+# Magic bytes and header (magic, CSV stamp, people count, landmark count)
+# of a saved oracle
+MAGIC = b"DEGLAND2"
+HEADER = struct.Struct("<8sdqq")
+
+# Stored distances are single bytes; this marks people a landmark cannot reach
+FAR = 255
+
+
+class LandmarkOracle():
+    """
+    Distance oracle over a CompactGraph built from BFS distances to a
+    few high-degree landmark people.
+
+    By the triangle inequality, for every landmark L
+        |d(L, s) - d(L, t)| <= d(s, t) <= d(s, L) + d(L, t)
+    so the stored distances bound any query without searching, and
+    prune the search for exact paths when the bounds are not tight.
+    """
+
+    def __init__(self, graph, landmarks, distances):
+        self.graph = graph
+        self.landmarks = landmarks
+        # One byte array per landmark, indexed by person
+        self.distances = distances
+
+    @classmethod
+    def build(cls, graph, k=16):
+        """
+        Preprocess `graph`: pick the `k` people with the most co-star
+        edges as landmarks and store BFS distances from each of them.
+        """
+        n_people = len(graph.person_ids)
+        n_movies = len(graph.movie_ids)
+        movie_sizes = [len(graph.stars_of(m)) for m in range(n_movies)]
+        degree = [sum(movie_sizes[m] for m in graph.movies_of(p)) for p in range(n_people)]
+        landmarks = sorted(range(n_people), key=degree.__getitem__, reverse=True)[:k]
+
+        distances = []
+        for landmark in landmarks:
+            d, _, _ = bfs(landmark, n_people, n_movies, graph.movies_of, graph.stars_of)
+            if max(d) >= FAR:
+                raise ValueError(f"distances of {FAR} or more do not fit in a byte")
+            distances.append(array("B", (FAR if x == UNREACHED else x for x in d)))
+        return cls(graph, landmarks, distances)
+
+    @classmethod
+    def load(cls, graph, path, stamp=0.0):
+        """
+        Load an oracle for `graph` written by `save`. Raises ValueError
+        if it was saved with a different `stamp` (e.g. the newest CSV
+        mtime), since stale distances could give wrong exact answers.
+        """
+        with open(path, "rb") as f:
+            magic, saved, n_people, k = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or n_people != len(graph.person_ids):
+                raise ValueError(f"{path} is not a landmark oracle for this graph")
+            if saved != stamp:
+                raise ValueError(f"{path} is out of date; rebuild it with `python landmarks.py`")
+            landmarks = array("q")
+            landmarks.fromfile(f, k)
+            distances = []
+            for _ in range(k):
+                d = array("B")
+                d.fromfile(f, n_people)
+                distances.append(d)
+        return cls(graph, list(landmarks), distances)
+
+    def save(self, path, stamp=0.0):
+        """Write the landmarks and their distance arrays to `path`, with `stamp`."""
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, stamp, len(self.graph.person_ids), len(self.landmarks)))
+            array("q", self.landmarks).tofile(f)
+            for d in self.distances:
+                d.tofile(f)
+
+    def nbytes(self):
+        """Returns the memory used by the stored distances."""
+        return sum(len(d) for d in self.distances)
+
+    def index_bounds(self, s, t):
+        """
+        Returns (lower, upper) bounds on the distance between person
+        indices `s` and `t`, or None if a landmark proves them disconnected.
+        Upper is None when no landmark reaches both.
+        """
+        lower, upper = 0, None
+        for d in self.distances:
+            ds, dt = d[s], d[t]
+            if ds == FAR or dt == FAR:
+                if ds != dt:
+                    return None
+                continue
+            lower = max(lower, abs(ds - dt))
+            if upper is None or ds + dt < upper:
+                upper = ds + dt
+        return lower, upper
+
+    def bounds(self, source, target):
+        """
+        Returns (lower, upper) bounds on the degrees between two
+        person_ids, equal when the answer is exact, or None if they are
+        not connected.
+        """
+        index = self.graph.person_index
+        return self.index_bounds(index[source], index[target])
+
+    def distance(self, source, target):
+        """
+        Returns the exact degrees between two person_ids (None if not
+        connected), searching only when the landmark bounds disagree.
+        """
+        bounds = self.bounds(source, target)
+        if bounds is None:
+            return None
+        lower, upper = bounds
+        if lower == upper:
+            return lower
+        path = self.shortest_path(source, target)
+        return None if path is None else len(path)
+
+    def shortest_path(self, source, target):
+        """
+        Returns the shortest (movie_id, person_id) path between two
+        person_ids, like `degrees.shortest_path`, or None if they are not
+        connected. Runs a bidirectional BFS that drops anyone whose depth
+        plus landmark lower bound to the far end exceeds the upper bound,
+        since no such person can lie on a shortest path.
+        """
+        graph = self.graph
+        s, t = graph.person_index[source], graph.person_index[target]
+        if s == t:
+            return []
+        bounds = self.index_bounds(s, t)
+        if bounds is None:
+            return None
+        upper = bounds[1]
+
+        forward = {s: None}
+        backward = {t: None}
+        sides = [
+            [forward, backward, [s], 0, self.lower_bound(s, t), set()],
+            [backward, forward, [t], 0, self.lower_bound(t, s), set()],
+        ]
+        while sides[0][2] and sides[1][2]:
+            # Expand whichever side has the smaller frontier
+            side = sides[0] if len(sides[0][2]) <= len(sides[1][2]) else sides[1]
+            parents, others, layer, depth, lower_bound, seen_movies = side
+            depth += 1
+            next_layer = []
+            meeting = None
+            for p in layer:
+                for m in graph.movies_of(p):
+                    if m in seen_movies:
+                        continue
+                    seen_movies.add(m)
+                    for q in graph.stars_of(m):
+                        if q in parents:
+                            continue
+                        if upper is not None and depth + lower_bound(q) > upper:
+                            continue
+                        parents[q] = (m, p)
+                        next_layer.append(q)
+                        if meeting is None and q in others:
+                            meeting = q
+            if meeting is not None:
+                return self._path(forward, meeting) + self._path(backward, meeting, reverse=True)
+            side[2], side[3] = next_layer, depth
+        return None
+
+    def lower_bound(self, s, t, active=4):
+        """
+        Returns a function giving a landmark lower bound on the distance
+        from a person index to `t`, using only the `active` landmarks
+        that bound the distance from `s` to `t` most tightly.
+        """
+        targets = sorted(
+            ((d, d[t]) for d in self.distances if d[s] != FAR and d[t] != FAR),
+            key=lambda target: abs(target[0][s] - target[1]),
+            reverse=True
+        )[:active]
+
+        def bound(p):
+            h = 0
+            for d, dt in targets:
+                dp = d[p]
+                if dp != FAR and abs(dp - dt) > h:
+                    h = abs(dp - dt)
+            return h
+        return bound
+
+    def _path(self, parents, p, reverse=False):
+        """
+        Rebuilds the (movie_id, person_id) path from the root of
+        `parents` to index `p`, or from `p` to the root if `reverse`.
+        """
+        graph = self.graph
+        path = []
+        while parents[p] is not None:
+            m, previous = parents[p]
+            path.append((graph.movie_ids[m], graph.person_ids[previous if reverse else p]))
+            p = previous
+        if not reverse:
+            path.reverse()
+        return path
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Precompute a landmark distance oracle for degrees.py")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("-k", type=int, default=16, help="number of landmarks")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    stamp = csv_stamp(args.directory)
+    graph = cached_graph(args.directory)
+    oracle = LandmarkOracle.build(graph, args.k)
+    path = os.path.join(args.directory, LANDMARKS)
+    oracle.save(path, stamp)
+    print(f"Wrote {len(oracle.landmarks)} landmarks ({oracle.nbytes() / 2 ** 20:.1f} MiB) "
+          f"to {path} in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
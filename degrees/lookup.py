@@ -0,0 +1,128 @@
+import bisect
+import heapq
+import re
+import unicodedata
+from array import array
+from collections import Counter
+
+# A trailing birth year, as in "Chris Evans (1981)"
+BIRTH_YEAR = re.compile(r"^(.*?)\s*\((\d{4})\)\s*$")
+
+# Cap on posting-list entries scanned to gather fuzzy match candidates
+CANDIDATE_BUDGET = 5000
+
+
+def normalize(name):
+    """Lowercases a name and strips accents and repeated spaces."""
+    decomposed = unicodedata.normalize("NFKD", name.casefold())
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.split())
+
+
+def trigrams(key):
+    """Returns the set of padded character trigrams of a normalized name."""
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def split_birth(name):
+    """
+    Splits an optional trailing "(year)" off a name, returning
+    (name, birth) with birth None if absent.
+    """
+    match = BIRTH_YEAR.match(name)
+    if match is None:
+        return name, None
+    return match.group(1), match.group(2)
+
+
+class NameIndex():
+    """
+    Prefix and trigram index over person names, for autocomplete and
+    ranked fuzzy lookups. `weights` (e.g. movie counts) rank people who
+    match equally well, so better known people come first.
+    """
+
+    def __init__(self, person_ids, names, births, weights=None):
+        self.person_ids = person_ids
+        self.names = names
+        self.births = births
+        self.weights = weights if weights is not None else array("i", bytes(4 * len(person_ids)))
+        self.keys = [normalize(name) for name in names]
+
+        # Person indices sorted by normalized name, for prefix ranges
+        self.order = array("i", sorted(range(len(self.keys)), key=self.keys.__getitem__))
+
+        # Trigram -> person indices whose name contains it
+        postings = {}
+        for p, key in enumerate(self.keys):
+            for gram in trigrams(key):
+                postings.setdefault(gram, []).append(p)
+        self.postings = {gram: array("i", people) for gram, people in postings.items()}
+
+    def _range(self, key):
+        """Returns the slice of `order` whose names start with `key`."""
+        lo = bisect.bisect_left(self.order, key, key=self.keys.__getitem__)
+        hi = bisect.bisect_right(self.order, key + "\uffff", lo=lo, key=self.keys.__getitem__)
+        return lo, hi
+
+    def _filter(self, people, birth):
+        """Keeps people born in `birth`, unless no birth year is given."""
+        if birth is None:
+            return list(people)
+        return [p for p in people if self.births[p] == birth]
+
+    def lookup(self, name, birth=None):
+        """
+        Returns the person_ids whose name matches `name` exactly, ignoring
+        case and accents, optionally only those born in `birth`.
+        A trailing "(year)" in `name` is used as the birth year.
+        """
+        name, year = split_birth(name)
+        birth = birth or year
+        key = normalize(name)
+        lo, hi = self._range(key)
+        matches = [p for p in self.order[lo:hi] if self.keys[p] == key]
+        return [self.person_ids[p] for p in self._filter(matches, birth)]
+
+    def complete(self, prefix, limit=10, birth=None):
+        """
+        Returns up to `limit` person_ids whose name starts with `prefix`,
+        highest weight first.
+        """
+        lo, hi = self._range(normalize(prefix))
+        matches = self._filter(self.order[lo:hi], birth)
+        best = heapq.nsmallest(limit, matches, key=lambda p: (-self.weights[p], self.keys[p]))
+        return [self.person_ids[p] for p in best]
+
+    def search(self, query, limit=10, birth=None):
+        """
+        Returns up to `limit` (score, person_id) pairs for names similar
+        to `query`, best first, scored by trigram Jaccard similarity.
+
+        Candidates are gathered from the query's rarest trigrams first,
+        so common trigrams never force a scan of millions of postings.
+        """
+        query, year = split_birth(query)
+        birth = birth or year
+        grams = trigrams(normalize(query))
+        known = sorted((g for g in grams if g in self.postings), key=lambda g: len(self.postings[g]))
+
+        shared = Counter()
+        scanned = 0
+        for gram in known:
+            people = self.postings[gram]
+            if scanned and scanned + len(people) > CANDIDATE_BUDGET:
+                break
+            shared.update(people)
+            scanned += len(people)
+
+        # Only the candidates sharing the most trigrams are scored exactly
+        candidates = [p for p, _ in shared.most_common()]
+        scored = []
+        for p in self._filter(candidates, birth)[:limit * 10]:
+            other = trigrams(self.keys[p])
+            common = len(grams & other)
+            scored.append((common / (len(grams) + len(other) - common), self.weights[p], p))
+        best = heapq.nlargest(limit, scored)
+        return [(round(score, 4), self.person_ids[p]) for score, _, p in best]
@@ -0,0 +1,185 @@
+import csv
+import json
+import random
+
+import pytest
+
+import degrees
+import util
+from graph import CompactGraph
+from landmarks import LandmarkOracle
+
+SEEDS = range(5)
+
+
+def write_tables(directory, seed, n_people=40, n_movies=25):
+    """
+    Writes random people/movies/stars CSVs to `directory`: a few movies
+    of 2-4 stars each, so the graph is sparse and has several components
+    and some shared names. Returns the person_ids.
+    """
+    rng = random.Random(seed)
+    person_ids = [str(100 + i) for i in range(n_people)]
+    with open(directory / "people.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for i, person_id in enumerate(person_ids):
+            writer.writerow([person_id, f"Person {i % (n_people - 5)}", str(1950 + i)])
+    with open(directory / "movies.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        for m in range(n_movies):
+            writer.writerow([f"m{m}", f"Movie {m}", "2000"])
+    with open(directory / "stars.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for m in range(n_movies):
+            for person_id in rng.sample(person_ids, rng.randint(2, 4)):
+                writer.writerow([person_id, f"m{m}"])
+    return person_ids
+
+
+def distances(source):
+    """Breadth-first distances from `source` over the loaded tables."""
+    found = {source: 0}
+    layer = [source]
+    while layer:
+        next_layer = []
+        for person_id in layer:
+            for _, neighbor in degrees.neighbors_for_person(person_id):
+                if neighbor not in found:
+                    found[neighbor] = found[person_id] + 1
+                    next_layer.append(neighbor)
+        layer = next_layer
+    return found
+
+
+def check_path(source, target, path, expected):
+    """Asserts that `path` is a valid path of the expected length, or None."""
+    if expected is None:
+        assert path is None
+        return
+    assert path is not None and len(path) == expected
+    person_id = source
+    for movie_id, next_id in path:
+        assert person_id in degrees.movies[movie_id]["stars"]
+        assert next_id in degrees.movies[movie_id]["stars"]
+        person_id = next_id
+    assert person_id == target
+
+
+def all_pairs(person_ids, seed, count=60):
+    rng = random.Random(seed)
+    return [tuple(rng.sample(person_ids, 2)) for _ in range(count)] + [(person_ids[0],) * 2]
+
+
+@pytest.fixture(params=SEEDS)
+def tables(request, tmp_path):
+    person_ids = write_tables(tmp_path, request.param)
+    degrees.load_data(str(tmp_path))
+    expected = {source: distances(source) for source in person_ids}
+    yield tmp_path, person_ids, expected, request.param
+    # Leave the plain dict tables loaded, whatever the test switched to
+    degrees.load_data(str(tmp_path))
+
+
+def test_shortest_path_is_shortest(tables):
+    _, person_ids, expected, seed = tables
+    for source, target in all_pairs(person_ids, seed):
+        check_path(source, target, degrees.shortest_path(source, target),
+                   expected[source].get(target))
+
+
+def test_bidirectional_matches_shortest_path(tables):
+    _, person_ids, expected, seed = tables
+    for source, target in all_pairs(person_ids, seed):
+        check_path(source, target, degrees.shortest_path(source, target, bidirectional=True),
+                   expected[source].get(target))
+
+
+@pytest.mark.parametrize("mode", ["compact", "snapshot"])
+def test_compact_and_snapshot_match_shortest_path(tables, mode):
+    directory, person_ids, expected, seed = tables
+    for _ in range(2):
+        # The second snapshot load comes from the file written by the first
+        degrees.load_data(str(directory), **{mode: True})
+        for source, target in all_pairs(person_ids, seed):
+            for bidirectional in (False, True):
+                path = degrees.shortest_path(source, target, bidirectional)
+                check_path(source, target, path, expected[source].get(target))
+
+
+def test_distance_tables_match_shortest_path(tables):
+    _, person_ids, expected, seed = tables
+    for source in person_ids[:10]:
+        table = degrees.distances_from(source)
+        for target in person_ids:
+            distance = expected[source].get(target)
+            assert table.distance(target) == distance
+            check_path(source, target, table.path_to(target), distance)
+
+
+def test_landmark_oracle_matches_shortest_path(tables):
+    directory, person_ids, expected, seed = tables
+    graph = CompactGraph.from_csv(str(directory))
+    oracle = LandmarkOracle.build(graph, k=4)
+    path = directory / "landmarks.bin"
+    oracle.save(str(path), stamp=1.0)
+    loaded = LandmarkOracle.load(graph, str(path), stamp=1.0)
+    with pytest.raises(ValueError):
+        LandmarkOracle.load(graph, str(path), stamp=2.0)
+    for source, target in all_pairs(person_ids, seed):
+        distance = expected[source].get(target)
+        for o in (oracle, loaded):
+            assert o.distance(source, target) == distance
+            check_path(source, target, o.shortest_path(source, target), distance)
+            bounds = o.bounds(source, target)
+            if distance is not None:
+                lower, upper = bounds
+                assert lower <= distance and (upper is None or distance <= upper)
+
+
+def test_answer_query_uses_birth_years(tables):
+    _, person_ids, expected, _ = tables
+    # "Person 0" is shared by the first person and the one 35 later
+    result = degrees.answer_query({"source": "Person 0", "target": "Person 1"})
+    assert "Ambiguous" in result["error"]
+    result = degrees.answer_query({"source": "Person 0", "source_birth": 1950,
+                                   "target": "Person 1", "target_birth": "1951"})
+    assert result["degrees"] == expected[person_ids[0]].get(person_ids[1])
+    json.dumps(result)
+
+
+@pytest.mark.parametrize("query", [
+    {"source": 1, "target": "Person 1"},
+    {"source": "Person 1"},
+    {"source": "Person 1", "target": "Person 2", "source_birth": [1951]},
+    {"source": "Nobody", "target": "Person 2"},
+])
+def test_answer_query_reports_bad_queries(tables, query):
+    assert "error" in degrees.answer_query(query)
+
+
+def test_parse_query():
+    assert degrees.parse_query("A\tB\n") == {"source": "A", "target": "B"}
+    assert degrees.parse_query('{"source": "A", "target": "B"}') == {"source": "A", "target": "B"}
+    assert degrees.parse_query('{"source": "A"') == {"source": None, "target": None}
+    assert degrees.parse_query('{"queries": [1, 2]}') == {"queries": [1, 2]}
+
+
+@pytest.mark.parametrize("frontier_class", [util.DequeStackFrontier, util.DequeQueueFrontier])
+def test_deque_frontiers_match_list_frontiers(frontier_class):
+    reference_class = (util.StackFrontier if frontier_class is util.DequeStackFrontier
+                       else util.QueueFrontier)
+    rng = random.Random(0)
+    frontier, reference = frontier_class(), reference_class()
+    for _ in range(500):
+        if rng.random() < 0.6 or reference.empty():
+            node = util.Node(rng.randrange(10), None, None)
+            frontier.add(node)
+            reference.add(node)
+        else:
+            assert frontier.remove() is reference.remove()
+        for state in range(10):
+            assert frontier.contains_state(state) == reference.contains_state(state)
+        assert frontier.empty() == reference.empty()
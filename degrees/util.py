@@ -1,3 +1,6 @@
+from collections import Counter, deque
+
+
 class Node():
     def __init__(self, state, parent, action):
         self.state = state
@@ -36,3 +39,49 @@ class QueueFrontier(StackFrontier):
             node = self.frontier[0]
             self.frontier = self.frontier[1:]
             return node
+
+
+class DequeStackFrontier():
+    """
+    Stack frontier backed by a deque, with a count of the nodes it holds
+    for each state so that `contains_state` is O(1) instead of a scan
+    over every node. A state may be added more than once, and is still
+    contained until every copy of it has been removed.
+    """
+
+    def __init__(self):
+        self.frontier = deque()
+        self.states = Counter()
+
+    def add(self, node):
+        self.frontier.append(node)
+        self.states[node.state] += 1
+
+    def contains_state(self, state):
+        return state in self.states
+
+    def empty(self):
+        return len(self.frontier) == 0
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        node = self.frontier.pop()
+        self.forget(node.state)
+        return node
+
+    def forget(self, state):
+        """Drops one queued copy of `state`."""
+        self.states[state] -= 1
+        if self.states[state] == 0:
+            del self.states[state]
+
+
+class DequeQueueFrontier(DequeStackFrontier):
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        node = self.frontier.popleft()
+        self.forget(node.state)
+        return node
@@ -0,0 +1,251 @@
+import argparse
+import csv
+import hashlib
+import json
+import multiprocessing
+import os
+import sqlite3
+import sys
+import time
+
+from heredity import PROBS, exhaustive_probabilities, load_data
+
+# Methods the batch runner accepts; all are deterministic, so their
+# results can be cached
+METHODS = ("exact", "exhaustive", "vectorized")
+
+# Default location of the result cache
+CACHE = "heredity-cache.sqlite3"
+
+
+def family_files(paths):
+    """
+    Returns the family CSV files named by `paths`: each path is a family
+    file (*.csv), a directory whose *.csv files are taken in name order,
+    or a manifest listing one family file per line, relative to itself.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(
+                os.path.join(path, name) for name in os.listdir(path) if name.endswith(".csv")
+            ))
+        elif path.endswith(".csv"):
+            files.append(path)
+        else:
+            with open(path) as f:
+                base = os.path.dirname(path)
+                files.extend(os.path.join(base, line.strip()) for line in f if line.strip())
+    return files
+
+
+def check_parents(people):
+    """
+    Raises ValueError if anyone in a family names a parent the family
+    does not list, which `family_key` could not tell from a founder.
+    """
+    for name, data in people.items():
+        for parent in (data["mother"], data["father"]):
+            if parent is not None and parent not in people:
+                raise ValueError(f"{name}'s parent {parent} is not in the file")
+
+
+def family_key(people, method):
+    """
+    Returns a hash of a family's structure and evidence: each person's
+    parents (as positions in the file) and known trait, with the method
+    and model. Families that differ only in names share a key. Every
+    parent must be in the family (see `check_parents`).
+    """
+    position = {name: i for i, name in enumerate(people)}
+    structure = [
+        [position.get(data["mother"]), position.get(data["father"]), data["trait"]]
+        for data in people.values()
+    ]
+    text = json.dumps([method, PROBS, structure], sort_keys=True)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def solve(people, method):
+    """
+    Runs `method` on a family and returns, in file order, each person's
+    [P(0 genes), P(1 gene), P(2 genes), P(trait)].
+    """
+    if method == "exhaustive":
+        probabilities = exhaustive_probabilities(people)
+    elif method == "vectorized":
+        from batched import batched_probabilities
+        probabilities = batched_probabilities(people)
+    else:
+        from elimination import exact_probabilities
+        probabilities = exact_probabilities(people)
+    return [
+        [probabilities[name]["gene"][g] for g in (0, 1, 2)] + [probabilities[name]["trait"][True]]
+        for name in people
+    ]
+
+
+def _solve(job):
+    """
+    Pool task: solves the family of one job. Returns (key, result,
+    error), with an error message instead of a result if the family
+    cannot be solved.
+    """
+    key, people, method = job
+    try:
+        return key, solve(people, method), None
+    except Exception as e:
+        return key, None, f"{type(e).__name__}: {e}"
+
+
+class Cache():
+    """Results by family key, kept in an SQLite file (or in memory for None)."""
+
+    def __init__(self, path):
+        self.db = sqlite3.connect(path or ":memory:")
+        self.db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, result TEXT)")
+
+    def get(self, key):
+        row = self.db.execute("SELECT result FROM results WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key, result):
+        self.db.execute("INSERT OR REPLACE INTO results VALUES (?, ?)", (key, json.dumps(result)))
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+
+def run_batch(files, method="exact", workers=None, cache=None):
+    """
+    Solves every family file, computing each distinct family only once:
+    results already in `cache` (a Cache) are reused, and files sharing a
+    key are solved together across `workers` processes. Yields
+    (path, names, result, cached) in file order, where `result` is as
+    returned by `solve` and `cached` is whether it was not solved for
+    this file, or (path, None, error message, False) for a file that
+    cannot be read or solved. Failures never stop the batch.
+    """
+    cache = cache or Cache(None)
+    families = []
+    jobs = {}
+    for path in files:
+        try:
+            people = load_data(path)
+            check_parents(people)
+        except (OSError, KeyError, ValueError, csv.Error) as e:
+            families.append((path, None, f"{type(e).__name__}: {e}"))
+            continue
+        key = family_key(people, method)
+        families.append((path, list(people), key))
+        if key not in jobs and cache.get(key) is None:
+            jobs[key] = (key, people, method)
+
+    workers = workers or os.cpu_count()
+    if workers == 1 or len(jobs) < 2:
+        solved = map(_solve, jobs.values())
+        pool = None
+    else:
+        pool = multiprocessing.Pool(workers)
+        chunksize = max(1, min(64, len(jobs) // (4 * workers)))
+        solved = pool.imap_unordered(_solve, jobs.values(), chunksize=chunksize)
+    results, errors = {}, {}
+    try:
+        for key, result, error in solved:
+            if error is None:
+                results[key] = result
+                cache.put(key, result)
+            else:
+                errors[key] = error
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    for path, names, key in families:
+        if names is None:
+            yield path, None, key, False
+        elif key in errors:
+            yield path, None, errors[key], False
+        elif key in results:
+            # Later files with the same key reuse the first one's result
+            yield path, names, results[key], key not in jobs
+            jobs.pop(key, None)
+        else:
+            yield path, names, cache.get(key), True
+
+
+def write_jsonl(f, rows):
+    """Writes one JSON object per family file."""
+    for path, names, result, cached in rows:
+        if names is None:
+            record = {"file": path, "error": result}
+        else:
+            record = {
+                "file": path,
+                "cached": cached,
+                "probabilities": {
+                    name: {
+                        "gene": {"2": p[2], "1": p[1], "0": p[0]},
+                        "trait": {"true": p[3], "false": 1 - p[3]},
+                    }
+                    for name, p in zip(names, result)
+                },
+            }
+        f.write(json.dumps(record) + "\n")
+
+
+def write_csv(f, rows):
+    """Writes one CSV row per person, with failed files skipped."""
+    writer = csv.writer(f)
+    writer.writerow(["file", "name", "gene_2", "gene_1", "gene_0", "trait"])
+    for path, names, result, cached in rows:
+        if names is None:
+            print(f"{path}: {result}", file=sys.stderr)
+            continue
+        for name, p in zip(names, result):
+            writer.writerow([path, name, p[2], p[1], p[0], p[3]])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run heredity over many family files")
+    parser.add_argument("paths", nargs="+",
+                        help="family CSV files, directories of them, or manifests listing them")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    parser.add_argument("--format", choices=("jsonl", "csv"),
+                        help="output format (default: from the output file's extension, else jsonl)")
+    parser.add_argument("--method", choices=METHODS, default="exact")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per core)")
+    parser.add_argument("--cache", default=CACHE, help="SQLite result cache")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="only share results between identical families in this run")
+    args = parser.parse_args()
+
+    output_format = args.format or ("csv" if (args.output or "").endswith(".csv") else "jsonl")
+    write = write_csv if output_format == "csv" else write_jsonl
+    cache = Cache(None if args.no_cache else args.cache)
+    start = time.perf_counter()
+    files = family_files(args.paths)
+    counts = {"cached": 0, "solved": 0, "failed": 0}
+
+    def counted(rows):
+        for row in rows:
+            counts["failed" if row[1] is None else "cached" if row[3] else "solved"] += 1
+            yield row
+
+    rows = counted(run_batch(files, args.method, args.workers, cache))
+    try:
+        if args.output:
+            with open(args.output, "w", newline="") as f:
+                write(f, rows)
+        else:
+            write(sys.stdout, rows)
+    finally:
+        cache.close()
+    print(f"{len(files)} files in {time.perf_counter() - start:.2f} s: {counts['solved']} solved, "
+          f"{counts['cached']} from cache, {counts['failed']} failed", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import numpy as np
+
+from heredity import PROBS
+
+# Assignments scored at a time by `batched_probabilities`
+BATCH = 1 << 16
+
+
+def log_tables():
+    """
+    Returns the log-probability tables of the model: prior[g],
+    inheritance[g, mother's g, father's g] and trait[g, has trait].
+    """
+    mutation = PROBS["mutation"]
+    passes = np.array([mutation, 0.5, 1 - mutation])
+    m, f = passes[:, None], passes[None, :]
+    inheritance = np.stack([(1 - m) * (1 - f), m * (1 - f) + (1 - m) * f, m * f])
+    prior = np.array([PROBS["gene"][g] for g in range(3)])
+    trait = np.array([[PROBS["trait"][g][False], PROBS["trait"][g][True]] for g in range(3)])
+    return np.log(prior), np.log(inheritance), np.log(trait)
+
+
+class Family():
+    """
+    A `load_data` family as index arrays: person `i` is `names[i]`, and
+    children (people with both parents listed) have their parents' indices
+    in `mothers`/`fathers`. `traits` holds 1/0 for known traits, -1 otherwise.
+    """
+
+    def __init__(self, people):
+        self.names = list(people)
+        index = {name: i for i, name in enumerate(self.names)}
+        self.children = np.array([
+            i for i, name in enumerate(self.names)
+            if people[name]["mother"] and people[name]["father"]
+        ], dtype=np.intp)
+        self.founders = np.setdiff1d(np.arange(len(self.names)), self.children)
+        self.mothers = np.array([index[people[self.names[i]]["mother"]] for i in self.children],
+                                dtype=np.intp)
+        self.fathers = np.array([index[people[self.names[i]]["father"]] for i in self.children],
+                                dtype=np.intp)
+        self.traits = np.array([
+            -1 if people[name]["trait"] is None else int(people[name]["trait"])
+            for name in self.names
+        ], dtype=np.int8)
+        self.log_prior, self.log_inheritance, self.log_trait = log_tables()
+
+    def log_joint_probability(self, genes, traits):
+        """
+        Returns the log joint probability of each row of `genes` (gene
+        counts) and `traits` (0/1 trait flags), both shaped
+        (assignments, people), by gathering from the log tables and
+        summing, so large families never underflow.
+        """
+        logp = self.log_prior[genes[:, self.founders]].sum(axis=1)
+        logp += self.log_inheritance[
+            genes[:, self.children], genes[:, self.mothers], genes[:, self.fathers]
+        ].sum(axis=1)
+        logp += self.log_trait[genes, traits].sum(axis=1)
+        return logp
+
+    def joint_probability(self, genes, traits):
+        """Returns the joint probability of each row, like `joint_probability`."""
+        return np.exp(self.log_joint_probability(genes, traits))
+
+    def update(self, gene_totals, trait_totals, genes, traits, p):
+        """
+        Adds each row's probability `p` to every person's totals for the
+        values in that row, like `update`: `gene_totals` is
+        (people, 3) and `trait_totals` is (people, 2).
+        """
+        n = len(self.names)
+        people = np.arange(n)
+        gene_totals += np.bincount(
+            (people * 3 + genes).ravel(), weights=np.repeat(p, n), minlength=3 * n
+        ).reshape(n, 3)
+        trait_totals += np.bincount(
+            (people * 2 + traits).ravel(), weights=np.repeat(p, n), minlength=2 * n
+        ).reshape(n, 2)
+
+    def assignments(self, batch=BATCH):
+        """
+        Yields (genes, traits) arrays covering every assignment consistent
+        with the evidence, `batch` rows at a time. Assignment k has the
+        base-3 digits of k as gene counts and the remaining bits as the
+        unknown traits; known traits are fixed.
+        """
+        n = len(self.names)
+        unknown = np.flatnonzero(self.traits < 0)
+        total = 3 ** n * 2 ** len(unknown)
+        powers = 3 ** np.arange(n, dtype=np.int64)
+        for start in range(0, total, batch):
+            k = np.arange(start, min(total, start + batch), dtype=np.int64)
+            genes = (k[:, None] // powers % 3).astype(np.intp)
+            traits = np.broadcast_to(self.traits.astype(np.intp), genes.shape).copy()
+            traits[:, unknown] = (k[:, None] // 3 ** n >> np.arange(len(unknown))) & 1
+            yield genes, traits
+
+
+def batched_probabilities(people, batch=BATCH):
+    """
+    Return the same distributions as `exhaustive_probabilities`, scoring
+    assignments `batch` at a time with NumPy. Probabilities are kept
+    relative to the largest log joint probability seen so far, so tiny
+    joint probabilities in large families never underflow to zero.
+    """
+    family = Family(people)
+    n = len(family.names)
+    gene_totals = np.zeros((n, 3))
+    trait_totals = np.zeros((n, 2))
+    scale = -np.inf
+    for genes, traits in family.assignments(batch):
+        logp = family.log_joint_probability(genes, traits)
+        top = logp.max()
+        if top > scale:
+            gene_totals *= np.exp(scale - top)
+            trait_totals *= np.exp(scale - top)
+            scale = top
+        family.update(gene_totals, trait_totals, genes, traits, np.exp(logp - scale))
+
+    gene_totals /= gene_totals.sum(axis=1, keepdims=True)
+    trait_totals /= trait_totals.sum(axis=1, keepdims=True)
+    genes, traits = gene_totals.tolist(), trait_totals.tolist()
+    return {
+        name: {
+            "gene": {2: genes[i][2], 1: genes[i][1], 0: genes[i][0]},
+            "trait": {True: traits[i][1], False: traits[i][0]},
+        }
+        for i, name in enumerate(family.names)
+    }
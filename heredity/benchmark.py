@@ -0,0 +1,235 @@
+import argparse
+import csv
+import os
+import random
+import time
+
+import heredity
+
+
+def synthetic_family(size, seed=0, observed=0.5, cousins=0.02):
+    """
+    Returns a random pedigree of `size` people in the `load_data` format.
+    Generations of couples have children; children pair up with new
+    founders, or with a cousin from another family (with probability
+    `cousins`), which puts loops in the family tree. About `observed` of
+    the people have a known trait.
+    """
+    rng = random.Random(seed)
+    people = {}
+
+    def add(mother=None, father=None):
+        name = f"P{len(people)}"
+        trait = None
+        if rng.random() < observed:
+            trait = rng.random() < 0.2
+        people[name] = {"name": name, "mother": mother, "father": father, "trait": trait}
+        return name
+
+    generation = [add() for _ in range(min(size, 4))]
+    while len(people) < size:
+        rng.shuffle(generation)
+        children = []
+        for i in range(0, len(generation), 2):
+            mother = generation[i]
+            if i + 1 < len(generation) and rng.random() < cousins:
+                father = generation[i + 1]
+            elif len(people) < size:
+                father = add()
+            else:
+                break
+            for _ in range(rng.randint(1, 4)):
+                if len(people) >= size:
+                    break
+                children.append(add(mother, father))
+        generation = children or [add()]
+    return people
+
+
+def write_family(path, people):
+    """Write a pedigree to a CSV file that `load_data` can read."""
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["name", "mother", "father", "trait"])
+        for person in people.values():
+            trait = "" if person["trait"] is None else int(person["trait"])
+            writer.writerow([person["name"], person["mother"] or "", person["father"] or "", trait])
+
+
+def max_difference(a, b):
+    """Returns the largest difference between two `probabilities` dicts."""
+    return max(
+        abs(a[person][field][value] - b[person][field][value])
+        for person in a for field in a[person] for value in a[person][field]
+    )
+
+
+def legacy_probabilities(people):
+    """
+    The original enumeration: every trait subset, filtered against the
+    evidence, and every gene split, each scored by `joint_probability`.
+    """
+    probabilities = {
+        person: {"gene": {2: 0, 1: 0, 0: 0}, "trait": {True: 0, False: 0}}
+        for person in people
+    }
+    names = set(people)
+    for have_trait in list(heredity.powerset(names)):
+        if any(people[person]["trait"] is not None and
+               people[person]["trait"] != (person in have_trait)
+               for person in names):
+            continue
+        for one_gene in list(heredity.powerset(names)):
+            for two_genes in list(heredity.powerset(names - one_gene)):
+                p = heredity.joint_probability(people, one_gene, two_genes, have_trait)
+                heredity.update(probabilities, one_gene, two_genes, have_trait, p)
+    heredity.normalize(probabilities)
+    return probabilities
+
+
+def bench_exhaustive(args):
+    """
+    Compare the original enumeration with the streaming bitmask
+    enumeration of `exhaustive_probabilities`.
+    """
+    for size in args.sizes:
+        people = synthetic_family(size, args.seed)
+        start = time.perf_counter()
+        streamed = heredity.exhaustive_probabilities(people)
+        row = [f"{size:>3} people", f"streaming {time.perf_counter() - start:8.3f} s"]
+        if size <= args.legacy_limit:
+            start = time.perf_counter()
+            legacy = legacy_probabilities(people)
+            row.append(f"original {time.perf_counter() - start:8.3f} s")
+            row.append(f"max difference {max_difference(streamed, legacy):.1e}")
+        print("  ".join(row))
+
+
+def bench_vectorized(args):
+    """
+    Compare the original enumeration, the streaming enumeration and the
+    NumPy-batched enumeration of `batched_probabilities`.
+    """
+    from batched import batched_probabilities
+
+    for size in args.sizes:
+        people = synthetic_family(size, args.seed)
+        start = time.perf_counter()
+        batched = batched_probabilities(people)
+        row = [f"{size:>3} people", f"vectorized {time.perf_counter() - start:8.3f} s"]
+        start = time.perf_counter()
+        streamed = heredity.exhaustive_probabilities(people)
+        row.append(f"streaming {time.perf_counter() - start:8.3f} s")
+        if size <= args.legacy_limit:
+            start = time.perf_counter()
+            legacy_probabilities(people)
+            row.append(f"original {time.perf_counter() - start:8.3f} s")
+        row.append(f"max difference {max_difference(batched, streamed):.1e}")
+        print("  ".join(row))
+
+
+def bench_parallel(args):
+    """
+    Time exhaustive enumeration across 1 to `--workers` processes,
+    checking every run gives exactly the single-process result.
+    """
+    for size in args.sizes:
+        people = synthetic_family(size, args.seed)
+        serial = None
+        for workers in range(1, args.workers + 1):
+            start = time.perf_counter()
+            probabilities = heredity.exhaustive_probabilities(people, workers)
+            seconds = time.perf_counter() - start
+            if serial is None:
+                serial, serial_seconds = probabilities, seconds
+            print(f"{size:>3} people  {workers:>3} workers  {seconds:8.3f} s  "
+                  f"speedup {serial_seconds / seconds:5.2f}x  "
+                  f"identical {probabilities == serial}")
+
+
+def bench_sampling(args):
+    """
+    Run each sampler for `--seconds` on pedigrees of increasing size,
+    checking its estimates and 95% intervals against exact inference.
+    """
+    from elimination import exact_probabilities
+    from sampling import SAMPLERS, sample_probabilities
+
+    for size in args.sizes:
+        people = synthetic_family(size, args.seed)
+        exact = exact_probabilities(people)
+        for method in SAMPLERS:
+            probabilities, stats = sample_probabilities(people, method, args.seconds,
+                                                        seed=args.seed)
+            covered = [
+                low <= exact[person][field][value] <= high
+                for person, fields in stats["interval"].items()
+                for field, values in fields.items()
+                for value, (low, high) in values.items()
+            ]
+            print(f"{size:>6} people  {method:<20}  {stats['samples']:>9} samples  "
+                  f"max difference {max_difference(probabilities, exact):.1e}  "
+                  f"interval coverage {sum(covered) / len(covered):6.1%}")
+
+
+def bench_exact(args):
+    """
+    Time exact inference on pedigrees of increasing size, checking it
+    against exhaustive enumeration on families up to `--exhaustive-limit`.
+    """
+    from elimination import exact_probabilities
+
+    for size in args.sizes:
+        people = synthetic_family(size, args.seed)
+        start = time.perf_counter()
+        exact = exact_probabilities(people)
+        row = [f"{size:>6} people", f"exact {1000 * (time.perf_counter() - start):9.1f} ms"]
+        if size <= args.exhaustive_limit:
+            start = time.perf_counter()
+            exhaustive = heredity.exhaustive_probabilities(people)
+            row.append(f"exhaustive {1000 * (time.perf_counter() - start):9.1f} ms")
+            row.append(f"max difference {max_difference(exact, exhaustive):.1e}")
+        print("  ".join(row))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for heredity.py")
+    parser.add_argument("--seed", type=int, default=0)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    exact = commands.add_parser("exact", help="exhaustive enumeration vs exact inference")
+    exact.add_argument("--sizes", type=int, nargs="+", default=[3, 5, 6, 100, 500, 1000])
+    exact.add_argument("--exhaustive-limit", type=int, default=6,
+                       help="largest family to enumerate exhaustively")
+    exact.set_defaults(run=bench_exact)
+
+    exhaustive = commands.add_parser("exhaustive", help="original vs streaming enumeration")
+    exhaustive.add_argument("--sizes", type=int, nargs="+", default=[4, 5, 6, 7, 8])
+    exhaustive.add_argument("--legacy-limit", type=int, default=7,
+                            help="largest family to run the original enumeration on")
+    exhaustive.set_defaults(run=bench_exhaustive)
+
+    vectorized = commands.add_parser("vectorized", help="original vs NumPy-batched enumeration")
+    vectorized.add_argument("--sizes", type=int, nargs="+", default=[6, 7, 8, 9])
+    vectorized.add_argument("--legacy-limit", type=int, default=9,
+                            help="largest family to run the original enumeration on")
+    vectorized.set_defaults(run=bench_vectorized)
+
+    parallel = commands.add_parser("parallel", help="exhaustive enumeration across processes")
+    parallel.add_argument("--sizes", type=int, nargs="+", default=[8, 9])
+    parallel.add_argument("--workers", type=int, default=os.cpu_count(),
+                          help="largest number of worker processes to try")
+    parallel.set_defaults(run=bench_parallel)
+
+    sampling = commands.add_parser("sampling", help="sampling vs exact inference")
+    sampling.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    sampling.add_argument("--seconds", type=float, default=2.0,
+                          help="time budget of each sampler")
+    sampling.set_defaults(run=bench_sampling)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+import itertools
+
+import numpy as np
+
+from heredity import PROBS
+
+# Gene counts a person can have; every variable below takes these values
+GENES = (0, 1, 2)
+
+# Largest clique exact inference will build: a clique of k people
+# needs tables of 3 ** k entries (38 MB at 14)
+MAX_CLIQUE = 14
+
+
+class Factor():
+    """
+    A table over gene-count variables (person indices): `values` is a
+    NumPy array with one axis of length 3 per variable, in order.
+    """
+
+    def __init__(self, variables, values):
+        self.variables = tuple(variables)
+        self.values = values
+
+    def expand(self, variables):
+        """
+        Returns `values` with its axes in the order of `variables` (a
+        superset of this factor's), and length-1 axes for the variables
+        this factor does not have, ready to broadcast against them.
+        """
+        own = [v for v in variables if v in self.variables]
+        values = self.values.transpose([self.variables.index(v) for v in own])
+        return values.reshape([3 if v in self.variables else 1 for v in variables])
+
+    def multiply(self, other):
+        """Returns the product of two factors, over the union of their variables."""
+        variables = self.variables + tuple(v for v in other.variables if v not in self.variables)
+        values = self.values.reshape(self.values.shape + (1,) * (len(variables) - len(self.variables)))
+        return Factor(variables, values * other.expand(variables))
+
+    def marginal(self, variables):
+        """
+        Returns the factor summed over every variable not in `variables`,
+        rescaled to sum to 1 so long products of small numbers never
+        underflow.
+        """
+        summed = tuple(i for i, v in enumerate(self.variables) if v not in variables)
+        values = self.values.sum(axis=summed)
+        total = values.sum()
+        if total > 0:
+            values /= total
+        return Factor([v for v in self.variables if v in variables], values)
+
+
+def inheritance(gene, mother, father):
+    """
+    Returns P(child has `gene` copies | parents' gene counts), with each
+    parent passing the gene on with probability 1 - mutation if they
+    have two copies, 0.5 with one copy, and mutation with none.
+    """
+    mutation = PROBS["mutation"]
+    passes = {0: mutation, 1: 0.5, 2: 1 - mutation}
+    m, f = passes[mother], passes[father]
+    return {
+        2: m * f,
+        1: m * (1 - f) + (1 - m) * f,
+        0: (1 - m) * (1 - f),
+    }[gene]
+
+
+def family_factors(people, index):
+    """
+    Returns the factors of the heredity Bayesian network over everyone's
+    gene count, with observed traits folded in as evidence: each person
+    gets P(gene) (or P(gene | mother, father)) times P(trait | gene) for
+    a known trait. Unknown traits sum to 1 and drop out.
+    """
+    table = np.array([
+        inheritance(g, gm, gf) for g, gm, gf in itertools.product(GENES, repeat=3)
+    ]).reshape(3, 3, 3)
+    prior = np.array([PROBS["gene"][g] for g in GENES])
+    factors = []
+    for person, data in people.items():
+        i = index[person]
+        if data["mother"] and data["father"]:
+            m, f = index[data["mother"]], index[data["father"]]
+            factor = Factor((i, m, f), table)
+        else:
+            factor = Factor((i,), prior)
+        if data["trait"] is not None:
+            evidence = Factor((i,), np.array([PROBS["trait"][g][data["trait"]] for g in GENES]))
+            factor = factor.multiply(evidence)
+        factors.append(factor)
+    return factors
+
+
+def elimination_order(n, factors, max_clique=MAX_CLIQUE):
+    """
+    Returns a greedy min-fill order for eliminating variables 0..n-1 and
+    the clique each one is eliminated in (itself plus its neighbours in
+    the moral graph at that point). Raises ValueError as soon as a
+    clique has more than `max_clique` variables.
+    """
+    neighbours = [set() for _ in range(n)]
+    for factor in factors:
+        for v in factor.variables:
+            neighbours[v].update(factor.variables)
+            neighbours[v].discard(v)
+
+    def fill(v):
+        others = list(neighbours[v])
+        return sum(
+            1 for a, b in itertools.combinations(others, 2) if b not in neighbours[a]
+        )
+
+    # Only the fill of the eliminated variable's neighbours and their
+    # neighbours can change, so scores are kept and refreshed for those
+    scores = {v: (fill(v), len(neighbours[v]), v) for v in range(n)}
+    order, cliques = [], []
+    while scores:
+        v = min(scores, key=scores.__getitem__)
+        clique = neighbours[v] | {v}
+        if len(clique) > max_clique:
+            raise ValueError(
+                f"exact inference needs a clique of {len(clique)} or more people, over the "
+                f"limit of {max_clique}; use --method gibbs or likelihood-weighting instead"
+            )
+        for a in neighbours[v]:
+            neighbours[a] |= neighbours[v] - {a}
+            neighbours[a].discard(v)
+        del scores[v]
+        stale = set(neighbours[v])
+        for a in neighbours[v]:
+            stale |= neighbours[a]
+        for a in stale:
+            if a in scores:
+                scores[a] = (fill(a), len(neighbours[a]), a)
+        order.append(v)
+        cliques.append(clique)
+    return order, cliques
+
+
+def exact_probabilities(people):
+    """
+    Returns the same `probabilities` dict as the exhaustive enumeration
+    in `main`, computed exactly by message passing on a junction tree.
+
+    Variable elimination (in min-fill order) over the gene variables
+    builds a tree of cliques; every factor is placed in one clique, and
+    one pass of messages towards the root and one back gives each clique
+    its marginal, so every person's distribution comes out of two sweeps.
+    The cost is exponential in the largest clique rather than in the
+    number of people. Cliques stay small on family trees with few loops,
+    but marriages between relatives make them grow, and ValueError is
+    raised before any table is built if one would exceed MAX_CLIQUE.
+    """
+    names = list(people)
+    index = {name: i for i, name in enumerate(names)}
+    factors = family_factors(people, index)
+    order, cliques = elimination_order(len(names), factors)
+    position = {v: k for k, v in enumerate(order)}
+
+    # Each clique's parent is the clique of the first variable eliminated
+    # after it among its other members; the separator is those members
+    parent = []
+    for k, clique in enumerate(cliques):
+        later = [position[v] for v in clique if position[v] > k]
+        parent.append(min(later) if later else None)
+
+    # Place every factor in the clique of its first-eliminated variable
+    potentials = [Factor((), np.ones(())) for _ in cliques]
+    for factor in factors:
+        k = min(position[v] for v in factor.variables)
+        potentials[k] = potentials[k].multiply(factor)
+
+    children = [[] for _ in cliques]
+    for k, p in enumerate(parent):
+        if p is not None:
+            children[p].append(k)
+
+    # Upward pass: cliques are numbered in elimination order, so every
+    # child comes before its parent
+    up = [None] * len(cliques)
+    for k, clique in enumerate(cliques):
+        belief = potentials[k]
+        for child in children[k]:
+            belief = belief.multiply(up[child])
+        if parent[k] is not None:
+            up[k] = belief.marginal(clique - {order[k]})
+
+    # Downward pass from each root; a clique's full belief then gives
+    # the marginal of the variable eliminated in it
+    down = [None] * len(cliques)
+    probabilities = {}
+    for k in reversed(range(len(cliques))):
+        belief = potentials[k]
+        if parent[k] is not None:
+            belief = belief.multiply(down[k])
+        # Each child's message leaves out its own upward message: the
+        # belief so far times the messages of the children before it
+        # (accumulated left to right) and after it (right to left)
+        after = [None] * len(children[k])
+        suffix = Factor((), np.ones(()))
+        for c in reversed(range(len(children[k]))):
+            after[c] = suffix
+            suffix = suffix.multiply(up[children[k][c]])
+        for c, child in enumerate(children[k]):
+            message = belief.multiply(after[c])
+            down[child] = message.marginal(cliques[child] - {order[child]})
+            belief = belief.multiply(up[child])
+
+        gene = belief.marginal({order[k]}).values.tolist()
+        name = names[order[k]]
+        trait = people[name]["trait"]
+        if trait is None:
+            has_trait = sum(gene[g] * PROBS["trait"][g][True] for g in GENES)
+        else:
+            has_trait = 1.0 if trait else 0.0
+        probabilities[name] = {
+            "gene": {2: gene[2], 1: gene[1], 0: gene[0]},
+            "trait": {True: has_trait, False: 1 - has_trait},
+        }
+    return {name: probabilities[name] for name in names}
@@ -1,5 +1,8 @@
+import argparse
 import csv
 import itertools
+import multiprocessing
+import os
 import sys
 
 # Define probabilities for genes and traits
@@ -37,61 +40,252 @@ PROBS = {
     "mutation": 0.01
 }
 
+# Minimum number of shards `exhaustive_probabilities` splits the
+# assignments into, so work spreads evenly over worker processes
+SHARDS = 64
+
+# The family being enumerated, set in each worker process by `_init_worker`
+_people = None
+
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("data", help="CSV file of name, mother, father, trait")
+    parser.add_argument("--method", default="exact",
+                        choices=("exact", "exhaustive", "vectorized", "gibbs", "likelihood-weighting"),
+                        help="junction-tree inference, enumerate every assignment "
+                             "one at a time or in NumPy batches, or sample")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes to split exhaustive enumeration across "
+                             "(0 for one per core)")
+    parser.add_argument("--seconds", type=float,
+                        help="time budget for sampling")
+    parser.add_argument("--standard-error", type=float,
+                        help="stop sampling once every standard error is at most this")
+    parser.add_argument("--seed", type=int, help="random seed for sampling")
+    args = parser.parse_args()
+    people = load_data(args.data)
 
-    # Check for proper usage
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python heredity.py data.csv")
-    people = load_data(sys.argv[1])
+    intervals = None
+    if args.method == "exhaustive":
+        probabilities = exhaustive_probabilities(people, args.workers or os.cpu_count())
+    elif args.method == "vectorized":
+        from batched import batched_probabilities
+        probabilities = batched_probabilities(people)
+    elif args.method in ("gibbs", "likelihood-weighting"):
+        from sampling import sample_probabilities
+        probabilities, stats = sample_probabilities(
+            people, args.method, args.seconds, args.standard_error, args.seed
+        )
+        intervals = stats["interval"]
+    else:
+        from elimination import exact_probabilities
+        try:
+            probabilities = exact_probabilities(people)
+        except ValueError as e:
+            sys.exit(str(e))
+
+    # Print results
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                if intervals:
+                    low, high = intervals[person][field][value]
+                    print(f"    {value}: {p:.4f}  (95% CI {low:.4f}-{high:.4f})")
+                else:
+                    print(f"    {value}: {p:.4f}")
+
+def exhaustive_probabilities(people, workers=1):
+    """
+    Return each person's gene and trait distributions by enumerating
+    every assignment of traits and genes consistent with the evidence.
+
+    The assignments are split into shards by the values of the first
+    people enumerated. With `workers` > 1 the shards are totalled across
+    that many processes; either way the shard totals are added up in
+    shard order, so the result is identical for any number of workers.
+    """
+    names = list(people)
+    jobs = shards(people)
+    if workers > 1 and len(jobs) > 1:
+        with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(people,)) as pool:
+            partials = pool.map(_shard_totals, jobs, chunksize=1)
+    else:
+        partials = [shard_totals(people, fixed) for fixed in jobs]
+
+    genes = [[0.0, 0.0, 0.0] for _ in names]
+    traits = [[0.0, 0.0] for _ in names]
+    for shard_genes, shard_traits in partials:
+        for i in range(len(names)):
+            for g in range(3):
+                genes[i][g] += shard_genes[i][g]
+            for t in range(2):
+                traits[i][t] += shard_traits[i][t]
 
-    # Keep track of gene and trait probabilities for each person
     probabilities = {
         person: {
-            "gene": {
-                2: 0,
-                1: 0,
-                0: 0
-            },
-            "trait": {
-                True: 0,
-                False: 0
-            }
+            "gene": {2: genes[i][2], 1: genes[i][1], 0: genes[i][0]},
+            "trait": {True: traits[i][1], False: traits[i][0]},
         }
-        for person in people
+        for i, person in enumerate(names)
     }
 
-    # Loop over all sets of people who might have the trait
-    names = set(people)
-    for have_trait in powerset(names):
+    # Ensure probabilities sum to 1
+    normalize(probabilities)
+    return probabilities
 
-        # Check if current set of people violates known information
-        fails_evidence = any(
-            (people[person]["trait"] is not None and
-             people[person]["trait"] != (person in have_trait))
-            for person in names
-        )
-        if fails_evidence:
-            continue
+def shards(people):
+    """
+    Return the shards of the assignment space: every combination of
+    choice indices for the first people enumerated by `joint_assignments`,
+    taking people until there are at least SHARDS combinations.
+    """
+    choices = enumeration_plan(people)[1]
+    ranges = []
+    count = 1
+    for options in choices:
+        if count >= SHARDS:
+            break
+        ranges.append(range(len(options)))
+        count *= len(options)
+    return list(itertools.product(*ranges))
 
-        # Loop over all sets of people who might have the gene
-        for one_gene in powerset(names):
-            for two_genes in powerset(names - one_gene):
+def shard_totals(people, fixed=()):
+    """
+    Return (genes, traits): for each person in `people` order, the total
+    joint probability of the assignments in shard `fixed` giving them
+    each gene count and each trait value.
+    """
+    names = list(people)
+    genes = [[0.0, 0.0, 0.0] for _ in names]
+    traits = [[0.0, 0.0] for _ in names]
 
-                # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
-                update(probabilities, one_gene, two_genes, have_trait, p)
+    def add(i, one_gene, two_genes, have_trait, p):
+        bit = 1 << i
+        genes[i][2 if two_genes & bit else 1 if one_gene & bit else 0] += p
+        traits[i][1 if have_trait & bit else 0] += p
 
-    # Ensure probabilities sum to 1
-    normalize(probabilities)
+    # Consecutive assignments differ in only a few people, so rather than
+    # adding every assignment to everyone's totals, keep a running total
+    # and credit a person with the mass since their values last changed
+    total = 0.0
+    since = [0.0] * len(names)
+    previous = None
+    for assignment in joint_assignments(people, fixed):
+        if previous is not None:
+            changed = ((assignment[0] ^ previous[0]) | (assignment[1] ^ previous[1]) |
+                       (assignment[2] ^ previous[2]))
+            while changed:
+                bit = changed & -changed
+                i = bit.bit_length() - 1
+                add(i, *previous[:3], total - since[i])
+                since[i] = total
+                changed ^= bit
+        total += assignment[3]
+        previous = assignment
+    for i in range(len(names)):
+        add(i, *previous[:3], total - since[i])
+    return genes, traits
 
-    # Print results
-    for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+def _init_worker(people):
+    """Gives a worker process the family being enumerated."""
+    global _people
+    _people = people
+
+def _shard_totals(fixed):
+    """Pool task: totals one shard of `_people`."""
+    return shard_totals(_people, fixed)
+
+def enumeration_plan(people):
+    """
+    Return (order, choices, parents) for `joint_assignments`: the people
+    ordered parents first, each one's (gene, trait) choices, and the
+    positions in `order` of their parents (None for founders).
+    """
+    order = []
+    placed = set()
+
+    def place(name):
+        if name in placed:
+            return
+        placed.add(name)
+        for parent in (people[name]["mother"], people[name]["father"]):
+            if parent:
+                place(parent)
+        order.append(name)
+
+    for name in people:
+        place(name)
+    position = {name: k for k, name in enumerate(order)}
+
+    choices = []
+    parents = []
+    for name in order:
+        trait = people[name]["trait"]
+        options = (False, True) if trait is None else (trait,)
+        choices.append([(gene, t) for gene in (0, 1, 2) for t in options])
+        mother, father = people[name]["mother"], people[name]["father"]
+        parents.append((position[mother], position[father]) if mother and father else None)
+    return order, choices, parents
+
+def joint_assignments(people, fixed=()):
+    """
+    Lazily yield every gene and trait assignment consistent with the
+    evidence as `(one_gene, two_genes, have_trait, p)`, where the sets
+    are bitmasks over the people in `people` order (bit i is the i-th
+    person) and `p` is the assignment's joint probability. If given,
+    `fixed` holds the choice indices of the first people enumerated,
+    restricting the assignments to one shard.
+
+    People with a known trait only ever take that trait, so no assignment
+    contradicting the evidence is generated. Assignments are counted
+    like an odometer over people ordered parents first, keeping the
+    product of each prefix of people's factors, so advancing to the next
+    assignment only recomputes the factors of the people that changed.
+    """
+    bits = {name: 1 << i for i, name in enumerate(people)}
+    order, choices, parents = enumeration_plan(people)
+    n = len(order)
+
+    mutation = PROBS["mutation"]
+    passes = (mutation, 0.5, 1 - mutation)
+    index = list(fixed) + [0] * (n - len(fixed))
+    gene = [0] * n
+    product = [1.0] * (n + 1)
+    one_gene = [0] * (n + 1)
+    two_genes = [0] * (n + 1)
+    have_trait = [0] * (n + 1)
+
+    changed = 0
+    while True:
+        # Recompute the prefixes from the first person that changed
+        for k in range(changed, n):
+            g, t = choices[k][index[k]]
+            gene[k] = g
+            if parents[k] is None:
+                p = PROBS["gene"][g]
+            else:
+                m, f = passes[gene[parents[k][0]]], passes[gene[parents[k][1]]]
+                p = (m * f if g == 2 else
+                     m * (1 - f) + (1 - m) * f if g == 1 else
+                     (1 - m) * (1 - f))
+            product[k + 1] = product[k] * p * PROBS["trait"][g][t]
+            bit = bits[order[k]]
+            one_gene[k + 1] = one_gene[k] | bit if g == 1 else one_gene[k]
+            two_genes[k + 1] = two_genes[k] | bit if g == 2 else two_genes[k]
+            have_trait[k + 1] = have_trait[k] | bit if t else have_trait[k]
+        yield one_gene[n], two_genes[n], have_trait[n], product[n]
+
+        # Advance the odometer, leaving the fixed people alone
+        changed = n - 1
+        while changed >= len(fixed) and index[changed] == len(choices[changed]) - 1:
+            index[changed] = 0
+            changed -= 1
+        if changed < len(fixed):
+            return
+        index[changed] += 1
 
 def load_data(filename):
     """
@@ -116,14 +310,13 @@ def load_data(filename):
 
 def powerset(s):
     """
-    Return a list of all possible subsets of set s.
+    Lazily yield all possible subsets of set s, smallest first.
     """
     s = list(s)
-    return [
-        set(s) for s in itertools.chain.from_iterable(
-            itertools.combinations(s, r) for r in range(len(s) + 1)
-        )
-    ]
+    for subset in itertools.chain.from_iterable(
+        itertools.combinations(s, r) for r in range(len(s) + 1)
+    ):
+        yield set(subset)
 
 def joint_probability(people, one_gene, two_genes, have_trait):
     """
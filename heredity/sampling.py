@@ -0,0 +1,270 @@
+import time
+
+import numpy as np
+
+from batched import Family
+
+# Samplers `sample_probabilities` can run
+SAMPLERS = ("gibbs", "likelihood-weighting")
+
+# Samples drawn at a time by likelihood weighting
+SAMPLES = 1 << 12
+
+# Independent Gibbs chains run side by side, sweeps discarded from the
+# start of each, and sweeps between checks of the stopping rule
+CHAINS = 64
+BURN_IN = 50
+CHECK = 10
+
+# Effective sample size likelihood weighting needs before its standard
+# errors are trusted; a few heavy samples make them look tiny
+MIN_EFFECTIVE = 100
+
+# Time budget in seconds when no target standard error is given
+SECONDS = 1.0
+
+# Normal quantile of the reported 95% confidence intervals
+Z = 1.96
+
+
+class Pedigree(Family):
+    """
+    A Family with what sampling needs on top: each person's generation
+    (founders are 0, children one more than their deepest parent), and a
+    colouring in which no two people of a colour share a Markov blanket
+    (parents, children and partners), so Gibbs sampling can redraw all
+    of a colour at once.
+    """
+
+    def __init__(self, people):
+        super().__init__(people)
+        n = len(self.names)
+        depth = np.zeros(n, dtype=np.intp)
+        for _ in range(n):
+            deeper = depth.copy()
+            deeper[self.children] = np.maximum(depth[self.mothers], depth[self.fathers]) + 1
+            if np.array_equal(deeper, depth):
+                break
+            depth = deeper
+        self.generations = [np.flatnonzero(depth == k) for k in range(depth.max(initial=-1) + 1)]
+
+        blanket = [set() for _ in range(n)]
+        for child, mother, father in zip(self.children, self.mothers, self.fathers):
+            for a, b in ((child, mother), (child, father), (mother, father)):
+                blanket[a].add(b)
+                blanket[b].add(a)
+        colour = [-1] * n
+        for i in range(n):
+            taken = {colour[j] for j in blanket[i]}
+            colour[i] = next(c for c in range(len(taken) + 1) if c not in taken)
+        colour = np.array(colour)
+        self.colours = [np.flatnonzero(colour == c) for c in range(colour.max(initial=-1) + 1)]
+
+        # P(trait | gene) of each person: the evidence for known traits,
+        # and the trait probability of unknown ones
+        trait = np.exp(self.log_trait)
+        self.evidence = np.where(self.traits[:, None] < 0, 0.0,
+                                 self.log_trait[:, np.maximum(self.traits, 0)].T)
+        self.has_trait = trait[:, 1]
+
+    def forward_sample(self, rng, samples):
+        """
+        Returns `samples` rows of gene counts drawn from the prior, a
+        generation at a time so parents are drawn before their children.
+        """
+        genes = np.zeros((samples, len(self.names)), dtype=np.intp)
+        prior = np.cumsum(np.exp(self.log_prior))
+        inheritance = np.cumsum(np.exp(self.log_inheritance), axis=0)
+        mother = dict(zip(self.children.tolist(), self.mothers.tolist()))
+        father = dict(zip(self.children.tolist(), self.fathers.tolist()))
+        for depth, generation in enumerate(self.generations):
+            u = rng.random((samples, len(generation)))
+            if depth == 0:
+                cdf = prior[:, None, None]
+            else:
+                m = genes[:, [mother[i] for i in generation]]
+                f = genes[:, [father[i] for i in generation]]
+                cdf = inheritance[:, m, f]
+            genes[:, generation] = (u >= cdf[0]).astype(np.intp) + (u >= cdf[1])
+        return genes
+
+
+def sample_probabilities(people, method="gibbs", seconds=None, standard_error=None, seed=None):
+    """
+    Estimates the `probabilities` dict of `people` by sampling, until
+    `seconds` have passed or every estimate's standard error is at most
+    `standard_error` (SECONDS of sampling if neither is given). Returns
+    (probabilities, stats), where stats reports the method, samples,
+    seconds, and each estimate's standard error and 95% interval in the
+    shape of `probabilities`.
+    """
+    if method not in SAMPLERS:
+        raise ValueError(f"unknown sampler {method!r}, expected one of {', '.join(SAMPLERS)}")
+    if seconds is None and standard_error is None:
+        seconds = SECONDS
+    start = time.perf_counter()
+
+    def done(error):
+        return ((seconds is not None and time.perf_counter() - start >= seconds) or
+                (standard_error is not None and error <= standard_error))
+
+    pedigree = Pedigree(people)
+    rng = np.random.default_rng(seed)
+    run = likelihood_weighting if method == "likelihood-weighting" else gibbs
+    genes, gene_error, traits, trait_error, samples = run(pedigree, rng, done)
+
+    known = pedigree.traits >= 0
+    traits = np.where(known, pedigree.traits, traits)
+    trait_error = np.where(known, 0.0, trait_error)
+    probabilities, errors, intervals = {}, {}, {}
+    for i, name in enumerate(pedigree.names):
+        p, e = genes[i].tolist(), gene_error[i].tolist()
+        t, te = float(traits[i]), float(trait_error[i])
+        probabilities[name] = {
+            "gene": {2: p[2], 1: p[1], 0: p[0]},
+            "trait": {True: t, False: 1 - t},
+        }
+        errors[name] = {"gene": {2: e[2], 1: e[1], 0: e[0]}, "trait": {True: te, False: te}}
+        intervals[name] = {
+            field: {
+                value: (max(0.0, p - Z * errors[name][field][value]),
+                        min(1.0, p + Z * errors[name][field][value]))
+                for value, p in probabilities[name][field].items()
+            }
+            for field in probabilities[name]
+        }
+    stats = {
+        "method": method,
+        "samples": samples,
+        "seconds": time.perf_counter() - start,
+        "standard_error": errors,
+        "interval": intervals,
+    }
+    return probabilities, stats
+
+
+def likelihood_weighting(pedigree, rng, done):
+    """
+    Draws genes from the prior, SAMPLES at a time, weighting each sample
+    by the likelihood of the observed traits. Unknown traits are not
+    sampled: each sample contributes its P(trait | gene) instead. Standard
+    errors are the delta-method errors of the self-normalized estimates.
+    With much evidence the weights collapse onto a few samples, and those
+    errors understate the real ones; Gibbs sampling copes far better.
+
+    Returns (genes, gene errors, traits, trait errors, samples): the
+    (people, 3) gene distributions, P(trait) of each person, and the
+    standard error of every estimate.
+    """
+    n = len(pedigree.names)
+    known = np.flatnonzero(pedigree.traits >= 0)
+    # Weighted sums of w, w^2, w x, w^2 x and w^2 x^2 for every estimate
+    # x (gene indicators, then trait probabilities), relative to `scale`
+    w_sum = w2_sum = 0.0
+    sums = np.zeros((3, n, 4))
+    scale = -np.inf
+    samples = 0
+    while True:
+        genes = pedigree.forward_sample(rng, SAMPLES)
+        logw = pedigree.log_trait[genes[:, known], pedigree.traits[known]].sum(axis=1)
+        top = logw.max()
+        if top > scale:
+            shrink = np.exp(scale - top)
+            w_sum *= shrink
+            w2_sum *= shrink ** 2
+            sums[0] *= shrink
+            sums[1:] *= shrink ** 2
+            scale = top
+        w = np.exp(logw - scale)
+        w_sum += w.sum()
+        w2_sum += (w ** 2).sum()
+        x = np.concatenate([genes[:, :, None] == np.arange(3), pedigree.has_trait[genes][:, :, None]],
+                           axis=2)
+        sums[0] += np.einsum("s,sik->ik", w, x)
+        sums[1] += np.einsum("s,sik->ik", w ** 2, x)
+        sums[2] += np.einsum("s,sik->ik", w ** 2, x ** 2)
+        samples += SAMPLES
+
+        mean = sums[0] / w_sum
+        variance = (sums[2] - 2 * mean * sums[1] + mean ** 2 * w2_sum) / w_sum ** 2
+        error = np.sqrt(np.maximum(variance, 0.0))
+        unknown = pedigree.traits < 0
+        worst = max(error[:, :3].max(initial=0.0), error[unknown, 3].max(initial=0.0))
+        if done(worst if w_sum ** 2 / w2_sum >= MIN_EFFECTIVE else np.inf):
+            return mean[:, :3], error[:, :3], mean[:, 3], error[:, 3], samples
+
+
+def gibbs(pedigree, rng, done):
+    """
+    Runs CHAINS Gibbs samplers side by side from forward samples,
+    redrawing one colour of the pedigree at a time from each person's
+    distribution given their Markov blanket. After BURN_IN sweeps those
+    conditional distributions are averaged (rather than the drawn genes,
+    which is noisier); the standard error is the spread of the chains'
+    averages, as the chains are independent.
+
+    Returns (genes, gene errors, traits, trait errors, samples) like
+    `likelihood_weighting`, with one sample per chain per sweep.
+    """
+    n = len(pedigree.names)
+    chains = CHAINS
+    genes = pedigree.forward_sample(rng, chains)
+    # Inheritance of a child, indexed by whether the person being redrawn
+    # is the father, then (child, person, other parent)
+    as_parent = np.stack([pedigree.log_inheritance, pedigree.log_inheritance.transpose(0, 2, 1)])
+    is_child = np.zeros(n, dtype=bool)
+    is_child[pedigree.children] = True
+    mother = np.zeros(n, dtype=np.intp)
+    father = np.zeros(n, dtype=np.intp)
+    mother[pedigree.children] = pedigree.mothers
+    father[pedigree.children] = pedigree.fathers
+
+    colours = []
+    for members in pedigree.colours:
+        position = {person: k for k, person in enumerate(members.tolist())}
+        edges = [
+            (position[parent], child, other, role)
+            for child, m, f in zip(pedigree.children.tolist(), pedigree.mothers.tolist(),
+                                   pedigree.fathers.tolist())
+            for parent, other, role in ((m, f, 0), (f, m, 1))
+            if parent in position
+        ]
+        k, child, other, role = np.array(edges, dtype=np.intp).reshape(-1, 4).T
+        scatter = ((np.arange(chains)[:, None, None] * len(members) + k[None, :, None]) * 3 +
+                   np.arange(3)).ravel()
+        founders = np.flatnonzero(~is_child[members])
+        descended = np.flatnonzero(is_child[members])
+        colours.append((members, founders, descended, child, other, role, scatter))
+
+    totals = np.zeros((chains, n, 3))
+    sweeps = 0
+    while True:
+        for members, founders, descended, child, other, role, scatter in colours:
+            logp = np.broadcast_to(pedigree.evidence[members], (chains, len(members), 3)).copy()
+            logp[:, founders] += pedigree.log_prior
+            people = members[descended]
+            logp[:, descended] += pedigree.log_inheritance[
+                :, genes[:, mother[people]], genes[:, father[people]]
+            ].transpose(1, 2, 0)
+            if child.size:
+                terms = as_parent[role[:, None], genes[:, child][:, :, None], np.arange(3),
+                                  genes[:, other][:, :, None]]
+                logp += np.bincount(scatter, weights=terms.ravel(),
+                                    minlength=logp.size).reshape(logp.shape)
+            p = np.exp(logp - logp.max(axis=2, keepdims=True))
+            p /= p.sum(axis=2, keepdims=True)
+            u = rng.random((chains, len(members)))
+            genes[:, members] = (u >= p[:, :, 0]).astype(np.intp) + (u >= p[:, :, 0] + p[:, :, 1])
+            if sweeps >= BURN_IN:
+                totals[:, members] += p
+        sweeps += 1
+
+        if sweeps > BURN_IN and (sweeps - BURN_IN) % CHECK == 0:
+            means = totals / (sweeps - BURN_IN)
+            trait_means = means @ pedigree.has_trait
+            gene_error = means.std(axis=0, ddof=1) / np.sqrt(chains)
+            trait_error = trait_means.std(axis=0, ddof=1) / np.sqrt(chains)
+            unknown = pedigree.traits < 0
+            if done(max(gene_error.max(initial=0.0), trait_error[unknown].max(initial=0.0))):
+                return (means.mean(axis=0), gene_error, trait_means.mean(axis=0), trait_error,
+                        chains * (sweeps - BURN_IN))
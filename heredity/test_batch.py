@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+from batch import Cache, family_key, run_batch
+from heredity import load_data
+
+
+def write(path, rows):
+    path.write_text("name,mother,father,trait\n" + "".join(row + "\n" for row in rows))
+    return str(path)
+
+
+def test_renamed_family_shares_key(tmp_path):
+    a = write(tmp_path / "a.csv", ["Harry,Lily,James,", "James,,,1", "Lily,,,0"])
+    b = write(tmp_path / "b.csv", ["Kid,Mum,Dad,", "Dad,,,1", "Mum,,,0"])
+    assert family_key(load_data(a), "exact") == family_key(load_data(b), "exact")
+    assert family_key(load_data(a), "exact") != family_key(load_data(a), "exhaustive")
+
+
+def test_evidence_changes_key(tmp_path):
+    a = write(tmp_path / "a.csv", ["Harry,Lily,James,", "James,,,1", "Lily,,,0"])
+    b = write(tmp_path / "b.csv", ["Harry,Lily,James,", "James,,,1", "Lily,,,"])
+    assert family_key(load_data(a), "exact") != family_key(load_data(b), "exact")
+
+
+def test_repeated_family_is_solved_once(tmp_path):
+    a = write(tmp_path / "a.csv", ["Harry,Lily,James,", "James,,,1", "Lily,,,0"])
+    b = write(tmp_path / "b.csv", ["Kid,Mum,Dad,", "Dad,,,1", "Mum,,,0"])
+    rows = list(run_batch([a, b], workers=1))
+    assert [row[3] for row in rows] == [False, True]
+    assert rows[0][2] == rows[1][2]
+    assert rows[1][1] == ["Kid", "Dad", "Mum"]
+
+
+def test_cache_is_reused_between_runs(tmp_path):
+    a = write(tmp_path / "a.csv", ["Harry,Lily,James,", "James,,,1", "Lily,,,0"])
+    cache = Cache(str(tmp_path / "cache.sqlite3"))
+    first = list(run_batch([a], workers=1, cache=cache))
+    second = list(run_batch([a], workers=1, cache=cache))
+    cache.close()
+    assert first[0][3] is False and second[0][3] is True
+    assert sum(first[0][2], []) == pytest.approx(sum(second[0][2], []))
+
+
+def test_unknown_parent_is_not_keyed_as_founder(tmp_path):
+    single = write(tmp_path / "a_single.csv", ["A,,,1"])
+    bad = write(tmp_path / "b_badparent.csv", ["A,X,Y,1"])
+    rows = list(run_batch([single, bad], workers=1))
+    assert rows[0][1] == ["A"]
+    path, names, error, cached = rows[1]
+    assert path == bad and names is None and cached is False
+    assert "X" in error
+
+
+def test_unreadable_files_do_not_stop_the_batch(tmp_path):
+    good = write(tmp_path / "good.csv", ["Harry,Lily,James,", "James,,,1", "Lily,,,0"])
+    binary = tmp_path / "binary.csv"
+    binary.write_bytes(b"name,mother,father,trait\n\xff\xfe,,,1\n")
+    missing = str(tmp_path / "missing.csv")
+    rows = list(run_batch([str(binary), missing, good], workers=1))
+    assert [row[1] is None for row in rows] == [True, True, False]
+    assert rows[0][2].startswith("UnicodeDecodeError")
+    assert rows[1][2].startswith("FileNotFoundError")
+
+
+def test_jsonl_reports_errors(tmp_path):
+    from io import StringIO
+
+    from batch import write_jsonl
+
+    bad = write(tmp_path / "bad.csv", ["A,X,Y,1"])
+    out = StringIO()
+    write_jsonl(out, run_batch([bad], workers=1))
+    record = json.loads(out.getvalue())
+    assert record["file"] == bad and "error" in record
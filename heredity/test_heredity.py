@@ -0,0 +1,147 @@
+import os
+import random
+
+import pytest
+
+import heredity
+from batched import batched_probabilities
+from elimination import elimination_order, exact_probabilities, family_factors
+from sampling import SAMPLERS, sample_probabilities
+
+SEEDS = range(8)
+
+DATA = os.path.join(os.path.dirname(__file__), "data")
+
+
+def random_family(seed, size=None):
+    """
+    A random `load_data`-style family of up to 7 people: each is a
+    founder or the child of two earlier people, so relatives sometimes
+    have children together, and about half the traits are known. People
+    are listed in shuffled order, as a CSV may list children first.
+    """
+    rng = random.Random(seed)
+    size = size or rng.randint(2, 7)
+    people = {}
+    for i in range(size):
+        name = f"P{i}"
+        mother = father = None
+        if i >= 2 and rng.random() < 0.6:
+            mother, father = (f"P{j}" for j in rng.sample(range(i), 2))
+        trait = rng.choice([True, False, None, None])
+        people[name] = {"name": name, "mother": mother, "father": father, "trait": trait}
+    names = list(people)
+    rng.shuffle(names)
+    return {name: people[name] for name in names}
+
+
+def brute_force(people):
+    """The distributions by the original enumeration over every subset."""
+    probabilities = {
+        person: {"gene": {2: 0, 1: 0, 0: 0}, "trait": {True: 0, False: 0}}
+        for person in people
+    }
+    names = set(people)
+    for have_trait in heredity.powerset(names):
+        if any(people[person]["trait"] is not None and
+               people[person]["trait"] != (person in have_trait)
+               for person in names):
+            continue
+        for one_gene in heredity.powerset(names):
+            for two_genes in heredity.powerset(names - one_gene):
+                p = heredity.joint_probability(people, one_gene, two_genes, have_trait)
+                heredity.update(probabilities, one_gene, two_genes, have_trait, p)
+    heredity.normalize(probabilities)
+    return probabilities
+
+
+def assert_probabilities(probabilities, expected, tolerance=1e-9):
+    assert list(probabilities) == list(expected)
+    for person in expected:
+        for field in ("gene", "trait"):
+            assert probabilities[person][field].keys() == expected[person][field].keys()
+            for value, p in expected[person][field].items():
+                assert probabilities[person][field][value] == pytest.approx(p, abs=tolerance)
+
+
+@pytest.fixture(params=SEEDS)
+def family(request):
+    people = random_family(request.param)
+    return people, brute_force(people)
+
+
+def test_exact_matches_brute_force(family):
+    people, expected = family
+    assert_probabilities(exact_probabilities(people), expected)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_exhaustive_matches_brute_force(family, workers):
+    people, expected = family
+    assert_probabilities(heredity.exhaustive_probabilities(people, workers), expected)
+
+
+def test_shards_cover_every_assignment(family):
+    people, expected = family
+    probabilities = {
+        person: {"gene": {2: 0, 1: 0, 0: 0}, "trait": {True: 0, False: 0}}
+        for person in people
+    }
+    names = list(people)
+    for fixed in heredity.shards(people):
+        genes, traits = heredity.shard_totals(people, fixed)
+        for i, person in enumerate(names):
+            for g in range(3):
+                probabilities[person]["gene"][g] += genes[i][g]
+            for t in range(2):
+                probabilities[person]["trait"][bool(t)] += traits[i][t]
+    heredity.normalize(probabilities)
+    assert_probabilities(probabilities, expected)
+
+
+@pytest.mark.parametrize("batch", [5, 64, 1 << 16])
+def test_vectorized_matches_brute_force(family, batch):
+    people, expected = family
+    assert_probabilities(batched_probabilities(people, batch), expected)
+
+
+@pytest.mark.parametrize("filename", ["family0.csv", "family1.csv", "family2.csv"])
+def test_methods_agree_on_data(filename):
+    people = heredity.load_data(os.path.join(DATA, filename))
+    expected = brute_force(people)
+    assert_probabilities(exact_probabilities(people), expected)
+    assert_probabilities(heredity.exhaustive_probabilities(people), expected)
+    assert_probabilities(batched_probabilities(people), expected)
+
+
+@pytest.mark.parametrize("method", SAMPLERS)
+def test_samplers_within_tolerance(method):
+    for seed in range(3):
+        people = random_family(seed, 6)
+        expected = brute_force(people)
+        probabilities, stats = sample_probabilities(people, method, seconds=2.0,
+                                                    standard_error=0.005, seed=seed)
+        assert stats["samples"] > 0
+        # Well within five standard errors, plus a little for the noise
+        # in the standard errors themselves
+        for person in people:
+            for field in ("gene", "trait"):
+                for value, p in expected[person][field].items():
+                    error = stats["standard_error"][person][field][value]
+                    assert abs(probabilities[person][field][value] - p) <= 5 * error + 0.01
+
+
+def test_unknown_sampler():
+    with pytest.raises(ValueError):
+        sample_probabilities(random_family(0), "rejection")
+
+
+def test_clique_limit():
+    # Two parents and their child always share a clique of three
+    people = random_family(0, 5)
+    people["C"] = {"name": "C", "mother": "P0", "father": "P1", "trait": None}
+    names = list(people)
+    factors = family_factors(people, {name: i for i, name in enumerate(names)})
+    elimination_order(len(names), factors, max_clique=3)
+    with pytest.raises(ValueError, match="gibbs"):
+        elimination_order(len(names), factors, max_clique=2)
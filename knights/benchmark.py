@@ -0,0 +1,204 @@
+import argparse
+import random
+import time
+import tracemalloc
+
+import logic
+from logic import model_check
+
+
+def generated_puzzle(size, seed=0, sentences=logic, rebuild=False):
+    """
+    Returns (knowledge, symbols) for a random puzzle with `size`
+    inhabitants, each of whom makes one or two statements about others:
+    that someone is a knight or a knave, that two people are the same
+    kind, or that at least one of two is a knave. A hidden assignment of
+    knights and knaves decides whether each statement is made as is or
+    negated, so the puzzle always has a solution.
+
+    Sentences are built with the classes of the `sentences` module
+    (logic or interned). With `rebuild`, every mention of a symbol or
+    statement builds it anew, as generators written the obvious way do,
+    rather than reusing one object.
+    """
+    Symbol, Not, And, Or = sentences.Symbol, sentences.Not, sentences.And, sentences.Or
+    Implication = sentences.Implication
+    rng = random.Random(seed)
+    knights = [Symbol(f"{i} is a Knight") for i in range(size)]
+    knaves = [Symbol(f"{i} is a Knave") for i in range(size)]
+    truth = [rng.random() < 0.5 for _ in range(size)]
+
+    def knight(i):
+        return Symbol(f"{i} is a Knight") if rebuild else knights[i]
+
+    def knave(i):
+        return Symbol(f"{i} is a Knave") if rebuild else knaves[i]
+
+    def statement(kind, x, y, negated):
+        if kind == 0:
+            said = knight(x)
+        elif kind == 1:
+            said = knave(x)
+        elif kind == 2:
+            said = Or(And(knight(x), knight(y)), And(knave(x), knave(y)))
+        else:
+            said = Or(knave(x), knave(y))
+        return Not(said) if negated else said
+
+    rules = []
+    for i in range(size):
+        rules.append(Or(knight(i), knave(i)))
+        rules.append(Not(And(knight(i), knave(i))))
+    for i in range(size):
+        for _ in range(rng.randint(1, 2)):
+            x, y = rng.randrange(size), rng.randrange(size)
+            kind = rng.randrange(4)
+            true = [truth[x], not truth[x], truth[x] == truth[y],
+                    not (truth[x] and truth[y])][kind]
+            said = statement(kind, x, y, true != truth[i])
+            rules.append(Implication(knight(i), said))
+            if rebuild:
+                said = statement(kind, x, y, true != truth[i])
+            rules.append(Implication(knave(i), Not(said)))
+    return And(*rules), knights + knaves
+
+
+def bench_sat(args):
+    """
+    Time answering every "is X a knight/knave" query with the SAT
+    backend, checking it against model enumeration on small puzzles.
+    """
+    from sat import KnowledgeBase
+
+    for size in args.sizes:
+        knowledge, symbols = generated_puzzle(size, args.seed)
+        start = time.perf_counter()
+        kb = KnowledgeBase(knowledge)
+        answers = [kb.ask(symbol) for symbol in symbols]
+        seconds = time.perf_counter() - start
+        row = [f"{size:>5} inhabitants", f"sat {1000 * seconds:9.1f} ms",
+               f"{sum(answers):>5} of {size} determined"]
+        if size <= args.enumerate_limit:
+            start = time.perf_counter()
+            expected = [model_check(knowledge, symbol) for symbol in symbols]
+            row.append(f"enumerate {1000 * (time.perf_counter() - start):9.1f} ms")
+            row.append(f"same answers {answers == expected}")
+        print("  ".join(row))
+
+
+def bench_compiled(args):
+    """
+    Time answering every "is X a knight/knave" query by enumerating
+    models with the sentences evaluated directly and compiled.
+    """
+    for size in args.sizes:
+        knowledge, symbols = generated_puzzle(size, args.seed)
+        start = time.perf_counter()
+        answers = [model_check(knowledge, symbol, "compiled") for symbol in symbols]
+        seconds = time.perf_counter() - start
+        row = [f"{size:>3} inhabitants", f"compiled {1000 * seconds:9.1f} ms"]
+        if size <= args.enumerate_limit:
+            start = time.perf_counter()
+            expected = [model_check(knowledge, symbol) for symbol in symbols]
+            direct = time.perf_counter() - start
+            row.append(f"enumerate {1000 * direct:9.1f} ms")
+            row.append(f"speedup {direct / seconds:5.1f}x")
+            row.append(f"same answers {answers == expected}")
+        print("  ".join(row))
+
+
+def bench_bitset(args):
+    """
+    Time answering every "is X a knight/knave" query by evaluating blocks
+    of models as bitsets, checking it against compiled enumeration on
+    small puzzles and against the SAT backend on all of them.
+    """
+    from sat import KnowledgeBase
+
+    for size in args.sizes:
+        knowledge, symbols = generated_puzzle(size, args.seed)
+        start = time.perf_counter()
+        answers = [model_check(knowledge, symbol, "bitset") for symbol in symbols]
+        seconds = time.perf_counter() - start
+        row = [f"{size:>3} inhabitants", f"{2 * size:>3} symbols",
+               f"bitset {1000 * seconds:9.1f} ms"]
+        if size <= args.compiled_limit:
+            start = time.perf_counter()
+            [model_check(knowledge, symbol, "compiled") for symbol in symbols]
+            row.append(f"compiled {1000 * (time.perf_counter() - start):9.1f} ms")
+        kb = KnowledgeBase(knowledge)
+        row.append(f"same answers {answers == [kb.ask(symbol) for symbol in symbols]}")
+        print("  ".join(row))
+
+
+def bench_interned(args):
+    """
+    Compare building a generated puzzle's knowledge base, its memory,
+    and getting its hash and symbols (first and later calls) with plain
+    and with interned sentences.
+    """
+    import interned
+
+    for size in args.sizes:
+        for sentences in (logic, interned):
+            start = time.perf_counter()
+            knowledge, _ = generated_puzzle(size, args.seed, sentences, args.rebuild)
+            build = time.perf_counter() - start
+            del knowledge
+            tracemalloc.start()
+            knowledge, _ = generated_puzzle(size, args.seed, sentences, args.rebuild)
+            memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+
+            start = time.perf_counter()
+            hash(knowledge)
+            knowledge.symbols()
+            first = time.perf_counter() - start
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                hash(knowledge)
+                knowledge.symbols()
+            again = (time.perf_counter() - start) / args.repeat
+            print(f"{size:>6} inhabitants  {sentences.__name__:<8}  build {1000 * build:8.1f} ms  "
+                  f"{memory / 2 ** 20:6.1f} MiB  hash+symbols {1000 * first:8.3f} ms first, "
+                  f"{1000 * again:8.3f} ms again")
+            del knowledge
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for knights logic")
+    parser.add_argument("--seed", type=int, default=0)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    sat = commands.add_parser("sat", help="model enumeration vs the SAT backend")
+    sat.add_argument("--sizes", type=int, nargs="+", default=[3, 5, 7, 100, 300, 1000])
+    sat.add_argument("--enumerate-limit", type=int, default=7,
+                     help="largest puzzle to enumerate models for")
+    sat.set_defaults(run=bench_sat)
+
+    compiled = commands.add_parser("compiled", help="evaluated vs compiled model enumeration")
+    compiled.add_argument("--sizes", type=int, nargs="+", default=[3, 5, 6, 7, 8, 9])
+    compiled.add_argument("--enumerate-limit", type=int, default=7,
+                          help="largest puzzle to enumerate models for without compiling")
+    compiled.set_defaults(run=bench_compiled)
+
+    bitset = commands.add_parser("bitset", help="compiled vs bitset model enumeration")
+    bitset.add_argument("--sizes", type=int, nargs="+", default=[5, 8, 10, 12, 15])
+    bitset.add_argument("--compiled-limit", type=int, default=8,
+                        help="largest puzzle to enumerate compiled models for")
+    bitset.set_defaults(run=bench_bitset)
+
+    interned = commands.add_parser("interned", help="plain vs interned sentences")
+    interned.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    interned.add_argument("--repeat", type=int, default=10,
+                          help="times to take the hash and symbols of each knowledge base")
+    interned.add_argument("--rebuild", action="store_true",
+                          help="build every mention of a symbol or statement anew")
+    interned.set_defaults(run=bench_interned)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
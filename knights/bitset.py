@@ -0,0 +1,150 @@
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+# Symbols whose values vary within a block of models; a block holds
+# 2 ** BLOCK_BITS models as the bits of one Python int
+BLOCK_BITS = 18
+
+# Most blocks with models of the knowledge base kept between queries
+# (each is 2 ** BLOCK_BITS bits)
+KEPT_BLOCKS = 64
+
+# (formula, symbols, blocks) of the last knowledge base checked, where
+# blocks lists the (fixed values, model bits) of every block it has
+# models in, or is None if there were more than KEPT_BLOCKS
+_kept = None
+
+
+def columns(count, bits):
+    """
+    Returns the bit-pattern columns of the first `count` of `bits`
+    symbols over a block of 2 ** bits models: bit m of column i is set
+    when symbol i is true in model m, i.e. when bit i of m is.
+    """
+    size = 1 << bits
+    patterns = []
+    for i in range(count):
+        width = 2 << i
+        pattern = ((1 << (1 << i)) - 1) << (1 << i)
+        while width < size:
+            pattern |= pattern << width
+            width *= 2
+        patterns.append(pattern)
+    return patterns
+
+
+def evaluate(sentence, values, ones):
+    """
+    Evaluates `sentence` over a block of models at once. `values` maps
+    each symbol name to a bool, if it is the same in every model of the
+    block, or else to an int of one bit per model; `ones` is the int
+    with every model's bit set. Returns a bool where the sentence comes
+    out the same in every model (so whole subtrees are skipped once a
+    conjunct is False or a disjunct True), or else an int bitset.
+    """
+    if isinstance(sentence, Symbol):
+        return values[sentence.name]
+    if isinstance(sentence, Not):
+        value = evaluate(sentence.operand, values, ones)
+        return (not value) if isinstance(value, bool) else value ^ ones
+    if isinstance(sentence, (And, Or)):
+        dominant = isinstance(sentence, Or)
+        operands = sentence.disjuncts if dominant else sentence.conjuncts
+        result = not dominant
+        for operand in operands:
+            value = evaluate(operand, values, ones)
+            if isinstance(value, bool):
+                if value == dominant:
+                    return dominant
+            elif isinstance(result, bool):
+                result = value
+            else:
+                result = result | value if dominant else result & value
+        return result
+    if isinstance(sentence, Implication):
+        antecedent = evaluate(sentence.antecedent, values, ones)
+        negated = (not antecedent) if isinstance(antecedent, bool) else antecedent ^ ones
+        if negated is True:
+            return True
+        consequent = evaluate(sentence.consequent, values, ones)
+        if isinstance(consequent, bool):
+            return True if consequent else negated
+        return consequent if negated is False else negated | consequent
+    if isinstance(sentence, Biconditional):
+        left = evaluate(sentence.left, values, ones)
+        right = evaluate(sentence.right, values, ones)
+        if isinstance(left, bool) and isinstance(right, bool):
+            return left == right
+        if isinstance(left, bool):
+            left, right = right, left
+        if isinstance(right, bool):
+            return left if right else left ^ ones
+        return left ^ right ^ ones
+    raise TypeError(f"cannot evaluate {type(sentence).__name__}")
+
+
+def bitset_model_check(knowledge, query):
+    """
+    Checks if knowledge base entails query, like `model_check`, by
+    evaluating "knowledge ∧ ¬query" over blocks of models as bitwise
+    operations: the first BLOCK_BITS symbols take every combination
+    within a block, and the rest are fixed per block. Entailment holds
+    if no model of any block sets a bit.
+
+    Checking several queries against one knowledge base, as a puzzle
+    does, evaluates the knowledge base once: the blocks it has models in
+    are kept, and later queries over its symbols are only evaluated on
+    those.
+    """
+    global _kept
+    symbols = sorted(knowledge.symbols())
+    if not query.symbols() <= set(symbols):
+        return not any(_blocks(knowledge, query, sorted(set(symbols) | query.symbols())))
+
+    # The formula is a snapshot of the knowledge base, which may have
+    # been added to since it was kept
+    formula = knowledge.formula()
+    if _kept is None or _kept[0] != formula or _kept[1] != symbols:
+        blocks = []
+        for block in _blocks(knowledge, None, symbols):
+            blocks.append(block)
+            if len(blocks) > KEPT_BLOCKS:
+                blocks = None
+                break
+        _kept = (formula, symbols, blocks)
+    blocks = _kept[2]
+    if blocks is None:
+        return not any(_blocks(knowledge, query, symbols))
+
+    bits = min(len(symbols), BLOCK_BITS)
+    ones = (1 << (1 << bits)) - 1
+    values = dict(zip(symbols, columns(bits, bits)))
+    for fixed, models in blocks:
+        values.update(fixed)
+        holds = evaluate(query, values, ones)
+        if holds is False or (holds is not True and models & ~holds):
+            return False
+    return True
+
+
+def _blocks(knowledge, query, symbols):
+    """
+    Yields (fixed values, model bits) for every block of models over
+    `symbols` in which "knowledge ∧ ¬query" (or just knowledge, if
+    `query` is None) holds somewhere.
+    """
+    bits = min(len(symbols), BLOCK_BITS)
+    ones = (1 << (1 << bits)) - 1
+    values = dict(zip(symbols, columns(bits, bits)))
+    fixed = symbols[bits:]
+    # Conjuncts over fixed symbols alone come first: they are plain bools
+    # in each block, and rule out most blocks before any bitset is built
+    conjuncts = knowledge.conjuncts if isinstance(knowledge, And) else [knowledge]
+    constant = [c for c in conjuncts if c.symbols() <= set(fixed)]
+    varying = [c for c in conjuncts if not c.symbols() <= set(fixed)]
+    sentence = And(*constant, *varying, *([] if query is None else [Not(query)]))
+    for block in range(1 << len(fixed)):
+        for k, name in enumerate(fixed):
+            values[name] = bool(block >> k & 1)
+        models = evaluate(sentence, values, ones)
+        if models:
+            yield {name: values[name] for name in fixed}, ones if models is True else models
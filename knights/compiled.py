@@ -0,0 +1,76 @@
+import itertools
+
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+# Nesting depth at which a subtree is compiled into a function of its
+# own, keeping generated expressions within the parser's nesting limit
+DEPTH = 50
+
+
+def compile_sentence(sentence, symbols):
+    """
+    Returns a function evaluating `sentence` on a model given as a
+    sequence of truth values, the i-th being the value of `symbols[i]`
+    (a list of symbol names). The sentence becomes one generated Python
+    expression, so evaluating it makes no method calls or dict lookups.
+    """
+    index = {name: i for i, name in enumerate(symbols)}
+    namespace = {}
+    return _function(sentence, index, namespace)
+
+
+def _function(sentence, index, namespace):
+    """Compiles `sentence` into a function, adding helpers to `namespace`."""
+    source = f"lambda m: bool({_expression(sentence, index, namespace, 0)})"
+    return eval(source, namespace)
+
+
+def _expression(sentence, index, namespace, depth):
+    """Returns Python source for `sentence` over the model `m`."""
+    if depth >= DEPTH and not isinstance(sentence, Symbol):
+        name = f"f{len(namespace)}"
+        namespace[name] = None
+        namespace[name] = _function(sentence, index, namespace)
+        return f"{name}(m)"
+
+    if isinstance(sentence, Symbol):
+        if sentence.name not in index:
+            raise Exception(f"variable {sentence.name} not in model")
+        return f"m[{index[sentence.name]}]"
+    if isinstance(sentence, Not):
+        operands = [sentence.operand]
+    elif isinstance(sentence, And):
+        operands = sentence.conjuncts
+    elif isinstance(sentence, Or):
+        operands = sentence.disjuncts
+    elif isinstance(sentence, Implication):
+        operands = [sentence.antecedent, sentence.consequent]
+    elif isinstance(sentence, Biconditional):
+        operands = [sentence.left, sentence.right]
+    else:
+        raise TypeError(f"cannot compile {type(sentence).__name__}")
+    parts = [_expression(operand, index, namespace, depth + 1) for operand in operands]
+
+    if isinstance(sentence, Not):
+        return f"(not {parts[0]})"
+    if isinstance(sentence, And):
+        return "(" + " and ".join(parts) + ")" if parts else "True"
+    if isinstance(sentence, Or):
+        return "(" + " or ".join(parts) + ")" if parts else "False"
+    if isinstance(sentence, Implication):
+        return f"(not {parts[0]} or {parts[1]})"
+    # Each side of a biconditional is evaluated once, and negated to
+    # compare as a bool
+    return f"((not {parts[0]}) == (not {parts[1]}))"
+
+
+def compiled_model_check(knowledge, query):
+    """
+    Checks if knowledge base entails query, like `model_check`, by
+    compiling "knowledge ∧ ¬query" and looking for a model where it holds.
+    Models are tuples from itertools.product, so the whole search runs
+    as one `any` over a `map`.
+    """
+    symbols = sorted(set().union(knowledge.symbols(), query.symbols()))
+    counterexample = compile_sentence(And(knowledge, Not(query)), symbols)
+    return not any(map(counterexample, itertools.product((True, False), repeat=len(symbols))))
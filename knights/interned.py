@@ -0,0 +1,194 @@
+"""
+Hash-consed, immutable versions of the `logic` sentence classes.
+
+Equal interned sentences are one shared node, so they compare by
+identity and keep their hash and symbols from the first time they are
+worked out. Each node costs more to build and more memory than a plain
+sentence, so interning pays off only when a knowledge base repeats
+sentences heavily; with little repetition it is slower and larger.
+"""
+import weakref
+
+import logic
+from logic import METHODS, Sentence, model_check
+
+__all__ = ["Sentence", "Symbol", "Not", "And", "Or", "Implication", "Biconditional",
+           "intern", "model_check", "METHODS"]
+
+# The node of each structure, for as long as something uses it, keyed
+# by what it is built from: a symbol by its name, a negation by its
+# operand, a conjunction by its own tuple of conjuncts, and the rest by
+# their class and children
+_nodes = weakref.WeakValueDictionary()
+
+# Slots every interned node adds to its logic class
+SLOTS = ("_hash", "_symbols", "__weakref__")
+
+# Nodes refuse attribute assignment, so they are built with these
+_new, _set = object.__new__, object.__setattr__
+
+
+class Interned():
+    """
+    Behaviour shared by interned sentences. There is only ever one node
+    of a given structure, so two interned nodes are equal only if they
+    are the same object; compared with a plain `logic` sentence, they
+    are equal if the structures are. The hash is worked out from those
+    of its children when the node is built, and is the one the plain
+    sentence has, and the (frozen) set of symbols when first asked for.
+    Nodes are immutable, so they can be shared between any number of
+    sentences.
+    """
+    __slots__ = ()
+
+    # Fields are set by __new__, so skip the logic classes' __init__
+    __init__ = object.__init__
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if isinstance(other, Interned):
+            return False
+        # Let the plain sentence compare structurally
+        return NotImplemented
+
+    def __hash__(self):
+        return self._hash
+
+    def __setattr__(self, name, value):
+        raise AttributeError("interned sentences are immutable")
+
+    def symbols(self):
+        if self._symbols is None:
+            children = [child.symbols() for child in self.children()]
+            # Reuse the largest child's set when it already has every symbol
+            largest = max(children, key=len, default=frozenset())
+            symbols = largest.union(*children)
+            _set(self, "_symbols", largest if len(symbols) == len(largest) else symbols)
+        return self._symbols
+
+
+def _node(cls, key, hash_value, fields):
+    """
+    Returns the node of `cls` for `key`, building it with `hash_value`
+    and `fields` if there is none yet.
+    """
+    node = _nodes.get(key)
+    if node is None:
+        node = _new(cls)
+        for name, value in fields:
+            _set(node, name, value)
+        _set(node, "_hash", hash_value)
+        _set(node, "_symbols", None)
+        _nodes[key] = node
+    return node
+
+
+class Symbol(Interned, logic.Symbol):
+    __slots__ = SLOTS
+
+    def __new__(cls, name):
+        return _node(cls, name, hash(("symbol", name)), (("name", name),))
+
+    def symbols(self):
+        if self._symbols is None:
+            _set(self, "_symbols", frozenset((self.name,)))
+        return self._symbols
+
+
+class Not(Interned, logic.Not):
+    __slots__ = SLOTS
+
+    def __new__(cls, operand):
+        operand = intern(operand)
+        return _node(cls, operand, hash(("not", operand._hash)), (("operand", operand),))
+
+    def children(self):
+        return (self.operand,)
+
+
+class And(Interned, logic.And):
+    __slots__ = SLOTS
+
+    def __new__(cls, *conjuncts):
+        conjuncts = tuple(map(intern, conjuncts))
+        return _node(cls, conjuncts, hash(("and", tuple(c._hash for c in conjuncts))),
+                     (("conjuncts", conjuncts),))
+
+    def __eq__(self, other):
+        # A plain And holds a list, which never equals this tuple
+        if type(other) is logic.And:
+            return self.conjuncts == tuple(other.conjuncts)
+        return Interned.__eq__(self, other)
+
+    __hash__ = Interned.__hash__
+
+    def children(self):
+        return self.conjuncts
+
+    def add(self, conjunct):
+        raise TypeError("interned sentences are immutable; build a new And instead")
+
+
+class Or(Interned, logic.Or):
+    __slots__ = SLOTS
+
+    def __new__(cls, *disjuncts):
+        disjuncts = tuple(map(intern, disjuncts))
+        return _node(cls, (cls, *disjuncts), hash(("or", tuple(d._hash for d in disjuncts))),
+                     (("disjuncts", disjuncts),))
+
+    def __eq__(self, other):
+        # A plain Or holds a list, which never equals this tuple
+        if type(other) is logic.Or:
+            return self.disjuncts == tuple(other.disjuncts)
+        return Interned.__eq__(self, other)
+
+    __hash__ = Interned.__hash__
+
+    def children(self):
+        return self.disjuncts
+
+
+class Implication(Interned, logic.Implication):
+    __slots__ = SLOTS
+
+    def __new__(cls, antecedent, consequent):
+        antecedent, consequent = intern(antecedent), intern(consequent)
+        return _node(cls, (cls, antecedent, consequent),
+                     hash(("implies", antecedent._hash, consequent._hash)),
+                     (("antecedent", antecedent), ("consequent", consequent)))
+
+    def children(self):
+        return (self.antecedent, self.consequent)
+
+
+class Biconditional(Interned, logic.Biconditional):
+    __slots__ = SLOTS
+
+    def __new__(cls, left, right):
+        left, right = intern(left), intern(right)
+        return _node(cls, (cls, left, right), hash(("biconditional", left._hash, right._hash)),
+                     (("left", left), ("right", right)))
+
+    def children(self):
+        return (self.left, self.right)
+
+
+def intern(sentence):
+    """Returns the interned node with the structure of any logical sentence."""
+    if isinstance(sentence, Interned):
+        return sentence
+    if isinstance(sentence, logic.Symbol):
+        return Symbol(sentence.name)
+    if isinstance(sentence, logic.Not):
+        return Not(sentence.operand)
+    if isinstance(sentence, logic.And):
+        return And(*sentence.conjuncts)
+    if isinstance(sentence, logic.Or):
+        return Or(*sentence.disjuncts)
+    if isinstance(sentence, logic.Implication):
+        return Implication(sentence.antecedent, sentence.consequent)
+    if isinstance(sentence, logic.Biconditional):
+        return Biconditional(sentence.left, sentence.right)
+    raise TypeError("must be a logical sentence")
@@ -2,6 +2,7 @@ import itertools
 
 
 class Sentence():
+    __slots__ = ()
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
@@ -15,6 +16,14 @@ class Sentence():
         """Returns a set of all symbols in the logical sentence."""
         return set()
 
+    def compile(self, symbols):
+        """
+        Returns a function evaluating the sentence on a sequence of truth
+        values, the i-th for the symbol named `symbols[i]`.
+        """
+        from compiled import compile_sentence
+        return compile_sentence(self, symbols)
+
     @classmethod
     def validate(cls, sentence):
         if not isinstance(sentence, Sentence):
@@ -43,6 +52,7 @@ class Sentence():
 
 
 class Symbol(Sentence):
+    __slots__ = ("name",)
 
     def __init__(self, name):
         self.name = name
@@ -70,6 +80,8 @@ class Symbol(Sentence):
 
 
 class Not(Sentence):
+    __slots__ = ("operand",)
+
     def __init__(self, operand):
         Sentence.validate(operand)
         self.operand = operand
@@ -94,6 +106,8 @@ class Not(Sentence):
 
 
 class And(Sentence):
+    __slots__ = ("conjuncts",)
+
     def __init__(self, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
@@ -127,10 +141,12 @@ class And(Sentence):
                            for conjunct in self.conjuncts])
 
     def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+        return set().union(*[conjunct.symbols() for conjunct in self.conjuncts])
 
 
 class Or(Sentence):
+    __slots__ = ("disjuncts",)
+
     def __init__(self, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
@@ -158,10 +174,12 @@ class Or(Sentence):
                             for disjunct in self.disjuncts])
 
     def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+        return set().union(*[disjunct.symbols() for disjunct in self.disjuncts])
 
 
 class Implication(Sentence):
+    __slots__ = ("antecedent", "consequent")
+
     def __init__(self, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
@@ -189,10 +207,12 @@ class Implication(Sentence):
         return f"{antecedent} => {consequent}"
 
     def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+        return set().union(self.antecedent.symbols(), self.consequent.symbols())
 
 
 class Biconditional(Sentence):
+    __slots__ = ("left", "right")
+
     def __init__(self, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
@@ -222,11 +242,31 @@ class Biconditional(Sentence):
         return f"{left} <=> {right}"
 
     def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
-
-
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
+        return set().union(self.left.symbols(), self.right.symbols())
+
+
+# Ways `model_check` can decide entailment
+METHODS = ("enumerate", "compiled", "bitset", "sat")
+
+
+def model_check(knowledge, query, method="enumerate"):
+    """
+    Checks if knowledge base entails query, by enumerating every model
+    (evaluating the sentences directly, compiled by compiled.py, or on
+    blocks of models at once as bitsets by bitset.py) or, with method
+    "sat", with the CDCL solver in sat.py.
+    """
+    if method not in METHODS:
+        raise ValueError(f"unknown method {method!r}, expected one of {', '.join(METHODS)}")
+    if method == "compiled":
+        from compiled import compiled_model_check
+        return compiled_model_check(knowledge, query)
+    if method == "bitset":
+        from bitset import bitset_model_check
+        return bitset_model_check(knowledge, query)
+    if method == "sat":
+        from sat import entails
+        return entails(knowledge, query)
 
     def check_all(knowledge, query, symbols, model):
         """Checks if knowledge base entails query, given a particular model."""
@@ -257,7 +297,7 @@ def model_check(knowledge, query):
                     check_all(knowledge, query, remaining, model_false))
 
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+    symbols = set().union(knowledge.symbols(), query.symbols())
 
     # Check that knowledge entails query
     return check_all(knowledge, query, symbols, dict())
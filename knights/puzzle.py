@@ -1,3 +1,5 @@
+import argparse
+
 from logic import *
 
 AKnight = Symbol("A is a Knight")
@@ -103,6 +105,11 @@ knowledge3 = And(
 
 
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--method", choices=METHODS, default="enumerate",
+                        help="enumerate every model (evaluating sentences directly, compiled, "
+                             "or as bitsets over blocks of models), or refute with a SAT solver")
+    args = parser.parse_args()
     symbols = [AKnight, AKnave, BKnight, BKnave, CKnight, CKnave]
     puzzles = [
         ("Puzzle 0", knowledge0),
@@ -116,7 +123,7 @@ def main():
             print("    Not yet implemented.")
         else:
             for symbol in symbols:
-                if model_check(knowledge, symbol):
+                if model_check(knowledge, symbol, args.method):
                     print(f"    {symbol}")
 
 
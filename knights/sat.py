@@ -0,0 +1,337 @@
+import heapq
+
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+# Activity decay of variables not involved in recent conflicts
+DECAY = 0.95
+
+# Conflicts before the first restart, and the growth of that limit after each
+RESTART = 100
+RESTART_GROWTH = 1.5
+
+
+class Solver():
+    """
+    A CDCL SAT solver. Variable v has the literals 2v (true) and 2v + 1
+    (false), so `literal ^ 1` negates a literal. Clauses watch their
+    first two literals; conflicts are analysed to the first unique
+    implication point and the learnt clause is kept; decisions follow
+    variable activity (VSIDS) with saved phases and restarts.
+
+    Clauses are only added between calls to `solve`, which always
+    returns to decision level 0.
+    """
+
+    def __init__(self):
+        self.clauses = []
+        self.watches = []     # per literal: clauses watching it
+        self.values = []      # per variable: 1 true, 0 false, -1 unassigned
+        self.levels = []
+        self.reasons = []     # per variable: the clause that implied it
+        self.activity = []
+        self.phase = []       # per variable: the sign it last had
+        self.trail = []
+        self.limits = []      # trail length at the start of each level
+        self.head = 0         # trail position propagated up to
+        self.heap = []
+        self.increment = 1.0
+        self.ok = True
+        self.model = None
+
+    def new_variable(self):
+        """Returns a new variable."""
+        v = len(self.values)
+        self.values.append(-1)
+        self.levels.append(0)
+        self.reasons.append(None)
+        self.activity.append(0.0)
+        self.phase.append(1)
+        self.watches += [[], []]
+        heapq.heappush(self.heap, (0.0, v))
+        return v
+
+    def value(self, literal):
+        """Returns 1 if `literal` is true, 0 if false, -1 if unassigned."""
+        value = self.values[literal >> 1]
+        return value if value < 0 else value ^ (literal & 1)
+
+    def add_clause(self, literals):
+        """Adds the disjunction of `literals`."""
+        if not self.ok:
+            return
+        literals = set(literals)
+        clause = []
+        for literal in literals:
+            value = self.value(literal)
+            if value == 1 or literal ^ 1 in literals:
+                return
+            if value < 0:
+                clause.append(literal)
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self.assign(clause[0], None)
+            self.ok = self.propagate() is None
+        else:
+            self.attach(clause)
+
+    def attach(self, clause):
+        """Stores a clause and watches its first two literals."""
+        index = len(self.clauses)
+        self.clauses.append(clause)
+        self.watches[clause[0]].append(index)
+        self.watches[clause[1]].append(index)
+        return index
+
+    def assign(self, literal, reason):
+        v = literal >> 1
+        self.values[v] = 1 ^ (literal & 1)
+        self.levels[v] = len(self.limits)
+        self.reasons[v] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """
+        Assigns every literal implied by unit clauses. Returns a clause
+        with every literal false, or None if there is no conflict.
+        """
+        values, clauses, watches = self.values, self.clauses, self.watches
+        while self.head < len(self.trail):
+            false = self.trail[self.head] ^ 1
+            self.head += 1
+            watching = watches[false]
+            kept = []
+            for i, c in enumerate(watching):
+                clause = clauses[c]
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], false
+                first = clause[0]
+                value = values[first >> 1]
+                if value >= 0 and value ^ (first & 1):
+                    kept.append(c)
+                    continue
+                # Look for another literal that is not false to watch
+                for k in range(2, len(clause)):
+                    literal = clause[k]
+                    value = values[literal >> 1]
+                    if value < 0 or value ^ (literal & 1):
+                        clause[1], clause[k] = literal, false
+                        watches[literal].append(c)
+                        break
+                else:
+                    kept.append(c)
+                    value = values[first >> 1]
+                    if value >= 0:
+                        kept.extend(watching[i + 1:])
+                        watches[false] = kept
+                        return c
+                    self.assign(first, c)
+            watches[false] = kept
+        return None
+
+    def analyze(self, conflict):
+        """
+        Returns (learnt clause, level to jump back to) for a conflict:
+        the clause is resolved from the conflict and the reasons of its
+        literals until one literal of the current level is left.
+        """
+        level = len(self.limits)
+        learnt = [None]
+        seen = set()
+        pending = 0
+        index = len(self.trail) - 1
+        literal = None
+        clause = conflict
+        while True:
+            for q in self.clauses[clause][0 if literal is None else 1:]:
+                v = q >> 1
+                if v not in seen and self.levels[v] > 0:
+                    seen.add(v)
+                    self.bump(v)
+                    if self.levels[v] == level:
+                        pending += 1
+                    else:
+                        learnt.append(q)
+            while self.trail[index] >> 1 not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.reasons[literal >> 1]
+        learnt[0] = literal ^ 1
+
+        back = 0
+        if len(learnt) > 1:
+            k = max(range(1, len(learnt)), key=lambda k: self.levels[learnt[k] >> 1])
+            learnt[1], learnt[k] = learnt[k], learnt[1]
+            back = self.levels[learnt[1] >> 1]
+        return learnt, back
+
+    def bump(self, v):
+        """Raises the activity of a variable involved in a conflict."""
+        self.activity[v] += self.increment
+        if self.activity[v] > 1e100:
+            self.activity = [a * 1e-100 for a in self.activity]
+            self.increment *= 1e-100
+            self.heap = [(-a, u) for u, a in enumerate(self.activity) if self.values[u] < 0]
+            heapq.heapify(self.heap)
+        elif self.values[v] < 0:
+            heapq.heappush(self.heap, (-self.activity[v], v))
+
+    def backtrack(self, level):
+        """Undoes every assignment above decision level `level`."""
+        if len(self.limits) <= level:
+            return
+        start = self.limits[level]
+        for literal in self.trail[start:]:
+            v = literal >> 1
+            self.phase[v] = literal & 1
+            self.values[v] = -1
+            self.reasons[v] = None
+            heapq.heappush(self.heap, (-self.activity[v], v))
+        del self.trail[start:]
+        del self.limits[level:]
+        self.head = len(self.trail)
+
+    def pick(self):
+        """Returns the unassigned variable of highest activity, or None."""
+        while self.heap:
+            activity, v = heapq.heappop(self.heap)
+            if self.values[v] < 0 and -activity == self.activity[v]:
+                return v
+        return None
+
+    def solve(self, assumptions=()):
+        """
+        Returns whether the clauses are satisfiable with every literal in
+        `assumptions` true. If they are, `model` holds a satisfying value
+        (1 or 0) for every variable.
+        """
+        if not self.ok:
+            return False
+        limit, conflicts = RESTART, 0
+        try:
+            while True:
+                conflict = self.propagate()
+                if conflict is not None:
+                    if not self.limits:
+                        self.ok = False
+                        return False
+                    learnt, level = self.analyze(conflict)
+                    self.backtrack(level)
+                    self.assign(learnt[0], self.attach(learnt) if len(learnt) > 1 else None)
+                    self.increment /= DECAY
+                    conflicts += 1
+                    continue
+
+                if conflicts >= limit:
+                    self.backtrack(0)
+                    limit, conflicts = limit * RESTART_GROWTH, 0
+                    continue
+
+                # Assumptions are the first decisions, one level each
+                level = len(self.limits)
+                if level < len(assumptions):
+                    literal = assumptions[level]
+                    value = self.value(literal)
+                    if value == 0:
+                        return False
+                    self.limits.append(len(self.trail))
+                    if value < 0:
+                        self.assign(literal, None)
+                    continue
+
+                v = self.pick()
+                if v is None:
+                    self.model = list(self.values)
+                    return True
+                self.limits.append(len(self.trail))
+                self.assign(2 * v + self.phase[v], None)
+        finally:
+            self.backtrack(0)
+
+
+class KnowledgeBase():
+    """
+    Sentences told so far, converted to CNF in a Solver by Tseitin
+    encoding: every connective gets a variable constrained to equal it,
+    so the clauses grow linearly with the sentences. Learnt clauses
+    carry over from one query to the next.
+    """
+
+    def __init__(self, *sentences):
+        self.solver = Solver()
+        self.variables = {}
+        # Literal of each sentence encoded, by id; the sentence is kept
+        # so its id is not reused
+        self.literals = {}
+        for sentence in sentences:
+            self.tell(sentence)
+
+    def tell(self, sentence):
+        """Adds a sentence to the knowledge base."""
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.tell(conjunct)
+        elif isinstance(sentence, Or):
+            self.solver.add_clause([self.literal(disjunct) for disjunct in sentence.disjuncts])
+        else:
+            self.solver.add_clause([self.literal(sentence)])
+
+    def ask(self, query):
+        """Returns whether the knowledge base entails `query`."""
+        return not self.solver.solve([self.literal(query) ^ 1])
+
+    def satisfiable(self):
+        """Returns whether anything is consistent with the knowledge base."""
+        return self.solver.solve()
+
+    def literal(self, sentence):
+        """Returns a literal equal to `sentence`, encoding it if needed."""
+        known = self.literals.get(id(sentence))
+        if known is not None:
+            return known[1]
+
+        if isinstance(sentence, Symbol):
+            if sentence.name not in self.variables:
+                self.variables[sentence.name] = self.solver.new_variable()
+            literal = 2 * self.variables[sentence.name]
+        elif isinstance(sentence, Not):
+            literal = self.literal(sentence.operand) ^ 1
+        elif isinstance(sentence, (And, Or, Implication)):
+            if isinstance(sentence, And):
+                parts = [self.literal(conjunct) for conjunct in sentence.conjuncts]
+            elif isinstance(sentence, Or):
+                parts = [self.literal(disjunct) for disjunct in sentence.disjuncts]
+            else:
+                parts = [self.literal(sentence.antecedent) ^ 1, self.literal(sentence.consequent)]
+            literal = 2 * self.solver.new_variable()
+            if isinstance(sentence, And):
+                # literal <=> all parts
+                for part in parts:
+                    self.solver.add_clause([literal ^ 1, part])
+                self.solver.add_clause([literal] + [part ^ 1 for part in parts])
+            else:
+                # literal <=> any part
+                for part in parts:
+                    self.solver.add_clause([literal, part ^ 1])
+                self.solver.add_clause([literal ^ 1] + parts)
+        elif isinstance(sentence, Biconditional):
+            left, right = self.literal(sentence.left), self.literal(sentence.right)
+            literal = 2 * self.solver.new_variable()
+            self.solver.add_clause([literal ^ 1, left ^ 1, right])
+            self.solver.add_clause([literal ^ 1, left, right ^ 1])
+            self.solver.add_clause([literal, left, right])
+            self.solver.add_clause([literal, left ^ 1, right ^ 1])
+        else:
+            raise TypeError(f"cannot encode {type(sentence).__name__}")
+
+        self.literals[id(sentence)] = (sentence, literal)
+        return literal
+
+
+def entails(knowledge, query):
+    """Checks if knowledge base entails query, by refuting knowledge ∧ ¬query."""
+    return KnowledgeBase(knowledge).ask(query)
@@ -0,0 +1,165 @@
+import gc
+import random
+
+import pytest
+
+import interned
+import logic
+import puzzle
+from logic import METHODS, model_check
+from sat import KnowledgeBase
+
+SEEDS = range(300)
+
+
+def random_sentence(module, rng, symbols, depth):
+    """A random sentence over `symbols`, built with `module`'s classes."""
+    if depth == 0 or rng.random() < 0.3:
+        return module.Symbol(rng.choice(symbols))
+    kind = rng.choice(["not", "and", "or", "implies", "biconditional"])
+    children = [random_sentence(module, rng, symbols, depth - 1) for _ in range(rng.randint(0, 3))]
+    if kind == "not":
+        return module.Not(random_sentence(module, rng, symbols, depth - 1))
+    if kind == "and":
+        return module.And(*children)
+    if kind == "or":
+        return module.Or(random_sentence(module, rng, symbols, depth - 1), *children)
+    pair = (random_sentence(module, rng, symbols, depth - 1),
+            random_sentence(module, rng, symbols, depth - 1))
+    return module.Implication(*pair) if kind == "implies" else module.Biconditional(*pair)
+
+
+def random_pair(module, seed, symbols="ABCDE"):
+    """The same random knowledge base and query for any `seed` and module."""
+    rng = random.Random(seed)
+    return random_sentence(module, rng, symbols, 4), random_sentence(module, rng, symbols, 3)
+
+
+def random_puzzle(seed, people="ABCD"):
+    """
+    A random knights and knaves puzzle: every person is exactly one of
+    the two, and each says something about the others that holds if
+    and only if they are a knight.
+    """
+    rng = random.Random(seed)
+    knight = {p: logic.Symbol(f"{p} is a Knight") for p in people}
+    knave = {p: logic.Symbol(f"{p} is a Knave") for p in people}
+    knowledge = logic.And()
+    for p in people:
+        knowledge.add(logic.Or(knight[p], knave[p]))
+        knowledge.add(logic.Not(logic.And(knight[p], knave[p])))
+        claims = [rng.choice([knight, knave])[q] for q in rng.sample(people, rng.randint(1, 2))]
+        statement = rng.choice([logic.And, logic.Or])(*claims)
+        knowledge.add(logic.Implication(knight[p], statement))
+        knowledge.add(logic.Implication(knave[p], logic.Not(statement)))
+    return knowledge, [*knight.values(), *knave.values()]
+
+
+@pytest.mark.parametrize("method", METHODS[1:])
+def test_methods_match_enumerate(method):
+    for seed in SEEDS:
+        knowledge, query = random_pair(logic, seed)
+        assert model_check(knowledge, query, method) == model_check(knowledge, query), seed
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_methods_solve_puzzles(method):
+    # What the baseline `puzzle.py` prints for each puzzle
+    expected = [
+        [puzzle.AKnave],
+        [puzzle.AKnave, puzzle.BKnight],
+        [puzzle.AKnave, puzzle.BKnight],
+        [puzzle.AKnave, puzzle.BKnight, puzzle.CKnave],
+    ]
+    symbols = [puzzle.AKnight, puzzle.AKnave, puzzle.BKnight, puzzle.BKnave,
+               puzzle.CKnight, puzzle.CKnave]
+    knowledge = [puzzle.knowledge0, puzzle.knowledge1, puzzle.knowledge2, puzzle.knowledge3]
+    for kb, answer in zip(knowledge, expected):
+        assert [s for s in symbols if model_check(kb, s, method)] == answer
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_methods_match_on_random_puzzles(method):
+    for seed in range(30):
+        knowledge, symbols = random_puzzle(seed)
+        expected = [model_check(knowledge, s) for s in symbols]
+        assert [model_check(knowledge, s, method) for s in symbols] == expected, seed
+
+
+def test_bitset_and_sat_agree_beyond_one_block():
+    # 20 symbols is several blocks of models for the bitset checker
+    symbols = [f"S{i}" for i in range(20)]
+    for seed in range(5):
+        rng = random.Random(seed)
+        knowledge = logic.And(*(logic.Symbol(s) for s in rng.sample(symbols, 15)),
+                              random_sentence(logic, rng, symbols, 4))
+        query = random_sentence(logic, rng, symbols, 3)
+        assert model_check(knowledge, query, "bitset") == model_check(knowledge, query, "sat")
+
+
+def test_compiled_handles_deep_sentences():
+    sentence = logic.Symbol("A")
+    for i in range(200):
+        sentence = logic.Not(sentence) if i % 2 else logic.And(sentence, logic.Symbol("B"))
+    for query in (logic.Symbol("A"), logic.Not(logic.Symbol("A")), logic.Symbol("B")):
+        expected = model_check(sentence, query)
+        assert model_check(sentence, query, "compiled") == expected
+        assert model_check(sentence, query, "bitset") == expected
+
+
+def test_knowledge_base_answers_many_queries():
+    for seed in range(30):
+        knowledge, symbols = random_puzzle(seed)
+        kb = KnowledgeBase(knowledge)
+        assert kb.satisfiable() == (not model_check(knowledge, logic.Or()))
+        for s in symbols:
+            assert kb.ask(s) == model_check(knowledge, s)
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        model_check(logic.Symbol("A"), logic.Symbol("A"), "resolution")
+
+
+def test_interned_matches_logic():
+    for seed in SEEDS:
+        knowledge, query = random_pair(logic, seed)
+        i_knowledge, i_query = random_pair(interned, seed)
+        assert i_knowledge is interned.intern(knowledge)
+        assert i_query is interned.intern(query)
+        assert i_knowledge.symbols() == knowledge.symbols()
+        assert i_knowledge.formula() == knowledge.formula()
+        assert (i_knowledge is i_query) == (knowledge == query)
+        for method in METHODS:
+            assert model_check(i_knowledge, i_query, method) == model_check(knowledge, query), seed
+
+
+def test_interned_compares_with_logic():
+    for seed in SEEDS:
+        sentence = random_pair(logic, seed)[0]
+        node = interned.intern(sentence)
+        assert node == sentence and sentence == node and not node != sentence
+        assert hash(node) == hash(sentence)
+        assert len({node, sentence}) == 1
+    a, b = interned.Symbol("A"), logic.Symbol("B")
+    assert a != b and b != a
+    assert interned.And(a) != logic.Or(logic.Symbol("A"))
+    assert interned.And(a) == logic.And(logic.Symbol("A"))
+    assert a.__eq__(1) is NotImplemented
+    assert a != 1
+
+
+def test_interned_nodes_are_immutable_and_freed():
+    node = interned.Not(interned.Symbol("freed"))
+    with pytest.raises(AttributeError):
+        node.operand = interned.Symbol("other")
+    with pytest.raises(TypeError):
+        interned.And(interned.Symbol("freed")).add(node)
+    with pytest.raises(TypeError):
+        interned.intern(1)
+    wide = interned.And(*(interned.Not(interned.Symbol(f"freed {i}")) for i in range(100)))
+    count = len(interned._nodes)
+    del wide
+    gc.collect()
+    assert len(interned._nodes) <= count - 201
+    assert interned.Not(interned.Symbol("freed")) is node
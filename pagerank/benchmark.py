@@ -0,0 +1,313 @@
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+import numpy as np
+
+import pagerank
+from crawler import crawl_edges
+from edgefile import EdgeFile, EdgeFileWriter, edge_file_pagerank, peak_memory
+from incremental import RankState
+from solvers import SOLVERS, solve
+from sparse import LinkMatrix, personalized_power_iteration, power_iteration
+
+# Bundled corpora the solvers are checked against
+CORPORA = ("corpus0", "corpus1", "corpus2")
+
+
+def synthetic_corpus(pages, links_per_page=8, seed=0):
+    """
+    Return (sources, targets) int arrays of a random link graph where
+    link targets follow a power law, as on the web, and a few pages
+    have no links at all.
+    """
+    rng = np.random.default_rng(seed)
+    counts = rng.poisson(links_per_page, pages)
+    counts[rng.random(pages) < 0.05] = 0
+    sources = np.repeat(np.arange(pages), counts)
+    targets = (rng.pareto(1.5, len(sources)) * pages / 50).astype(np.int64) % pages
+    return sources, targets
+
+
+def to_corpus(pages, sources, targets):
+    """Convert an edge list to a `crawl`-style dict of page names."""
+    names = [f"{i}.html" for i in range(pages)]
+    corpus = {name: set() for name in names}
+    for s, t in zip(sources.tolist(), targets.tolist()):
+        if s != t:
+            corpus[names[s]].add(names[t])
+    return corpus
+
+
+def bench_sparse(args):
+    """
+    Time the sparse engine on graphs of increasing size, and compare it
+    with `iterate_pagerank` on graphs up to `--legacy-limit` pages.
+    """
+    pages = args.start
+    while pages <= args.pages:
+        sources, targets = synthetic_corpus(pages, seed=args.seed)
+        start = time.perf_counter()
+        matrix = LinkMatrix(range(pages), sources, targets)
+        built = time.perf_counter() - start
+        start = time.perf_counter()
+        ranks, iterations = power_iteration(matrix, pagerank.DAMPING, args.tolerance)
+        solved = time.perf_counter() - start
+        row = [f"{pages:>9} pages {len(sources):>10} links",
+               f"sparse build {built:7.3f} s solve {solved:7.3f} s ({iterations} iterations)"]
+
+        if pages <= args.legacy_limit:
+            corpus = to_corpus(pages, sources, targets)
+            start = time.perf_counter()
+            pagerank.iterate_pagerank(corpus, pagerank.DAMPING)
+            row.append(f"iterate_pagerank {time.perf_counter() - start:7.3f} s")
+        print("  ".join(row))
+        pages *= 10
+
+
+def bench_sample(args):
+    """
+    Time `sample_pagerank` with one surfer and with many vectorized
+    surfers, and report how far each estimate is from the exact ranks.
+    """
+    sources, targets = synthetic_corpus(args.pages, seed=args.seed)
+    corpus = to_corpus(args.pages, sources, targets)
+    matrix = LinkMatrix.from_corpus(corpus)
+    exact, _ = power_iteration(matrix, pagerank.DAMPING)
+    exact = matrix.to_dict(exact)
+
+    for surfers in (1, args.surfers):
+        if surfers == 1 and args.samples > args.legacy_limit:
+            print(f"{'1 surfer':>14}  (skipped above {args.legacy_limit} samples)")
+            continue
+        start = time.perf_counter()
+        ranks = pagerank.sample_pagerank(corpus, pagerank.DAMPING, args.samples, surfers)
+        seconds = time.perf_counter() - start
+        error = sum(abs(ranks[page] - exact[page]) for page in exact)
+        print(f"{surfers:>6} surfers  {args.samples} samples in {seconds:7.3f} s"
+              f"  L1 error {error:.4f}")
+
+
+def write_corpus(directory, pages, sources, targets, padding=2000):
+    """
+    Write an edge list as HTML files, with `padding` bytes of filler
+    text in each so scanning dominates as it does on real pages.
+    """
+    links = [[] for _ in range(pages)]
+    for s, t in zip(sources.tolist(), targets.tolist()):
+        links[s].append(t)
+    filler = "<p>" + "lorem ipsum " * (padding // 12) + "</p>\n"
+    for i in range(pages):
+        body = "".join(f'<li><a href="{j}.html">{j}</a></li>\n' for j in links[i])
+        with open(os.path.join(directory, f"{i}.html"), "w") as f:
+            f.write(f"<html><body>{filler}<ul>\n{body}</ul>{filler}</body></html>\n")
+
+
+def bench_crawl(args):
+    """
+    Compare `crawl` with the streaming, parallel `crawl_edges` on a
+    directory of synthetic HTML pages.
+    """
+    sources, targets = synthetic_corpus(args.pages, seed=args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        write_corpus(directory, args.pages, sources, targets)
+
+        start = time.perf_counter()
+        corpus = pagerank.crawl(directory)
+        seconds = time.perf_counter() - start
+        print(f"{'crawl':>18}  {seconds:7.3f} s  ({len(corpus) / seconds:8.0f} files/s)")
+
+        for workers in sorted({1, args.workers}):
+            _, _, _, stats = crawl_edges(directory, workers)
+            print(f"{f'crawl_edges x{workers}':>18}  {stats['seconds']:7.3f} s"
+                  f"  ({stats['files_per_second']:8.0f} files/s, {stats['mb_per_second']:6.1f} MB/s)")
+
+
+def bench_incremental(args):
+    """
+    Change `--changes` links of a solved synthetic corpus and compare a
+    cold solve of the new graph with warm-started power iteration and
+    residual pushing from the old ranks.
+    """
+    sources, targets = synthetic_corpus(args.pages, seed=args.seed)
+    pages = [f"{i}.html" for i in range(args.pages)]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "state.npz")
+        RankState.create(pages, sources, targets, pagerank.DAMPING, args.tolerance).save(path)
+
+        rng = np.random.default_rng(args.seed + 1)
+        removed = rng.choice(len(sources), args.changes // 2, replace=False)
+        removed_links = {(pages[sources[k]], pages[targets[k]]) for k in removed.tolist()}
+        added_links = {
+            (pages[s], pages[t])
+            for s, t in rng.integers(args.pages, size=(args.changes - len(removed), 2)).tolist()
+        }
+
+        state = RankState.load(path)
+        state.apply(added_links=added_links, removed_links=removed_links, tolerance=args.tolerance)
+        start = time.perf_counter()
+        cold = RankState.create(state.matrix.pages, state.matrix.cols, state.matrix.rows,
+                                pagerank.DAMPING, args.tolerance)
+        exact = cold.ranks
+        print(f"{'cold':>6}  {cold.iterations:4} iterations  {time.perf_counter() - start:7.3f} s")
+
+        for method in ("power", "push"):
+            state = RankState.load(path)
+            start = time.perf_counter()
+            iterations = state.apply(added_links=added_links, removed_links=removed_links,
+                                     method=method, tolerance=args.tolerance)
+            seconds = time.perf_counter() - start
+            error = np.abs(state.ranks - exact).sum()
+            print(f"{method:>6}  {iterations:4} iterations  {seconds:7.3f} s  L1 vs cold {error:.2e}")
+
+
+def bench_personalized(args):
+    """
+    Solve personalized PageRank for `--seeds` random seed sets, one
+    seed set at a time and all together in one batched solve.
+    """
+    sources, targets = synthetic_corpus(args.pages, seed=args.seed)
+    matrix = LinkMatrix(range(args.pages), sources, targets)
+    rng = np.random.default_rng(args.seed + 1)
+    teleport = matrix.teleport([rng.choice(args.pages, args.seed_size).tolist()
+                                for _ in range(args.seeds)])
+    matrix.matmat(teleport[:, :1])
+
+    start = time.perf_counter()
+    single = [personalized_power_iteration(matrix, pagerank.DAMPING, teleport[:, k:k + 1])[0]
+              for k in range(args.seeds)]
+    print(f"{'one at a time':>14}  {time.perf_counter() - start:7.3f} s")
+
+    start = time.perf_counter()
+    ranks, iterations = personalized_power_iteration(matrix, pagerank.DAMPING, teleport)
+    seconds = time.perf_counter() - start
+    error = max(np.abs(ranks[:, k] - single[k][:, 0]).sum() for k in range(args.seeds))
+    print(f"{'batched':>14}  {seconds:7.3f} s  ({iterations} iterations, "
+          f"max L1 difference {error:.1e})")
+
+
+def bench_solvers(args):
+    """
+    Run every solver on a synthetic corpus and report iterations, time
+    and error against a tightly converged solution, the largest error on
+    any page of the bundled corpora, and each solver's residual per
+    iteration with `--residuals`.
+    """
+    sources, targets = synthetic_corpus(args.pages, args.links, seed=args.seed)
+    matrix = LinkMatrix(range(args.pages), sources, targets)
+    exact, _ = power_iteration(matrix, pagerank.DAMPING, 1e-14)
+    # The bundled corpora are small enough to check every page
+    here = os.path.dirname(os.path.abspath(__file__))
+    corpora = []
+    for name in CORPORA:
+        corpus = LinkMatrix.from_corpus(pagerank.crawl(os.path.join(here, name)))
+        corpora.append((corpus, power_iteration(corpus, pagerank.DAMPING, 1e-14)[0]))
+    for method in SOLVERS:
+        ranks, stats = solve(matrix, pagerank.DAMPING, method, args.tolerance)
+        corpus_error = max(
+            np.abs(solve(corpus, pagerank.DAMPING, method, args.tolerance)[0] - expected).max()
+            for corpus, expected in corpora
+        )
+        print(f"{method:>13}  {stats['iterations']:4} iterations  {stats['seconds']:7.3f} s"
+              f"  L1 error {np.abs(ranks - exact).sum():.1e}"
+              f"  max error on {', '.join(CORPORA)} {corpus_error:.1e}")
+        if args.residuals:
+            print(" " * 15 + " ".join(f"{r:.1e}" for r in stats["residuals"]))
+
+
+def solve_edge_file(path, dtype):
+    """Rank an edge file; run in a fresh process to measure its peak memory."""
+    with EdgeFile(path) as edges:
+        start = time.perf_counter()
+        _, iterations = edge_file_pagerank(edges, pagerank.DAMPING, dtype=dtype)
+        return iterations, time.perf_counter() - start, peak_memory()
+
+
+def bench_edgefile(args):
+    """
+    Write a synthetic corpus to an edge file chunk by chunk, then rank it
+    out of core in a fresh process and report its peak memory next to
+    the size of the file.
+    """
+    rng = np.random.default_rng(args.seed)
+    with tempfile.TemporaryDirectory(dir=args.directory) as directory:
+        path = os.path.join(directory, "edges.bin")
+        start = time.perf_counter()
+        with EdgeFileWriter(path, (f"{i}.html" for i in range(args.pages))) as writer:
+            for lo in range(0, args.pages, 1 << 18):
+                hi = min(args.pages, lo + (1 << 18))
+                counts = rng.poisson(8, hi - lo)
+                counts[rng.random(hi - lo) < 0.05] = 0
+                sources = np.repeat(np.arange(lo, hi), counts)
+                targets = (rng.pareto(1.5, len(sources)) * args.pages / 50).astype(np.int64) % args.pages
+                writer.add(sources, targets)
+        print(f"wrote {args.pages} pages in {time.perf_counter() - start:.1f} s, "
+              f"{os.path.getsize(path) / 2 ** 20:.1f} MiB")
+
+        context = multiprocessing.get_context("spawn")
+        for dtype in (np.float64, np.float32):
+            with context.Pool(1) as pool:
+                iterations, seconds, peak = pool.apply(solve_edge_file, (path, dtype))
+            print(f"{np.dtype(dtype).name:>8}  {iterations} iterations in {seconds:.1f} s  "
+                  f"peak memory {peak / 2 ** 20:.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for pagerank.py")
+    parser.add_argument("--seed", type=int, default=0)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    sparse = commands.add_parser("sparse", help="iterate_pagerank vs sparse engine")
+    sparse.add_argument("--pages", type=int, default=1_000_000)
+    sparse.add_argument("--start", type=int, default=100)
+    sparse.add_argument("--legacy-limit", type=int, default=1_000,
+                        help="largest graph to run iterate_pagerank on")
+    sparse.add_argument("--tolerance", type=float, default=pagerank.TOLERANCE)
+    sparse.set_defaults(run=bench_sparse)
+
+    sample = commands.add_parser("sample", help="one surfer vs vectorized surfers")
+    sample.add_argument("--pages", type=int, default=10_000)
+    sample.add_argument("--samples", type=int, default=10_000_000)
+    sample.add_argument("--surfers", type=int, default=10_000)
+    sample.add_argument("--legacy-limit", type=int, default=10_000_000,
+                        help="most samples to draw with a single surfer")
+    sample.set_defaults(run=bench_sample)
+
+    crawl = commands.add_parser("crawl", help="crawl vs streaming parallel crawl_edges")
+    crawl.add_argument("--pages", type=int, default=20_000)
+    crawl.add_argument("--workers", type=int, default=os.cpu_count())
+    crawl.set_defaults(run=bench_crawl)
+
+    incremental = commands.add_parser("incremental", help="cold vs warm-started reconvergence")
+    incremental.add_argument("--pages", type=int, default=1_000_000)
+    incremental.add_argument("--changes", type=int, default=1_000,
+                             help="links added and removed")
+    incremental.add_argument("--tolerance", type=float, default=pagerank.TOLERANCE)
+    incremental.set_defaults(run=bench_incremental)
+
+    personalized = commands.add_parser("personalized", help="per-seed vs batched solves")
+    personalized.add_argument("--pages", type=int, default=200_000)
+    personalized.add_argument("--seeds", type=int, default=64, help="seed sets")
+    personalized.add_argument("--seed-size", type=int, default=5, help="pages per seed set")
+    personalized.set_defaults(run=bench_personalized)
+
+    solvers = commands.add_parser("solvers", help="compare PageRank solvers")
+    solvers.add_argument("--pages", type=int, default=200_000)
+    solvers.add_argument("--links", type=int, default=8, help="mean links per page")
+    solvers.add_argument("--tolerance", type=float, default=pagerank.TOLERANCE)
+    solvers.add_argument("--residuals", action="store_true", help="print residual histories")
+    solvers.set_defaults(run=bench_solvers)
+
+    edgefile = commands.add_parser("edgefile", help="out-of-core ranking of an edge file")
+    edgefile.add_argument("--pages", type=int, default=5_000_000)
+    edgefile.add_argument("--directory", help="where to write the temporary edge file")
+    edgefile.set_defaults(run=bench_edgefile)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
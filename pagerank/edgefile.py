@@ -0,0 +1,256 @@
+import mmap
+import os
+import resource
+import shutil
+import struct
+import tempfile
+
+import numpy as np
+
+# Magic bytes and header of an edge file: magic, pages, links, blocks,
+# pages per block, and the byte offsets of the out-degrees and page names
+MAGIC = b"PREDGES1"
+HEADER = struct.Struct("<8sqqqqqq")
+
+# Target pages per block; a block's rank slice and links are all that an
+# iteration touches at a time
+BLOCK_PAGES = 1 << 18
+
+# Links buffered in memory by EdgeFileWriter before spilling to disk
+BUFFER_LINKS = 1 << 22
+
+# Links of a block read at a time; popular pages can put most of the
+# graph's links in one block
+CHUNK_LINKS = 1 << 20
+
+
+def align(offset):
+    """Rounds a file offset up to a whole memory page."""
+    return -(-offset // mmap.PAGESIZE) * mmap.PAGESIZE
+
+
+def peak_memory():
+    """
+    Returns the peak resident memory of this process in bytes. Linux
+    reports it in /proc (where, unlike ru_maxrss, it is not carried over
+    from the parent of an exec'd process); elsewhere ru_maxrss is used.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class EdgeFileWriter():
+    """
+    Writes a link graph to a block-sorted edge file without holding it
+    in memory. Links added with `add` are bucketed by target block into
+    temporary files; `close` sorts and deduplicates one block at a time.
+
+    File layout: header, a (byte offset, links) table entry per block,
+    then each block as int32 `sources` followed by int32 `targets`,
+    sorted by target, then the int32 out-degree of every page and the
+    newline-separated page names. Sections start on page boundaries so
+    a block can be dropped from memory once it has been read.
+    """
+
+    def __init__(self, path, pages, block_pages=BLOCK_PAGES):
+        self.path = path
+        self.pages = list(pages)
+        self.n = len(self.pages)
+        self.block_pages = block_pages
+        self.blocks = max(1, -(-self.n // block_pages))
+        self.directory = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(path)))
+        self.buffer = []
+        self.buffered = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is None:
+            self.close()
+        else:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def bucket(self, block):
+        return os.path.join(self.directory, f"{block}.bin")
+
+    def add(self, sources, targets):
+        """Add the links from page index `sources[k]` to `targets[k]`."""
+        sources = np.asarray(sources, dtype=np.int32)
+        targets = np.asarray(targets, dtype=np.int32)
+        self.buffer.append(np.stack([targets, sources], axis=1))
+        self.buffered += len(sources)
+        if self.buffered >= BUFFER_LINKS:
+            self.spill()
+
+    def spill(self):
+        """Append the buffered links to their blocks' temporary files."""
+        if not self.buffer:
+            return
+        links = np.concatenate(self.buffer)
+        self.buffer, self.buffered = [], 0
+        links = links[np.argsort(links[:, 0] // self.block_pages, kind="stable")]
+        blocks = links[:, 0] // self.block_pages
+        bounds = np.searchsorted(blocks, np.arange(self.blocks + 1))
+        for block in range(self.blocks):
+            lo, hi = bounds[block], bounds[block + 1]
+            if lo < hi:
+                with open(self.bucket(block), "ab") as f:
+                    links[lo:hi].tofile(f)
+
+    def close(self):
+        """Sort each block, drop duplicate and self-links, and write the file."""
+        self.spill()
+        outdegree = np.zeros(self.n, dtype=np.int32)
+        table = np.zeros((self.blocks, 2), dtype=np.int64)
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                offset = align(HEADER.size + table.nbytes)
+                for block in range(self.blocks):
+                    path = self.bucket(block)
+                    links = np.fromfile(path, dtype=np.int32) if os.path.exists(path) else np.zeros(0, np.int32)
+                    keys = links.astype(np.int64).reshape(-1, 2)
+                    keys = np.sort(keys[:, 0] * self.n + keys[:, 1])
+                    first = np.ones(len(keys), dtype=bool)
+                    first[1:] = keys[1:] != keys[:-1]
+                    targets, sources = np.divmod(keys[first], max(self.n, 1))
+                    keep = sources != targets
+                    sources = sources[keep].astype(np.int32)
+                    targets = targets[keep].astype(np.int32)
+                    outdegree += np.bincount(sources, minlength=self.n).astype(np.int32)
+
+                    table[block] = offset, len(sources)
+                    f.seek(offset)
+                    sources.tofile(f)
+                    targets.tofile(f)
+                    offset = align(offset + 8 * len(sources))
+
+                f.seek(offset)
+                outdegree.tofile(f)
+                names_offset = offset + outdegree.nbytes
+                names = "\n".join(self.pages).encode("utf-8")
+                f.write(names)
+
+                f.seek(0)
+                f.write(HEADER.pack(MAGIC, self.n, int(table[:, 1].sum()), self.blocks,
+                                    self.block_pages, offset, names_offset))
+                table.tofile(f)
+            os.replace(tmp, self.path)
+        finally:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+
+def write_edge_file(path, pages, sources, targets, block_pages=BLOCK_PAGES):
+    """Write an in-memory edge list, e.g. from `crawl_edges`, to `path`."""
+    with EdgeFileWriter(path, pages, block_pages) as writer:
+        for start in range(0, len(sources), BUFFER_LINKS):
+            writer.add(sources[start:start + BUFFER_LINKS], targets[start:start + BUFFER_LINKS])
+
+
+class EdgeFile():
+    """
+    Read-only view of an edge file written by EdgeFileWriter, through
+    `mmap`. Blocks are read straight from the mapping as NumPy arrays.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, self.n, self.links, self.blocks, self.block_pages,
+         self.outdegree_offset, self.names_offset) = HEADER.unpack_from(self.map)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a PageRank edge file")
+        self.table = np.frombuffer(self.map, np.int64, 2 * self.blocks, HEADER.size).reshape(-1, 2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        del self.table
+        self.map.close()
+        self.file.close()
+
+    def pages(self):
+        """Returns the list of page names."""
+        return self.map[self.names_offset:].decode("utf-8").split("\n") if self.n else []
+
+    def outdegree(self, lo, hi):
+        """Returns the out-degrees of pages lo..hi-1."""
+        return np.frombuffer(self.map, np.int32, hi - lo, self.outdegree_offset + 4 * lo)
+
+    def block(self, block, chunk_links=CHUNK_LINKS):
+        """
+        Yields (lo, sources, targets) chunks of the links into `block`,
+        sorted by target, where `lo` is the block's first page. Each
+        chunk's pages of the file are released once the next is needed.
+        """
+        offset, count = (int(x) for x in self.table[block])
+        lo = block * self.block_pages
+        for start in range(0, count, chunk_links):
+            end = min(count, start + chunk_links)
+            yield (lo, np.frombuffer(self.map, np.int32, end - start, offset + 4 * start),
+                   np.frombuffer(self.map, np.int32, end - start, offset + 4 * (count + start)))
+            self.release(offset + 4 * start, offset + 4 * end)
+            self.release(offset + 4 * (count + start), offset + 4 * (count + end))
+
+    def release(self, start, end):
+        """Let the kernel drop the whole file pages in start..end from memory."""
+        start, end = align(start), end // mmap.PAGESIZE * mmap.PAGESIZE
+        if start < end:
+            self.map.madvise(mmap.MADV_DONTNEED, start, end - start)
+
+
+def edge_file_pagerank(edges, damping_factor, tolerance=1e-8, max_iterations=1000,
+                       dtype=np.float64):
+    """
+    Runs PageRank power iteration over an EdgeFile, streaming its blocks
+    once per iteration. Only the rank vectors (`dtype` arrays of one
+    value per page) stay in memory; links are mapped in a chunk at a
+    time, used, and released. Returns (ranks, iterations).
+    """
+    n = edges.n
+    block_pages = edges.block_pages
+    ranks = np.full(n, 1.0 / n, dtype=dtype)
+    new_ranks = np.empty(n, dtype=dtype)
+    scaled = np.empty(n, dtype=dtype)
+    teleport = (1 - damping_factor) / n
+    # Rounding alone moves float32 ranks by about eps in L1 per iteration
+    tolerance = max(tolerance, 10 * np.finfo(dtype).eps)
+    for iteration in range(1, max_iterations + 1):
+        # Rank each page passes along each of its links; dangling pages
+        # pass theirs to every page
+        dangling = 0.0
+        for lo in range(0, n, block_pages):
+            hi = min(n, lo + block_pages)
+            degree = edges.outdegree(lo, hi)
+            np.divide(ranks[lo:hi], degree, out=scaled[lo:hi], where=degree > 0)
+            dangling += float(ranks[lo:hi][degree == 0].sum())
+        base = teleport + damping_factor * dangling / n
+
+        delta = 0.0
+        for block in range(edges.blocks):
+            lo = block * block_pages
+            hi = min(n, lo + block_pages)
+            incoming = np.zeros(hi - lo)
+            for _, sources, targets in edges.block(block):
+                incoming += np.bincount(targets - lo, weights=scaled[sources], minlength=hi - lo)
+            new_ranks[lo:hi] = base + damping_factor * incoming
+            delta += float(np.abs(new_ranks[lo:hi] - ranks[lo:hi], dtype=np.float64).sum())
+
+        ranks, new_ranks = new_ranks, ranks
+        if delta < tolerance:
+            break
+    ranks /= ranks.sum(dtype=np.float64)
+    return ranks, iteration
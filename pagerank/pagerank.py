@@ -1,21 +1,79 @@
+import argparse
 import os
 import random
 import re
 import sys
 
+from crawler import crawl_edges, edges_to_corpus
+
 DAMPING = 0.85
 SAMPLES = 10000
+TOLERANCE = 1e-8
 
 
 def main():
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python pagerank.py corpus")
-    corpus = crawl(sys.argv[1])
-    ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
-    print(f"PageRank Results from Sampling (n = {SAMPLES})")
+    parser = argparse.ArgumentParser()
+    parser.add_argument("corpus")
+    parser.add_argument("--sparse", action="store_true",
+                        help="iterate with the vectorized sparse-matrix engine")
+    parser.add_argument("--samples", type=int, default=SAMPLES,
+                        help="pages visited by the random surfers")
+    parser.add_argument("--surfers", type=int, default=1,
+                        help="independent random surfers advanced together with NumPy")
+    parser.add_argument("--workers", type=int,
+                        help="crawl with this many processes, streaming files in chunks")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="L1 convergence tolerance of the sparse engine")
+    parser.add_argument("--state",
+                        help="file of ranks kept between runs; reconverge from it incrementally")
+    parser.add_argument("--edges",
+                        help="rank out of core from this block-sorted edge file, "
+                             "writing it from the corpus first if it does not exist")
+    parser.add_argument("--float32", action="store_true",
+                        help="keep out-of-core rank vectors as float32")
+    parser.add_argument("--seeds", action="append", default=[],
+                        help="comma-separated pages for personalized PageRank; "
+                             "repeat to rank many seed sets in one batched solve")
+    parser.add_argument("--solver", choices=("jacobi", "gauss-seidel", "aitken", "quadratic", "adaptive"),
+                        help="iterate with this solver and report its convergence")
+    parser.add_argument("--push", action="store_true",
+                        help="reconverge by pushing residuals from the pages a change "
+                             "disturbed instead of power iteration")
+    args = parser.parse_args()
+    if args.edges:
+        ranks = edge_file_ranks(args.corpus, args.edges, DAMPING, args.tolerance,
+                                args.float32, args.workers)
+        print("PageRank Results from Iteration")
+        for page in sorted(ranks):
+            print(f"  {page}: {ranks[page]:.4f}")
+        return
+    if args.workers:
+        pages, sources, targets, stats = crawl_edges(args.corpus, args.workers)
+        corpus = edges_to_corpus(pages, sources, targets)
+        print(f"Crawled {stats['files']} files in {stats['seconds']:.2f} s "
+              f"({stats['files_per_second']:.0f} files/s, {stats['mb_per_second']:.1f} MB/s)",
+              file=sys.stderr)
+    else:
+        corpus = crawl(args.corpus)
+    if args.seeds:
+        seeds = [seed.split(",") for seed in args.seeds]
+        for seed, ranks in zip(args.seeds, personalized_pagerank(corpus, DAMPING, seeds, args.tolerance)):
+            print(f"Personalized PageRank Results (seeds = {seed})")
+            for page in sorted(ranks):
+                print(f"  {page}: {ranks[page]:.4f}")
+        return
+    ranks = sample_pagerank(corpus, DAMPING, args.samples, args.surfers)
+    print(f"PageRank Results from Sampling (n = {args.samples})")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
-    ranks = iterate_pagerank(corpus, DAMPING)
+    if args.state:
+        ranks = incremental_pagerank(corpus, DAMPING, args.state, args.tolerance, args.push)
+    elif args.solver:
+        ranks = solver_pagerank(corpus, DAMPING, args.solver, args.tolerance)
+    elif args.sparse:
+        ranks = sparse_pagerank(corpus, DAMPING, args.tolerance)
+    else:
+        ranks = iterate_pagerank(corpus, DAMPING)
     print(f"PageRank Results from Iteration")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
@@ -86,7 +144,7 @@ def transition_model(corpus, page, damping_factor):
     return transDict
 
 
-def sample_pagerank(corpus, damping_factor, n):
+def sample_pagerank(corpus, damping_factor, n, surfers=1):
     """
     Return PageRank values for each page by sampling `n` pages
     according to transition model, starting with a page at random.
@@ -94,33 +152,41 @@ def sample_pagerank(corpus, damping_factor, n):
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
+
+    If `surfers` is more than 1, that many independent surfers are
+    advanced together with NumPy, sharing the `n` samples between them.
     """
+    if surfers > 1:
+        from sparse import LinkMatrix, sample_ranks
+
+        matrix = LinkMatrix.from_corpus(corpus)
+        return matrix.to_dict(sample_ranks(matrix, damping_factor, n, surfers))
+
     # Intialize a dictionary
     srankDict = {}
     for pName in corpus:
         srankDict[pName] = 0
 
+    # The transition model is a mix of two uniform draws, so instead of
+    # building it for every step, keep each page's links as a list once:
+    # with probability `damping_factor` follow one of them, otherwise (or
+    # if there are none) jump to any page, both in O(1)
+    pages = list(corpus.keys())
+    links = {pName: list(corpus[pName]) for pName in pages}
+
     # First randomized sample
     ## Randomly choose a page using the list of pages dervided from keys of corpus
-    currPage = random.choice(list(corpus.keys())) 
+    currPage = random.choice(pages)
     srankDict[currPage] += 1
 
     # For remaining n-1 samples, pick the page based on the transistion model:
     for i in range(n-1):
-        currDist = transition_model(corpus, currPage, damping_factor)
-        # Get the transition model for the current page
-        probabilities = transition_model(corpus, currPage, damping_factor)
-        
-        # Choose the next page based on the probabilities
-        nextPage = random.choices(
-            population=list(probabilities.keys()),   # List of pages
-            weights=list(probabilities.values()),    # Corresponding probabilities
-            k=1                                      # Choose 1 page
-        )[0]  # random.choices returns a list, so take the first element
-            # Update the count for the chosen page
-        srankDict[nextPage] += 1
-        # Update the current page to the newly chosen page
-        currPage = nextPage
+        outLinks = links[currPage]
+        if outLinks and random.random() < damping_factor:
+            currPage = random.choice(outLinks)
+        else:
+            currPage = random.choice(pages)
+        srankDict[currPage] += 1
     
     # Normalize the visit counts to calculate the PageRank
     for page_name in srankDict:
@@ -128,6 +194,73 @@ def sample_pagerank(corpus, damping_factor, n):
     
     return srankDict
 
+def personalized_pagerank(corpus, damping_factor, seeds, tolerance=TOLERANCE):
+    """
+    Return personalized PageRank values for each item of `seeds`: a
+    collection of pages (or a {page: weight} dict) that the surfer
+    jumps to with probability `1 - damping_factor`, instead of any page.
+
+    Return a list with a {page: rank} dictionary per seed set. All seed
+    sets are solved together, each pass over the links updating every
+    rank vector.
+    """
+    from sparse import LinkMatrix, personalized_power_iteration
+
+    matrix = LinkMatrix.from_corpus(corpus)
+    ranks, _ = personalized_power_iteration(
+        matrix, damping_factor, matrix.teleport(seeds), tolerance)
+    return [matrix.to_dict(ranks[:, k]) for k in range(len(seeds))]
+
+
+def incremental_pagerank(corpus, damping_factor, path, tolerance=TOLERANCE, push=False):
+    """
+    Return PageRank values like `sparse_pagerank`, reusing the ranks
+    saved at `path` by the previous run: the changes since then are
+    applied to the saved link graph and the ranks reconverge from the
+    old ones (by residual pushes if `push`). Solves from scratch when
+    `path` does not exist yet, and saves the new ranks to `path`.
+    """
+    from incremental import RankState
+    from sparse import LinkMatrix
+
+    if os.path.exists(path):
+        state = RankState.load(path)
+        changes = state.delta(corpus)
+        state.apply(*changes, method="push" if push else "power", tolerance=tolerance)
+        print(f"Applied {len(changes[0])} added pages, {len(changes[1])} removed pages, "
+              f"{len(changes[2])} added links, {len(changes[3])} removed links "
+              f"in {state.iterations} iterations", file=sys.stderr)
+    else:
+        matrix = LinkMatrix.from_corpus(corpus)
+        state = RankState.create(matrix.pages, matrix.cols, matrix.rows, damping_factor, tolerance)
+        print(f"Solved from scratch in {state.iterations} iterations", file=sys.stderr)
+    state.save(path)
+    return state.to_dict()
+
+
+def edge_file_ranks(directory, path, damping_factor, tolerance=TOLERANCE, float32=False,
+                    workers=None):
+    """
+    Return PageRank values for the edge file at `path`, computed out of
+    core by streaming its blocks through `mmap` (see `edgefile.py`).
+    If `path` does not exist, it is first written from a crawl of
+    `directory`. Reports iterations and peak memory on stderr.
+    """
+    import numpy as np
+    from edgefile import EdgeFile, edge_file_pagerank, peak_memory, write_edge_file
+
+    if not os.path.exists(path):
+        pages, sources, targets, stats = crawl_edges(directory, workers)
+        write_edge_file(path, pages, sources, targets)
+        del sources, targets
+    with EdgeFile(path) as edges:
+        ranks, iterations = edge_file_pagerank(
+            edges, damping_factor, tolerance, dtype=np.float32 if float32 else np.float64)
+        print(f"Ranked {edges.n} pages, {edges.links} links in {iterations} iterations, "
+              f"peak memory {peak_memory() / 2 ** 20:.1f} MiB", file=sys.stderr)
+        return dict(zip(edges.pages(), ranks.tolist()))
+
+
 def iterate_pagerank(corpus, damping_factor):
     """
     Return PageRank values for each page by iteratively updating
@@ -192,6 +325,37 @@ def iterate_pagerank(corpus, damping_factor):
 
     return irankDict
 
+def sparse_pagerank(corpus, damping_factor, tolerance=TOLERANCE, max_iterations=1000):
+    """
+    Return PageRank values for each page, like `iterate_pagerank`, by
+    power iteration on a sparse column-stochastic link matrix built once
+    from the corpus. Iteration stops once the L1 change in the rank
+    vector is below `tolerance`.
+    """
+    from sparse import LinkMatrix, power_iteration
+
+    matrix = LinkMatrix.from_corpus(corpus)
+    ranks, _ = power_iteration(matrix, damping_factor, tolerance, max_iterations)
+    return matrix.to_dict(ranks)
+
+
+def solver_pagerank(corpus, damping_factor, method, tolerance=TOLERANCE):
+    """
+    Return PageRank values like `sparse_pagerank`, computed with the
+    named solver from `solvers.py` ("jacobi", "gauss-seidel", "aitken",
+    "quadratic" or "adaptive"). Reports its iterations, wall time and
+    the residual of every iteration on stderr.
+    """
+    from solvers import solve
+    from sparse import LinkMatrix
+
+    matrix = LinkMatrix.from_corpus(corpus)
+    ranks, stats = solve(matrix, damping_factor, method, tolerance)
+    print(f"{stats['method']}: {stats['iterations']} iterations in {stats['seconds']:.3f} s",
+          file=sys.stderr)
+    print("residuals: " + " ".join(f"{r:.2e}" for r in stats["residuals"]), file=sys.stderr)
+    return matrix.to_dict(ranks)
+
 # Test Case
 # corpus = {"1.html": {"2.html", "3.html"}, "2.html": {"3.html"}, "3.html": {"2.html"}}
 # page = "1.html"
@@ -0,0 +1,195 @@
+import time
+from collections import deque
+
+import numpy as np
+
+# Solvers `solve` can run
+SOLVERS = ("gauss-seidel", "quadratic", "aitken", "adaptive", "jacobi")
+
+# Iterations between extrapolation steps
+PERIOD = 10
+
+# Iterations a page's change must stay below tolerance / N before the
+# adaptive solver freezes it
+STABLE = 3
+
+# Page blocks updated in turn by Gauss-Seidel
+BLOCKS = 256
+
+
+def solve(matrix, damping_factor, method="jacobi", tolerance=1e-8, max_iterations=1000):
+    """
+    Runs PageRank on a LinkMatrix with the named solver until the L1
+    change between iterations is below `tolerance`. Returns (ranks,
+    stats), where stats reports the method, iterations, seconds and the
+    L1 residual after every iteration.
+    """
+    if method not in SOLVERS:
+        raise ValueError(f"unknown solver {method!r}, expected one of {', '.join(SOLVERS)}")
+    run = {
+        "jacobi": jacobi,
+        "gauss-seidel": gauss_seidel,
+        "aitken": aitken,
+        "quadratic": quadratic,
+        "adaptive": adaptive,
+    }[method]
+    start = time.perf_counter()
+    ranks, residuals = run(matrix, damping_factor, tolerance, max_iterations)
+    stats = {
+        "method": method,
+        "iterations": len(residuals),
+        "seconds": time.perf_counter() - start,
+        "residuals": residuals,
+    }
+    return ranks / ranks.sum(), stats
+
+
+def step(matrix, damping_factor, ranks):
+    """One Jacobi (power iteration) update of `ranks`."""
+    return (1 - damping_factor) / matrix.n + damping_factor * matrix.matvec(ranks)
+
+
+def jacobi(matrix, damping_factor, tolerance, max_iterations):
+    """Plain power iteration, as in `power_iteration`."""
+    ranks = np.full(matrix.n, 1.0 / matrix.n)
+    residuals = []
+    for _ in range(max_iterations):
+        new_ranks = step(matrix, damping_factor, ranks)
+        residuals.append(np.abs(new_ranks - ranks).sum())
+        ranks = new_ranks
+        if residuals[-1] < tolerance:
+            break
+    return ranks, residuals
+
+
+def gauss_seidel(matrix, damping_factor, tolerance, max_iterations):
+    """
+    Block Gauss-Seidel: pages are updated in place a block at a time, so
+    each block already sees the new ranks of the blocks before it,
+    including their share of the dangling rank.
+    """
+    n = matrix.n
+    ranks = np.full(n, 1.0 / n)
+    teleport = (1 - damping_factor) / n
+    size = max(1, -(-n // BLOCKS))
+    starts = np.arange(0, n, size)
+    bounds = np.searchsorted(matrix.rows, np.append(starts, n))
+    residuals = []
+    for _ in range(max_iterations):
+        previous = ranks.copy()
+        dangling = ranks[matrix.dangling].sum()
+        for b, lo in enumerate(starts):
+            hi = min(n, lo + size)
+            first, last = bounds[b], bounds[b + 1]
+            incoming = np.bincount(
+                matrix.rows[first:last] - lo,
+                weights=matrix.weights[first:last] * ranks[matrix.cols[first:last]],
+                minlength=hi - lo
+            )
+            new_ranks = teleport + damping_factor * (incoming + dangling / n)
+            is_dangling = matrix.dangling[lo:hi]
+            dangling += (new_ranks[is_dangling] - ranks[lo:hi][is_dangling]).sum()
+            ranks[lo:hi] = new_ranks
+        # Sweeps do not preserve the total rank; restoring it removes the
+        # slowly decaying error along the solution itself
+        ranks /= ranks.sum()
+        residuals.append(np.abs(ranks - previous).sum())
+        if residuals[-1] < tolerance:
+            break
+    return ranks, residuals
+
+
+def extrapolated(extrapolate, history):
+    """
+    Power iteration that replaces the latest iterate with
+    `extrapolate(iterates)` every PERIOD iterations, once `history`
+    iterates are known.
+    """
+    def run(matrix, damping_factor, tolerance, max_iterations):
+        ranks = np.full(matrix.n, 1.0 / matrix.n)
+        iterates = deque([ranks], maxlen=history)
+        residuals = []
+        for iteration in range(1, max_iterations + 1):
+            new_ranks = step(matrix, damping_factor, ranks)
+            residuals.append(np.abs(new_ranks - ranks).sum())
+            ranks = new_ranks
+            if residuals[-1] < tolerance:
+                break
+            iterates.append(ranks)
+            if iteration % PERIOD == 0 and len(iterates) == history:
+                ranks = np.abs(extrapolate(*iterates))
+                ranks /= ranks.sum()
+                iterates.clear()
+                iterates.append(ranks)
+        return ranks, residuals
+    return run
+
+
+def aitken_step(x0, x1, x2):
+    """
+    Componentwise Aitken delta-squared extrapolation of three iterates,
+    keeping the latest value where the second difference vanishes.
+    """
+    d1 = x1 - x0
+    d2 = x2 - 2 * x1 + x0
+    out = x2.copy()
+    safe = np.abs(d2) > 1e-16
+    out[safe] = x0[safe] - d1[safe] ** 2 / d2[safe]
+    return out
+
+
+def quadratic_step(x0, x1, x2, x3):
+    """
+    Quadratic extrapolation (Kamvar et al.) of four iterates: fits the
+    error to the two largest non-principal eigenvectors and removes it.
+    """
+    y = np.stack([x1 - x0, x2 - x0, x3 - x0], axis=1)
+    gamma = np.ones(4)
+    gamma[1:3] = -np.linalg.lstsq(y[:, :2], y[:, 2], rcond=None)[0]
+    gamma[0] = -gamma[1:].sum()
+    beta = [gamma[1:].sum(), gamma[2:].sum(), gamma[3]]
+    return beta[0] * x1 + beta[1] * x2 + beta[2] * x3
+
+
+aitken = extrapolated(aitken_step, 3)
+quadratic = extrapolated(quadratic_step, 4)
+
+
+def adaptive(matrix, damping_factor, tolerance, max_iterations):
+    """
+    Adaptive PageRank (Kamvar et al.): once a page's rank has changed by
+    less than tolerance / N for STABLE iterations in a row it is frozen,
+    and later iterations only recompute the pages, and links, still
+    changing. Every PERIOD iterations, and before stopping, all pages
+    are recomputed, so a page frozen while its rank was still swinging
+    is picked up again and the final residual covers every page.
+    """
+    n = matrix.n
+    ranks = np.full(n, 1.0 / n)
+    calm = np.zeros(n, dtype=np.int64)
+    active = np.arange(n)
+    rows, weights, cols = matrix.rows, matrix.weights, matrix.cols
+    residuals = []
+    for iteration in range(1, max_iterations + 1):
+        everyone = len(active) == n
+        incoming = np.bincount(rows, weights=weights * ranks[cols], minlength=n)[active]
+        new_ranks = (1 - damping_factor) / n + damping_factor * (
+            incoming + ranks[matrix.dangling].sum() / n)
+        change = np.abs(new_ranks - ranks[active])
+        ranks[active] = new_ranks
+        residuals.append(change.sum())
+        if residuals[-1] < tolerance and everyone:
+            break
+
+        calm[active] = np.where(change < tolerance / n, calm[active] + 1, 0)
+        if residuals[-1] < tolerance or iteration % PERIOD == 0 or calm[active].min() >= STABLE:
+            # Check every page, frozen or not, in the next iteration
+            active = np.arange(n)
+            rows, weights, cols = matrix.rows, matrix.weights, matrix.cols
+        elif (calm[active] >= STABLE).any():
+            active = active[calm[active] < STABLE]
+            still = np.zeros(n, dtype=bool)
+            still[active] = True
+            keep = still[matrix.rows]
+            rows, weights, cols = matrix.rows[keep], matrix.weights[keep], matrix.cols[keep]
+    return ranks, residuals
@@ -0,0 +1,208 @@
+import numpy as np
+
+try:
+    import scipy.sparse
+except ImportError:
+    scipy = None
+
+
+class LinkMatrix():
+    """
+    Column-stochastic link matrix of a corpus, stored sparsely.
+
+    Page `j` linking to page `i` contributes `1 / outdegree(j)` at (i, j),
+    kept as parallel `rows`/`cols`/`weights` arrays sorted by row. Pages
+    with no links ("dangling" pages) have empty columns and are treated as
+    linking to every page, as in `iterate_pagerank`.
+    """
+
+    def __init__(self, pages, sources, targets):
+        self.pages = list(pages)
+        self.n = len(self.pages)
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+
+        # Drop duplicate links and self-links, as `crawl` does
+        keys = np.sort(targets * self.n + sources)
+        first = np.ones(len(keys), dtype=bool)
+        first[1:] = keys[1:] != keys[:-1]
+        keys = keys[first]
+        targets, sources = np.divmod(keys, max(self.n, 1))
+        keep = sources != targets
+        targets, sources = targets[keep], sources[keep]
+
+        self.outdegree = np.bincount(sources, minlength=self.n)
+        self.dangling = self.outdegree == 0
+        self.rows = targets
+        self.cols = sources
+        self.weights = 1.0 / self.outdegree[sources]
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """
+        Build the matrix for a `crawl`-style corpus: a dict mapping each
+        page to the set of pages it links to. Links outside the corpus
+        are ignored.
+        """
+        pages = sorted(corpus)
+        index = {page: i for i, page in enumerate(pages)}
+        sources, targets = [], []
+        for page in pages:
+            i = index[page]
+            for link in corpus[page]:
+                j = index.get(link)
+                if j is not None:
+                    sources.append(i)
+                    targets.append(j)
+        return cls(pages, sources, targets)
+
+    def matvec(self, ranks):
+        """
+        Returns M @ ranks for the column-stochastic matrix M, with the
+        rank of dangling pages spread evenly over every page.
+        """
+        out = np.bincount(self.rows, weights=self.weights * ranks[self.cols], minlength=self.n)
+        out = out.astype(np.float64, copy=False)  # bincount of no links is int
+        out += ranks[self.dangling].sum() / self.n
+        return out
+
+    def matmat(self, ranks):
+        """
+        Returns M @ ranks for an N x K matrix of rank vectors, one pass
+        over the links feeding every column, with the rank of dangling
+        pages spread evenly over every page as in `matvec`. Uses a SciPy
+        CSR product when SciPy is installed.
+        """
+        k = ranks.shape[1]
+        if scipy is not None:
+            if getattr(self, "csr", None) is None:
+                self.csr = scipy.sparse.csr_matrix(
+                    (self.weights, (self.rows, self.cols)), shape=(self.n, self.n))
+            out = self.csr @ ranks
+        else:
+            # Scatter every (row, column) term with one flat bincount
+            slots = (self.rows[:, None] * k + np.arange(k)).ravel()
+            terms = (ranks[self.cols] * self.weights[:, None]).ravel()
+            out = np.bincount(slots, weights=terms, minlength=self.n * k).reshape(self.n, k)
+        out += ranks[self.dangling].sum(axis=0) / self.n
+        return out
+
+    def teleport(self, seeds):
+        """
+        Returns an N x K matrix of teleport distributions, one column per
+        item of `seeds`: either a collection of pages to jump to
+        uniformly, or a {page: weight} dict. Unknown pages are ignored.
+        """
+        index = {page: i for i, page in enumerate(self.pages)}
+        teleport = np.zeros((self.n, len(seeds)))
+        for k, seed in enumerate(seeds):
+            weights = seed if isinstance(seed, dict) else dict.fromkeys(seed, 1.0)
+            for page, weight in weights.items():
+                if page in index:
+                    teleport[index[page], k] += weight
+            total = teleport[:, k].sum()
+            if total <= 0:
+                raise ValueError(f"seed set {k} has no pages in the corpus")
+            teleport[:, k] /= total
+        return teleport
+
+    def out_links(self):
+        """
+        Returns CSR `(offsets, links)` arrays of each page's out-links:
+        page `j` links to `links[offsets[j]:offsets[j + 1]]`.
+        """
+        order = np.argsort(self.cols, kind="stable")
+        offsets = np.zeros(self.n + 1, dtype=np.int64)
+        np.cumsum(self.outdegree, out=offsets[1:])
+        return offsets, self.rows[order]
+
+    def to_dict(self, ranks):
+        """Returns a rank vector as a {page: rank} dict."""
+        return dict(zip(self.pages, ranks.tolist()))
+
+
+def power_iteration(matrix, damping_factor, tolerance=1e-8, max_iterations=1000, ranks=None):
+    """
+    Runs PageRank power iteration on a LinkMatrix from `ranks` (uniform
+    by default) until the L1 change between iterations is below
+    `tolerance`. Returns (ranks, iterations).
+    """
+    n = matrix.n
+    if ranks is None:
+        ranks = np.full(n, 1.0 / n)
+    teleport = (1 - damping_factor) / n
+    for iteration in range(1, max_iterations + 1):
+        new_ranks = teleport + damping_factor * matrix.matvec(ranks)
+        delta = np.abs(new_ranks - ranks).sum()
+        ranks = new_ranks
+        if delta < tolerance:
+            break
+    return ranks / ranks.sum(), iteration
+
+
+def personalized_power_iteration(matrix, damping_factor, teleport, tolerance=1e-8,
+                                 max_iterations=1000):
+    """
+    Runs personalized PageRank for every column of the N x K `teleport`
+    matrix at once: with probability 1 - `damping_factor` the surfer of
+    column k jumps to a page drawn from that column instead of a uniform
+    one. Each iteration is a single pass over the links for all columns
+    still changing by `tolerance` (L1) or more; columns that converge
+    drop out of later passes. Returns (N x K ranks, iterations).
+    """
+    result = np.empty_like(teleport)
+    columns = np.arange(teleport.shape[1])
+    ranks = teleport.copy()
+    teleport = (1 - damping_factor) * teleport
+    for iteration in range(1, max_iterations + 1):
+        new_ranks = matrix.matmat(ranks)
+        new_ranks *= damping_factor
+        new_ranks += teleport
+        # The old ranks are not needed again, so reuse them for the change
+        np.subtract(new_ranks, ranks, out=ranks)
+        delta = np.abs(ranks, out=ranks).sum(axis=0)
+        ranks = new_ranks
+
+        # Set converged columns aside and keep iterating on the rest
+        done = delta < tolerance
+        if done.any():
+            result[:, columns[done]] = ranks[:, done]
+            ranks, teleport, columns = ranks[:, ~done], teleport[:, ~done], columns[~done]
+            if len(columns) == 0:
+                break
+    result[:, columns] = ranks
+    return result / result.sum(axis=0), iteration
+
+
+def sample_ranks(matrix, damping_factor, n, surfers=1000, seed=None):
+    """
+    Estimates PageRank from `n` random-surfer samples on a LinkMatrix,
+    advancing `surfers` independent surfers one step at a time as whole
+    arrays. Each step is O(1) per surfer: with probability
+    `damping_factor` a surfer follows a uniformly chosen out-link (read
+    straight from the CSR arrays), otherwise, or on a dangling page, it
+    jumps to a uniformly chosen page.
+    """
+    rng = np.random.default_rng(seed)
+    offsets, links = matrix.out_links()
+    outdegree = matrix.outdegree
+    counts = np.zeros(matrix.n, dtype=np.int64)
+
+    surfers = max(1, min(surfers, n))
+    current = rng.integers(matrix.n, size=surfers)
+    remaining = n
+    while remaining > 0:
+        if remaining < surfers:
+            current = current[:remaining]
+        counts += np.bincount(current, minlength=matrix.n)
+        remaining -= len(current)
+
+        degree = outdegree[current]
+        follow = (rng.random(len(current)) < damping_factor) & (degree > 0)
+        choice = (rng.random(len(current)) * degree).astype(np.int64)
+        # Only surfers that follow a link index `links`, which is empty
+        # when no page has any
+        following = current[follow]
+        current = rng.integers(matrix.n, size=len(current))
+        current[follow] = links[offsets[following] + choice[follow]]
+    return counts / n
@@ -0,0 +1,176 @@
+import os
+import random
+
+import numpy as np
+import pytest
+
+import pagerank
+from crawler import crawl_edges, edges_to_corpus, extract_links
+from edgefile import EdgeFile, edge_file_pagerank, write_edge_file
+from incremental import RankState
+from solvers import SOLVERS, solve
+from sparse import LinkMatrix, power_iteration
+
+DAMPING = pagerank.DAMPING
+SEEDS = range(8)
+
+CORPORA = [os.path.join(os.path.dirname(__file__), f"corpus{i}") for i in range(3)]
+
+# iterate_pagerank stops once no rank moves by 0.001 and rounds to 4
+# places, so it is only this close to the converged ranks
+BASELINE = 5e-3
+
+# The NumPy engines stop at an L1 change of 1e-8
+EXACT = 1e-6
+
+
+def random_corpus(seed, n=None):
+    """A random `crawl`-style corpus with some dangling pages."""
+    rng = random.Random(seed)
+    n = n or rng.randint(2, 15)
+    pages = [f"{i}.html" for i in range(n)]
+    return {
+        page: set(rng.sample([p for p in pages if p != page], rng.randint(0, min(4, n - 1))))
+        if rng.random() < 0.8 else set()
+        for page in pages
+    }
+
+
+def assert_ranks(ranks, expected, tolerance):
+    assert ranks.keys() == expected.keys()
+    assert sum(ranks.values()) == pytest.approx(1)
+    for page in expected:
+        assert ranks[page] == pytest.approx(expected[page], abs=tolerance)
+
+
+@pytest.fixture(params=SEEDS)
+def corpus(request):
+    return random_corpus(request.param)
+
+
+def test_sparse_matches_iterate_pagerank(corpus):
+    assert_ranks(pagerank.sparse_pagerank(corpus, DAMPING),
+                 pagerank.iterate_pagerank(corpus, DAMPING), BASELINE)
+
+
+@pytest.mark.parametrize("method", SOLVERS)
+def test_solvers_match_iterate_pagerank(corpus, method):
+    ranks = pagerank.solver_pagerank(corpus, DAMPING, method)
+    assert_ranks(ranks, pagerank.iterate_pagerank(corpus, DAMPING), BASELINE)
+    assert_ranks(ranks, pagerank.sparse_pagerank(corpus, DAMPING), EXACT)
+
+
+@pytest.mark.parametrize("method", SOLVERS)
+@pytest.mark.parametrize("directory", CORPORA)
+def test_solvers_on_corpora(method, directory):
+    matrix = LinkMatrix.from_corpus(pagerank.crawl(directory))
+    expected, _ = power_iteration(matrix, DAMPING, 1e-12)
+    ranks, stats = solve(matrix, DAMPING, method)
+    assert np.abs(ranks - expected).max() < 1e-8
+    assert stats["iterations"] == len(stats["residuals"])
+
+
+def test_unknown_solver():
+    with pytest.raises(ValueError):
+        solve(LinkMatrix.from_corpus(random_corpus(0)), DAMPING, "newton")
+
+
+@pytest.mark.parametrize("block_pages", [1, 3, 1 << 18])
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+def test_edge_file_matches_iterate_pagerank(corpus, tmp_path, block_pages, dtype):
+    matrix = LinkMatrix.from_corpus(corpus)
+    path = str(tmp_path / "edges.bin")
+    write_edge_file(path, matrix.pages, matrix.cols, matrix.rows, block_pages=block_pages)
+    with EdgeFile(path) as edges:
+        assert edges.pages() == matrix.pages
+        ranks, _ = edge_file_pagerank(edges, DAMPING, dtype=dtype)
+        ranks = dict(zip(edges.pages(), ranks.tolist()))
+    assert_ranks(ranks, pagerank.iterate_pagerank(corpus, DAMPING), BASELINE)
+    assert_ranks(ranks, pagerank.sparse_pagerank(corpus, DAMPING),
+                 EXACT if dtype is np.float64 else 1e-5)
+
+
+def test_personalized_matches_iterate_pagerank(corpus):
+    pages = sorted(corpus)
+    seeds = [pages, pages[:1], {pages[0]: 1.0, pages[-1]: 3.0}]
+    uniform, first, weighted = pagerank.personalized_pagerank(corpus, DAMPING, seeds)
+    assert_ranks(uniform, pagerank.iterate_pagerank(corpus, DAMPING), BASELINE)
+    assert_ranks(uniform, pagerank.sparse_pagerank(corpus, DAMPING), EXACT)
+
+    # Personalized ranks solve x = (1 - d) v + d M x for teleport vector v
+    matrix = LinkMatrix.from_corpus(corpus)
+    dense = np.column_stack([matrix.matvec(column) for column in np.eye(matrix.n)])
+    for ranks, seed in ((first, seeds[1]), (weighted, seeds[2])):
+        teleport = matrix.teleport([seed])[:, 0]
+        expected = np.linalg.solve(np.eye(matrix.n) - DAMPING * dense, (1 - DAMPING) * teleport)
+        assert_ranks(ranks, matrix.to_dict(expected / expected.sum()), EXACT)
+
+
+def test_personalized_rejects_unknown_seeds(corpus):
+    with pytest.raises(ValueError):
+        pagerank.personalized_pagerank(corpus, DAMPING, [["missing.html"]])
+
+
+@pytest.mark.parametrize("method", ["power", "push"])
+def test_incremental_matches_iterate_pagerank(method):
+    for seed in SEEDS:
+        old, new = random_corpus(seed, 12), random_corpus(seed + 100, 12)
+        # Drop one page and add another, so the page set changes too
+        del new["0.html"]
+        for links in new.values():
+            links.discard("0.html")
+        new["new.html"] = {"1.html", "2.html"}
+        new["3.html"].add("new.html")
+
+        matrix = LinkMatrix.from_corpus(old)
+        state = RankState.create(matrix.pages, matrix.cols, matrix.rows, DAMPING)
+        state.apply(*state.delta(new), method=method)
+        ranks = state.to_dict()
+        assert_ranks(ranks, pagerank.iterate_pagerank(new, DAMPING), BASELINE)
+        assert_ranks(ranks, pagerank.sparse_pagerank(new, DAMPING), EXACT)
+        assert state.delta(new) == (set(), set(), set(), set())
+
+
+@pytest.mark.parametrize("push", [False, True])
+def test_incremental_pagerank_saves_and_reloads(tmp_path, push):
+    path = str(tmp_path / "state.npz")
+    for seed in SEEDS:
+        corpus = random_corpus(seed, 10)
+        ranks = pagerank.incremental_pagerank(corpus, DAMPING, path, push=push)
+        assert_ranks(ranks, pagerank.sparse_pagerank(corpus, DAMPING), EXACT)
+
+
+@pytest.mark.parametrize("surfers", [1, 100])
+def test_sampling_matches_iterate_pagerank(corpus, surfers):
+    random.seed(0)
+    ranks = pagerank.sample_pagerank(corpus, DAMPING, 100000, surfers)
+    assert_ranks(ranks, pagerank.iterate_pagerank(corpus, DAMPING), 0.02)
+
+
+def test_sampling_without_links():
+    corpus = {f"{i}.html": set() for i in range(5)}
+    ranks = pagerank.sample_pagerank(corpus, DAMPING, 10000, surfers=10)
+    assert_ranks(ranks, dict.fromkeys(corpus, 0.2), 0.03)
+
+
+@pytest.mark.parametrize("directory", CORPORA)
+@pytest.mark.parametrize("workers", [1, 2])
+def test_crawl_edges_matches_crawl(directory, workers):
+    pages, sources, targets, stats = crawl_edges(directory, workers)
+    assert edges_to_corpus(pages, sources, targets) == pagerank.crawl(directory)
+    assert stats["files"] == len(pages)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 64, 1 << 16])
+def test_extract_links_across_chunks(tmp_path, chunk_size):
+    rng = random.Random(chunk_size)
+    index = {f"{i}.html": i for i in range(30)}
+    links = set(rng.sample(range(30), 12))
+    parts = [f'<p>{"x" * rng.randint(0, 40)}</p><a  class="c" href="{i}.html">'
+             for i in links]
+    parts.append('<a href="outside.html"> < ' + "y" * 10000 + '<a href="29.html">')
+    path = tmp_path / "page.html"
+    path.write_text("".join(parts))
+    targets, nbytes = extract_links(str(path), index, chunk_size)
+    assert targets == sorted(links | {29})
+    assert nbytes == os.path.getsize(path)